@@ -1,5 +1,9 @@
 # app.py
-from flask import Flask, request, jsonify
+import json
+import logging
+import time
+
+from flask import Flask, request, jsonify, abort
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,13 +12,24 @@ import config
 
 # 导入所有处理器
 from handlers import aql_handler, game_handler, notion_handler, at_handler, faq_handler#, ai_handler, general_handler
+from utils.command_router import CommandRouter
+from utils.worker_pool import PartitionedWorkerPool
+from utils.api_utils import get_outbound_stats
+from utils.onebot_ws import onebot_ws_client
+from utils.rate_limiter import TokenBucketLimiter
+from utils.event_filter import prefilter_event
+from utils.message import parse_message, plain_text
+from utils.tracing import Trace, activate, metrics
+from utils.log import get_logger, get_log_stats
+
+logger = get_logger(__name__)
 
 # 启动 Notion 定时任务调度器
 try:
     from services.notion_scheduler import start_notion_scheduler
     start_notion_scheduler()
 except Exception as e:
-    print(f"启动 Notion 调度器失败: {e}")
+    logger.error("启动 Notion 调度器失败: %s", e)
 
 app = Flask(__name__)
 
@@ -58,6 +73,7 @@ COMMAND_ROUTER = {
     '#not edit': faq_handler.handle_faq_command,
     '#not delete': faq_handler.handle_faq_command,
     '#not list': faq_handler.handle_faq_command,
+    '#not search': faq_handler.handle_faq_command,
     '#not help': faq_handler.handle_faq_command,
 
     # 帮助命令
@@ -68,83 +84,169 @@ COMMAND_ROUTER = {
     # '.yqm': general_handler.handle_yqm,
 }
 
+# 启动时将路由表编译为前缀树，按最长前缀匹配（'#atadd' 优先于 '#at'）
+command_router = CommandRouter(COMMAND_ROUTER)
 
-def get_message_text(message_objects):
-    """从消息对象中提取纯文本内容"""
-    return ''.join([m['data']['text'] for m in message_objects if m['type'] == 'text']).strip()
-
-
-def get_full_message_content(event_data):
-    """从事件数据中提取完整消息内容，包括文本和图片"""
-    message_objects = event_data.get('message', [])
-
-    content_parts = []
-
-    for msg_obj in message_objects:
-        if msg_obj['type'] == 'text':
-            # 添加文本内容
-            text = msg_obj['data']['text'].strip()
-            if text:
-                content_parts.append(text)
-        elif msg_obj['type'] == 'image':
-            # 添加图片URL
-            image_url = msg_obj['data'].get('url', '')
-            if image_url:
-                content_parts.append(f"[CQ:image,url={image_url}]")
+# 入站事件队列：按群号分区，同一个群的命令按到达顺序执行，不同群之间并发
+event_pool = PartitionedWorkerPool(
+    'events',
+    workers=config.EVENT_QUEUE['workers'],
+    max_pending=config.EVENT_QUEUE['max_pending'],
+    put_timeout=config.EVENT_QUEUE['put_timeout']
+)
 
-    return ''.join(content_parts).strip()
+# 命令限流：按 (群, 用户, 命令) 和 群 两级令牌桶，超出的事件直接丢弃，不回复以免放大刷屏
+user_limiter = TokenBucketLimiter(idle_seconds=config.RATE_LIMIT['idle_seconds'], **config.RATE_LIMIT['user'])
+group_limiter = TokenBucketLimiter(idle_seconds=config.RATE_LIMIT['idle_seconds'], **config.RATE_LIMIT['group'])
 
 
-@app.route('/', methods=['POST'])
-def receive_event():
-    event_data = request.json
-    print(event_data)
+def prepare_event(event_data):
+    """
+    校验上报事件并匹配命令
 
+    返回 (route, None) 表示需要执行 route.handler(event_data)；
+    返回 (None, reason) 表示忽略该事件，reason 为响应文本。
+    WSGI 与 ASGI 两个入口共用这一逻辑。
+    """
     # 基本的事件校验
     if not event_data or event_data.get('post_type') != 'message' or event_data.get('message_type') != 'group':
-        return "Not a group message event", 200
+        return None, "Not a group message event"
 
     group_id = event_data.get('group_id')
     if group_id not in config.MONITORED_GROUPS:
-        return "Group not monitored", 200
+        return None, "Group not monitored"
 
-    message_text = get_message_text(event_data.get('message', []))
+    # 消息只在这里解析一次，处理器通过 event_data['segments'] 取得图片等非文本内容
+    segments = parse_message(event_data.get('message'))
+    message_text = plain_text(segments).strip()
     if not message_text:
-        return "Empty message", 200
-
-    print(f"Received from group {group_id}: {message_text}")
-
-    # 调试信息：显示前缀匹配
-    for command in COMMAND_ROUTER:
-        if message_text.startswith(command):
-            print(f"Command matched: '{command}' for message: '{message_text}'")
-            break
-
-    # 对于FAQ编辑命令，如果有图片内容，需要合并命令和图片
-    if message_text.startswith('#not edit'):
-        full_content = get_full_message_content(event_data)
-        if full_content and full_content != message_text:
-            # 有额外的图片内容，将其添加到命令中
-            event_data['message'] = message_text + ' ' + full_content
-        else:
-            # 没有额外图片内容，使用纯文本
-            event_data['message'] = message_text
-    else:
-        # 将消息文本注入回event_data，方便处理器使用
-        event_data['message'] = message_text
-
-    # 根据命令前缀分发到对应的处理器
-    for command, handler_func in COMMAND_ROUTER.items():
-        if message_text.startswith(command):
-            # 找到匹配的命令，调用处理器并停止查找
-            try:
-                handler_func(event_data)
-            except Exception as e:
-                print(f"Error handling command '{command}': {e}")
-            break # 每个消息只处理一次
-
-    return "OK", 200
+        return None, "Empty message"
+
+    logger.debug("Received from group %s: %s", group_id, message_text)
+
+    route = command_router.match(message_text)
+    if route is None:
+        return None, "No command matched"
+
+    logger.info("Command matched: '%s' for message: '%s'", route.command, message_text)
+
+    # 将消息文本注入回event_data，方便处理器使用
+    event_data['message'] = message_text
+    event_data['segments'] = segments
+
+    # 记录命中的命令和参数部分，方便处理器使用
+    event_data['command'] = route.command
+    event_data['args'] = route.args
+
+    if not check_rate_limit(route, event_data):
+        logger.info("Rate limited: '%s' from user %s in group %s", route.command, event_data.get('user_id'), group_id)
+        return None, "Rate limited"
+    return route, None
+
+
+def check_rate_limit(route, event_data):
+    """检查命令是否超出限流，返回是否放行"""
+    if not config.RATE_LIMIT['enabled']:
+        return True
+    group_id = event_data.get('group_id')
+    user_key = (group_id, event_data.get('user_id'), route.command)
+    if not user_limiter.allow(user_key):
+        return False
+    if not group_limiter.allow(group_id):
+        # 命令被群限流拒绝、不会执行，退还刚扣掉的用户令牌
+        user_limiter.refund(user_key)
+        return False
+    return True
+
+
+@app.route('/', methods=['POST'])
+def receive_event():
+    return handle_raw_event(request.get_data())
+
+
+def handle_raw_event(body, trace=None):
+    """处理一条原始上报报文，先预过滤，确定需要处理时才完整解析 JSON"""
+    trace = trace or Trace()
+    with trace.span('parse'):
+        reason = prefilter_event(body)
+        if reason is not None:
+            return reason, 200
+        try:
+            event_data = json.loads(body)
+        except ValueError:
+            event_data = None
+    if not isinstance(event_data, dict):
+        event_data = None
+    # 记录原始报文而不是 event_data：日志可能在 QueueHandler 线程上才格式化，那时事件已被 prepare_event 改写
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Event: %s", body.decode('utf-8', 'replace') if isinstance(body, bytes) else body)
+    return handle_event(event_data, trace)
+
+
+def handle_event(event_data, trace=None):
+    """处理一条上报事件（webhook 与 WebSocket 共用），返回 (响应文本, 状态码)"""
+    trace = trace or Trace()
+    with trace.span('route'):
+        route, reason = prepare_event(event_data)
+    if route is None:
+        return reason, 200
+    group_id = event_data['group_id']
+    trace.command = route.command
+
+    # 分发到对应的处理器，每个消息只处理一次
+    if not config.EVENT_QUEUE['enabled']:
+        dispatch_event(route, event_data, trace)
+        return "OK", 200
+
+    trace.mark = time.perf_counter()
+    if not event_pool.submit(group_id, dispatch_event, route, event_data, trace):
+        # 队列已满：丢弃本条事件，让 NapCat 的上报请求尽快返回
+        return "Event queue full", 503
+
+    return "Accepted", 200
+
+
+def dispatch_event(route, event_data, trace=None):
+    """执行命令处理器，并记录排队和处理耗时"""
+    if trace is not None and trace.mark is not None:
+        trace.add('queue', time.perf_counter() - trace.mark)
+    with activate(trace):
+        try:
+            if trace is None:
+                route.handler(event_data)
+            else:
+                with trace.span('handler'):
+                    route.handler(event_data)
+        except Exception:
+            logger.exception("Error handling command '%s'", route.command)
+    if trace is not None:
+        trace.finish()
+
+
+@app.route('/stats', methods=['GET'])
+def queue_stats():
+    """入站/出站队列的计数器，仅允许本机访问"""
+    if request.remote_addr not in ('127.0.0.1', '::1'):
+        abort(403)
+    return jsonify({
+        'events': event_pool.stats(),
+        'outbound': get_outbound_stats(),
+        'onebot_ws': onebot_ws_client.stats(),
+        'rate_limit': {'user': user_limiter.stats(), 'group': group_limiter.stats()},
+        'log': get_log_stats(),
+    })
+
+
+@app.route('/metrics', methods=['GET'])
+def latency_metrics():
+    """各命令分阶段的延迟分位数（毫秒），仅允许本机访问"""
+    if request.remote_addr not in ('127.0.0.1', '::1'):
+        abort(403)
+    return jsonify(metrics.snapshot())
 
 
 if __name__ == '__main__':
+    if config.NAPCAT_TRANSPORT == 'ws':
+        # WebSocket 模式：事件和动作都走与 NapCat 的长连接，HTTP 服务仅保留 webhook 兼容和 /stats
+        onebot_ws_client.start(on_event=handle_event)
     app.run(host=config.SERVER_HOST, port=config.SERVER_PORT)
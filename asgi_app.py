@@ -0,0 +1,182 @@
+# asgi_app.py
+# 可选的 ASGI 入口，与 app.py 共用命令路由和事件校验：
+#   uvicorn asgi_app:app --host 0.0.0.0 --port 7778
+# 有异步实现的处理器（Notion 查询）直接在事件循环中执行，等待 Notion 时不占用线程；
+# 其余同步处理器（SQLite、JSON 文件等）通过 asyncio.to_thread 放到线程池执行。
+import asyncio
+import json
+import logging
+import time
+
+import config
+from app import prepare_event, user_limiter, group_limiter
+from handlers import notion_handler, async_notion_handler
+from services.async_notion_service import async_notion_service, async_diary_service
+from utils.api_utils import get_outbound_stats
+from utils.event_filter import prefilter_event
+from utils.tracing import Trace, activate, metrics
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# 同步处理器 -> 对应的异步实现
+ASYNC_HANDLERS = {
+    notion_handler.handle_notion_command: async_notion_handler.handle_notion_command,
+}
+
+
+class AsyncEventDispatcher:
+    """
+    事件循环内的事件调度器
+
+    每个事件一个 Task；同一个群的事件依次获取该群的 asyncio.Lock（先到先得），
+    因此按到达顺序执行，不同群之间并发。处理中的事件数超过上限时拒绝新事件。
+    """
+
+    def __init__(self, max_inflight: int):
+        self.max_inflight = max_inflight
+        self._group_locks = {}
+        self._tasks = set()
+        self._stats = {'submitted': 0, 'completed': 0, 'failed': 0, 'rejected': 0, 'max_depth': 0}
+
+    def submit(self, group_id, route, event_data, trace=None) -> bool:
+        """创建处理任务，返回是否接受该事件"""
+        if len(self._tasks) >= self.max_inflight:
+            self._stats['rejected'] += 1
+            logger.warning("处理中的事件已达上限 %s，丢弃: %s", self.max_inflight, route.command)
+            return False
+
+        task = asyncio.create_task(self._run(group_id, route, event_data, trace or Trace()))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        self._stats['submitted'] += 1
+        self._stats['max_depth'] = max(self._stats['max_depth'], len(self._tasks))
+        return True
+
+    async def _run(self, group_id, route, event_data, trace):
+        lock = self._group_locks.get(group_id)
+        if lock is None:
+            lock = self._group_locks[group_id] = asyncio.Lock()
+
+        trace.command = route.command
+        queued = time.perf_counter()
+        async with lock:
+            trace.add('queue', time.perf_counter() - queued)
+            handler = ASYNC_HANDLERS.get(route.handler)
+            # Task 和 to_thread 都会复制当前 context，处理器内的存储/发送阶段记入本次追踪
+            with activate(trace):
+                try:
+                    with trace.span('handler'):
+                        if handler is not None:
+                            await handler(event_data)
+                        else:
+                            await asyncio.to_thread(route.handler, event_data)
+                    self._stats['completed'] += 1
+                except Exception:
+                    self._stats['failed'] += 1
+                    logger.exception("Error handling command '%s'", route.command)
+        trace.finish()
+
+    async def join(self):
+        """等待所有处理中的事件完成"""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def stats(self):
+        snapshot = dict(self._stats)
+        snapshot['depth'] = len(self._tasks)
+        snapshot['capacity'] = self.max_inflight
+        return snapshot
+
+
+dispatcher = AsyncEventDispatcher(config.ASGI_SERVER['max_inflight'])
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+async def _respond(send, status: int, body, content_type: str = 'text/plain; charset=utf-8'):
+    if not isinstance(body, bytes):
+        body = body.encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', content_type.encode()), (b'content-length', str(len(body)).encode())],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await dispatcher.join()
+            await async_notion_service.aclose()
+            await async_diary_service.aclose()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def receive_event(body: bytes):
+    """处理 NapCat 上报，返回 (状态码, 响应文本)"""
+    trace = Trace()
+    with trace.span('parse'):
+        reason = prefilter_event(body)
+        if reason is not None:
+            return 200, reason
+        try:
+            event_data = json.loads(body)
+        except ValueError:
+            event_data = None
+    if not isinstance(event_data, dict):
+        event_data = None
+    # 与 app.handle_raw_event 相同，记录原始报文
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Event: %s", body.decode('utf-8', 'replace') if isinstance(body, bytes) else body)
+
+    with trace.span('route'):
+        route, reason = prepare_event(event_data)
+    if route is None:
+        return 200, reason
+
+    if not dispatcher.submit(event_data['group_id'], route, event_data, trace):
+        return 503, "Event queue full"
+    return 200, "Accepted"
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await _lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+
+    method, path = scope['method'], scope['path']
+    if method == 'POST' and path == '/':
+        status, text = await receive_event(await _read_body(receive))
+        await _respond(send, status, text)
+    elif method == 'GET' and path in ('/stats', '/metrics'):
+        # 仅允许本机访问
+        client = scope.get('client') or ('', 0)
+        if client[0] not in ('127.0.0.1', '::1'):
+            await _respond(send, 403, "Forbidden")
+            return
+        if path == '/metrics':
+            body = json.dumps(metrics.snapshot(), ensure_ascii=False)
+        else:
+            body = json.dumps({
+                'events': dispatcher.stats(),
+                'outbound': get_outbound_stats(),
+                'rate_limit': {'user': user_limiter.stats(), 'group': group_limiter.stats()},
+            })
+        await _respond(send, 200, body, 'application/json')
+    else:
+        await _respond(send, 404, "Not Found")
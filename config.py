@@ -4,6 +4,88 @@ import os
 # NapCat QQ机器人框架配置
 NAPCAT_BASE_URL = "http://127.0.0.1:23333"
 
+# NapCat 通信方式: 'http' 通过 webhook 接收事件、HTTP 调用动作;
+# 'ws' 通过一条正向 WebSocket 长连接同时接收事件和调用动作
+NAPCAT_TRANSPORT = os.getenv("NAPCAT_TRANSPORT", "http")
+
+# NapCat 正向 WebSocket 配置
+NAPCAT_WS = {
+    'url': os.getenv("NAPCAT_WS_URL", "ws://127.0.0.1:3001"),
+    'access_token': os.getenv("NAPCAT_ACCESS_TOKEN", ""),
+    'action_timeout': 10,       # 单次动作等待响应的超时(秒)
+    'reconnect_delay': 1.0,     # 断线后首次重连的等待时间(秒)，之后指数退避
+    'max_reconnect_delay': 30,  # 重连等待时间上限(秒)
+}
+
+# NapCat HTTP 客户端配置
+NAPCAT_CLIENT = {
+    'pool_size': 8,         # keep-alive 连接池大小，应不小于出站发送线程数
+    'timeout': 10,          # 单次请求超时(秒)
+}
+
+# 出站消息队列配置
+OUTBOUND_QUEUE = {
+    'enabled': True,        # 关闭后在处理线程中同步发送
+    'workers': 4,           # 发送线程数，同一个群的消息按顺序发送，不同群并发发送
+    'max_pending': 1000,    # 所有群合计最多排队的消息数
+    'put_timeout': 1.0,     # 队列已满时入队最多等待的秒数，超时后丢弃
+}
+
+# 入站事件预过滤：解析 JSON 之前先用正则检查原始报文，直接丢弃心跳、通知和未监听群的消息
+EVENT_PREFILTER = {
+    'enabled': True,
+}
+
+# 入站事件队列：webhook 校验后立即返回，命令由后台线程执行
+EVENT_QUEUE = {
+    'enabled': True,        # 关闭后在请求线程中同步执行命令
+    'workers': 8,           # 处理线程数，同一个群的事件按顺序处理，慢命令只占用一个线程
+    'max_pending': 200,     # 所有群合计最多排队的事件数（不含正在处理的）
+    'put_timeout': 0.0,     # 队列已满时入队最多等待的秒数，超时后直接丢弃（不阻塞 NapCat 的上报）
+}
+
+# 命令限流（令牌桶）：rate 为每秒补充的令牌数，burst 为最多可连续触发的次数
+RATE_LIMIT = {
+    'enabled': True,
+    'user': {'rate': 0.2, 'burst': 3},      # 同一群内同一用户的同一命令
+    'group': {'rate': 1.0, 'burst': 10},    # 同一群的所有命令
+    'idle_seconds': 600,                    # 空闲超过该时间的桶被淘汰
+}
+
+# 单条QQ消息的最大长度（字符），超出的回复需要拆分或合并时不得超过
+MESSAGE_MAX_LENGTH = 4500
+
+# 列表类命令（#not list、#atls、#wdlst 等）每页显示的条目数
+LIST_PAGE_SIZE = 30
+
+# 出站消息合并：同一个群在窗口内的多条纯文本回复合并为一次发送
+OUTBOUND_COALESCE = {
+    'enabled': True,
+    'window': 0.05,         # 合并窗口(秒)，即每条回复额外等待的最长时间
+}
+
+# 请求追踪与延迟统计（本机 GET /metrics 查看各命令 p50/p95/p99）
+TRACING = {
+    'enabled': True,
+    'handler_budget_ms': 3000,      # 处理器耗时超过预算时记录慢命令日志
+    'budgets': {                    # 按命令单独设置的预算（毫秒）
+        '#daily': 15000,
+        '#weekly': 15000,
+        '#add_daily': 15000,
+        '#add_weekly': 15000,
+        '#update_cover': 15000,
+        '#not edit': 10000,         # 可能需要下载图片
+    },
+}
+
+# 日志：记录先放入内存队列，由后台线程格式化并写出，写 stdout/journal 变慢时不阻塞请求
+LOGGING = {
+    'level': os.getenv("LOG_LEVEL", "INFO"),
+    'queue_size': 10000,            # 队列满时丢弃新日志并计数，而不是阻塞调用方
+    'debug_sample_every': 100,      # 同一条 DEBUG 日志模板每 N 次只输出 1 次
+    'format': '%(asctime)s %(levelname)s %(name)s: %(message)s',
+}
+
 # 外部服务URL
 JJL_BASE_URL = 'http://yunma.xyq5.top/'
 JJL_QUERY_URL = JJL_BASE_URL + 'api/api_query'
@@ -37,10 +119,21 @@ DATA_PATHS = {
     'memory': 'data/memory.json'
 }
 
+# JSON数据文件持久化配置
+JSON_STORE = {
+    'fsync': 'always',      # 'always' 每次写入都刷盘; 'batch' 按间隔批量刷盘; 'never' 交给操作系统
+    'fsync_interval': 1.0,  # 'batch' 模式下的刷盘间隔(秒)
+}
+
 # Flask 服务配置
 SERVER_HOST = '0.0.0.0'
 SERVER_PORT = 7778
 
+# 可选的 ASGI 服务配置 (uvicorn asgi_app:app)
+ASGI_SERVER = {
+    'max_inflight': 1000,   # 同时处理中的事件上限，超过后丢弃并返回 503
+}
+
 # === Notion 配置 ===
 # Notion API 配置
 # 注意：请将以下token替换为您的实际token，或使用环境变量
@@ -58,6 +151,23 @@ NOTION_DATABASES = {
 # Notion 代理配置 (如果需要)
 NOTION_PROXY = ""  # 设置为空字符串禁用代理，设置为"http://proxy:port"启用代理
 
+# Notion 分页查询每页的条数（API 上限为 100），超过一页的结果按 next_cursor 继续获取
+NOTION_PAGE_SIZE = 100
+
+# Notion 请求节流：同一个 token 的请求按令牌桶排队（Notion 限制平均约 3 次/秒，允许少量突发）
+NOTION_RATE_LIMIT = {
+    'enabled': True,
+    'rate': 3.0,            # 每秒平均请求数
+    'burst': 10,            # 允许连续突发的请求数
+}
+
+# #daily / #weekly 加载嵌套块（折叠块、列表子项、分栏等）
+NOTION_BLOCK_TREE = {
+    'enabled': True,        # 关闭后只显示页面的顶层块
+    'concurrency': 4,       # 同时进行的子块请求数
+    'max_depth': 5,         # 最多展开的嵌套层数
+}
+
 # Notion 数据文件路径
 NOTION_DATA_PATHS = {
     'daily_template': 'data/notion_templates/daily_template.json',
@@ -68,3 +178,24 @@ NOTION_DATA_PATHS = {
 # === FAQ 配置 ===
 FAQ_DATABASE_PATH = 'data/faq.db'           # FAQ数据库路径
 FAQ_IMAGES_DIR = 'data/faq_images/'         # 图片存储目录
+FAQ_IMAGE_DOWNLOAD = {
+    'workers': 8,           # 并发下载线程数
+    'per_host': 4,          # 同一主机的最大并发下载数
+    'timeout': 30,          # 单张图片下载超时(秒)
+    'max_bytes': 20 * 1024 * 1024,  # 单张图片大小上限(字节)
+}
+FAQ_IMAGE_VARIANT = {
+    'enabled': True,        # 编辑时生成缩小版，查询时默认发送缩小版（需要 Pillow）
+    'max_side': 1280,       # 缩小版最长边像素
+    'max_bytes': 512 * 1024,  # 缩小版体积上限(字节)
+    'quality': 85,          # 初始JPEG质量，超出体积上限时逐步降低
+}
+FAQ_IMAGE_GC = {
+    'interval_minutes': 10, # 定时回收无引用图片的间隔(分钟)
+    'batch_size': 100,      # 每次最多回收的图片数
+    'grace_seconds': 3600,  # 图片引用数归零后保留的时间(秒)
+}
+FAQ_DB_POOL_SIZE = 4                        # FAQ数据库连接池大小
+FAQ_DB_SYNCHRONOUS = 'NORMAL'               # SQLite synchronous 设置 (OFF/NORMAL/FULL)
+FAQ_CACHE_SIZE = 256                        # 热点FAQ缓存的最大条目数，0表示关闭缓存
+FAQ_CACHE_TTL = 300                         # 热点FAQ缓存的过期时间(秒)
@@ -1,6 +1,7 @@
 import base64
-from utils.file_utils import load_json, dump_json
+from utils.file_utils import load_json, json_transaction
 from utils.api_utils import send_group_message, get_dynamic_code_2
+from utils.message import cq_code
 import config
 
 def hex_to_bytes(hex_str):
@@ -17,6 +18,7 @@ def handle_aql(event):
     message = event['message']
 
     key = message[5:].strip()
+    at_user = cq_code('at', qq=user_id)
 
     if group_id in [config.GROUP_IDS['jjl_test'], config.GROUP_IDS['jjl']]:
         # 新逻辑 for jjl群
@@ -24,17 +26,17 @@ def handle_aql(event):
         if key in accounts:
             token = accounts[key]
             code = get_dynamic_code_2(token)
-            response_msg = f"[CQ:at,qq={user_id}] {code}" if code else f"[CQ:at,qq={user_id}] 获取动态码失败"
+            response_msg = f"{at_user} {code}" if code else f"{at_user} 获取动态码失败"
         else:
-            response_msg = f"[CQ:at,qq={user_id}] 账户错误或不存在"
+            response_msg = f"{at_user} 账户错误或不存在"
     else:
         # 原逻辑 for 其他群
         accounts = load_json(config.DATA_PATHS['code'])
         if key in accounts:
             value = accounts[key]
-            response_msg = f"[CQ:at,qq={user_id}] {value}"
+            response_msg = f"{at_user} {value}"
         else:
-            response_msg = f"[CQ:at,qq={user_id}] 账户错误或不存在"
+            response_msg = f"{at_user} 账户错误或不存在"
             
     send_group_message(group_id, response_msg)
 
@@ -53,10 +55,8 @@ def handle_aql_add(event):
 
     if group_id == config.GROUP_IDS['jjl_test']:
         # jjl_test群的逻辑
-        na_path = config.DATA_PATHS['ze_account']
-        na_json = load_json(na_path)
-        na_json[account] = secret
-        dump_json(na_path, na_json)
+        with json_transaction(config.DATA_PATHS['ze_account']) as na_json:
+            na_json[account] = secret
         send_group_message(group_id, f"已将 {account} 安全令信息添加")
     
     elif group_id == config.GROUP_IDS['gl']:
@@ -64,20 +64,17 @@ def handle_aql_add(event):
         if len(secret) == 40:
             secret = convert_to_base32(secret)
         
-        na_path = config.DATA_PATHS['auth_list']
-        na_json = load_json(na_path)
-        
-        if not na_json.get('list'): # 初始化
-             na_json['list'] = []
+        with json_transaction(config.DATA_PATHS['auth_list']) as na_json:
+            if not na_json.get('list'): # 初始化
+                 na_json['list'] = []
 
-        new_id = na_json['list'][-1]['id'] + 1 if na_json['list'] else 1
-        
-        new_item = {
-            'id': new_id,
-            'name': 'None',
-            'account': account,
-            'secret': secret
-        }
-        na_json['list'].append(new_item)
-        dump_json(na_path, na_json)
+            new_id = na_json['list'][-1]['id'] + 1 if na_json['list'] else 1
+
+            new_item = {
+                'id': new_id,
+                'name': 'None',
+                'account': account,
+                'secret': secret
+            }
+            na_json['list'].append(new_item)
         send_group_message(group_id, f"已将 {account} 安全令信息添加")
\ No newline at end of file
@@ -0,0 +1,141 @@
+# handlers/async_notion_handler.py
+# ASGI 入口使用的 Notion 命令处理器：只读的 #daily / #weekly 全程异步，
+# 其余写操作较少且依赖同步工具函数，交给线程执行同步版处理器
+import asyncio
+
+from handlers import notion_handler
+from services.async_notion_service import async_notion_service, async_diary_service
+from services.notion_service import daily_manager, weekly_manager
+from utils.api_utils import send_group_message
+from utils.notion_utils import iter_notion_block_texts, wk_name
+from utils.reply_builder import ReplyBuilder
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+
+async def _first_result(database_name, filter_json):
+    """查询数据库并返回第一条结果，出错时返回None（与同步版 get_today_page 一致）"""
+    try:
+        result = await async_diary_service.query_database(database_name, filter_json)
+        if result["results"]:
+            return result["results"][0]
+    except Exception as e:
+        logger.error("查询 %s 失败: %s", database_name, e)
+    return None
+
+
+class _DeferredReply(ReplyBuilder):
+    """只切分不发送的 ReplyBuilder：凑满的段先暂存，由调用方在事件循环中通过 _send 发出"""
+
+    def __init__(self, *args, **kwargs):
+        self.ready = []
+        super().__init__(*args, **kwargs)
+
+    def _emit(self, text: str):
+        self.ready.append(text)
+        self.sent += 1
+
+    def take(self):
+        ready, self.ready = self.ready, []
+        return ready
+
+
+async def _send_page(group_id, title, page_id) -> bool:
+    """
+    边加载块树边发送页面内容，返回页面是否有内容
+
+    每个顶层块的子树加载完就加入回复，凑满单条消息长度上限就先发出，不等整棵块树加载完。
+    """
+    reply = _DeferredReply(group_id, header=title, separator="\n\n")
+    empty = True
+    async for block in async_notion_service.iter_block_tree(page_id):
+        empty = False
+        reply.extend(iter_notion_block_texts([block]))
+        await _send(group_id, reply.take())
+    if empty:
+        return False
+    reply.send()
+    await _send(group_id, reply.take())
+    return True
+
+
+async def _send(group_id, message):
+    """
+    发送一条消息或按顺序发送多段消息
+
+    与同步处理器走同一条出站路径（出站队列、消息合并、长度切分、HTTP/WS 传输），
+    因此不会越过同一个群里仍在合并窗口中的更早回复。入队可能短暂阻塞，放到线程中执行。
+    """
+    if not group_id or not message:
+        return
+    for text in ([message] if isinstance(message, str) else message):
+        await asyncio.to_thread(send_group_message, group_id, text)
+
+
+async def handle_daily_command(event_data):
+    """处理 #daily 命令，获取今日日记内容"""
+    group_id = event_data.get('group_id')
+    try:
+        today_page = await _first_result("Daily Dairy 2.0", daily_manager.get_day_filter(daily_manager.get_today_date()))
+
+        if not today_page:
+            # 如果今日页面不存在，创建一个
+            try:
+                result = await asyncio.to_thread(daily_manager.add_today_page, with_cover=True)
+                message = f"今日日记页面已创建！页面ID: {result['id'][:8]}..."
+            except Exception as e:
+                message = f"创建今日日记失败: {str(e)}"
+        else:
+            try:
+                message = None
+                if not await _send_page(group_id, "📅 今日日记内容:", today_page["id"]):
+                    message = "今日日记页面为空，快去添加一些内容吧！"
+            except Exception as e:
+                message = f"获取日记内容失败: {str(e)}"
+    except Exception as e:
+        message = f"处理每日命令时出错: {str(e)}"
+        logger.error(message)
+
+    await _send(group_id, message)
+
+
+async def handle_weekly_command(event_data):
+    """处理 #weekly 命令，获取本周周记内容"""
+    group_id = event_data.get('group_id')
+    try:
+        week_name = wk_name()
+        if not week_name:
+            message = "❌ 无法获取当前周信息，请检查学期配置"
+        else:
+            week_page = await _first_result("Weekly Dairy 2.0", weekly_manager.get_week_filter(week_name))
+            if not week_page:
+                try:
+                    success = await asyncio.to_thread(weekly_manager.check_and_create_current_week)
+                    message = f"📅 本周周记页面已创建！\n周名称: {week_name}" if success else "❌ 创建本周周记页面失败"
+                except Exception as e:
+                    message = f"❌ 创建本周周记失败: {str(e)}"
+            else:
+                try:
+                    message = None
+                    if not await _send_page(group_id, "📅 本周周记内容:", week_page["id"]):
+                        message = f"📅 本周周记页面为空，快去添加一些内容吧！\n周名称: {week_name}"
+                except Exception as e:
+                    message = f"❌ 获取周记内容失败: {str(e)}"
+    except Exception as e:
+        message = f"❌ 处理周记命令时出错: {str(e)}"
+        logger.error(message)
+
+    await _send(group_id, message)
+
+
+async def handle_notion_command(event_data):
+    """处理所有 Notion 相关命令的主入口（异步版）"""
+    message_text = event_data.get('message', '')
+
+    if message_text.startswith('#daily'):
+        await handle_daily_command(event_data)
+    elif message_text.startswith('#weekly'):
+        await handle_weekly_command(event_data)
+    else:
+        await asyncio.to_thread(notion_handler.handle_notion_command, event_data)
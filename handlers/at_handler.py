@@ -1,7 +1,12 @@
 # handlers/at_handler.py
-from utils.file_utils import load_json, dump_json
+from utils.file_utils import load_json, json_transaction
 from utils.api_utils import send_group_message
+from utils.reply_builder import ReplyBuilder, paginate, parse_page
+from utils.message import cq_code
 import config
+from utils.log import get_logger
+
+logger = get_logger(__name__)
 
 def handle_at_command(event):
     """处理 #at 命令"""
@@ -30,7 +35,7 @@ def handle_at_command(event):
     qq_msg = ''
     for e in qq_ls:
         if e != user_id:
-            qq_msg += f"[CQ:at,qq={e}]"
+            qq_msg += cq_code('at', qq=e)
 
     if qq_msg:
         send_group_message(group_id, qq_msg)
@@ -51,30 +56,41 @@ def handle_at_add(event):
         send_group_message(group_id, "格式错误，请使用 #atadd <昵称> <QQ号1> [QQ号2] ...")
         return
 
-    at_data = load_json(config.DATA_PATHS['at'])
     nickname = nk_txt[0]
     qq_numbers = nk_txt[1:]
 
-    if nickname not in at_data["nickname"]:
-        at_data["nickname"][nickname] = qq_numbers
-    else:
-        at_data["nickname"][nickname] = list(set(qq_numbers + at_data["nickname"][nickname]))
+    with json_transaction(config.DATA_PATHS['at']) as at_data:
+        if nickname not in at_data["nickname"]:
+            at_data["nickname"][nickname] = qq_numbers
+        else:
+            at_data["nickname"][nickname] = list(set(qq_numbers + at_data["nickname"][nickname]))
 
-    dump_json(config.DATA_PATHS['at'], at_data)
     msg = f"已设定昵称 {nickname} 包含 {qq_numbers}"
     send_group_message(group_id, msg)
 
 def handle_at_list(event):
-    """处理 #atls 命令"""
+    """处理 #atls [页码] 命令"""
     group_id = event['group_id']
     try:
         at_data = load_json(config.DATA_PATHS['at'])
-        if 'nickname' in at_data:
-            send_group_message(group_id, f"当前昵称配置：{at_data['nickname']}")
-        else:
+        if 'nickname' not in at_data:
             send_group_message(group_id, "昵称配置数据格式错误")
+            return
+
+        nicknames = sorted(at_data['nickname'].items())
+        if not nicknames:
+            send_group_message(group_id, "当前没有昵称配置")
+            return
+
+        items, page, total_pages = paginate(nicknames, parse_page(event['message'][len('#atls'):]))
+        reply = ReplyBuilder(group_id, header=f"当前昵称配置 ({page}/{total_pages})：")
+        for nickname, qq_numbers in items:
+            reply.add(f"{nickname}: {', '.join(str(qq) for qq in qq_numbers)}")
+        if page < total_pages:
+            reply.add(f"📄 下一页: #atls {page + 1}")
+        reply.send()
     except Exception as e:
-        print(f"#atls 数据加载失败: {e}")
+        logger.error("#atls 数据加载失败: %s", e)
         send_group_message(group_id, "加载数据时出错，请稍后再试")
 
 def handle_at_delete(event):
@@ -91,24 +107,23 @@ def handle_at_delete(event):
         send_group_message(group_id, "格式错误，请使用 #atdel <昵称> [QQ号1] [QQ号2] ...")
         return
 
-    at_data = load_json(config.DATA_PATHS['at'])
     nickname = nk_txt[0]
 
-    if len(nk_txt) > 1:
-        # 删除指定QQ号
-        for qq in nk_txt[1:]:
+    with json_transaction(config.DATA_PATHS['at']) as at_data:
+        if len(nk_txt) > 1:
+            # 删除指定QQ号
+            for qq in nk_txt[1:]:
+                try:
+                    at_data["nickname"][nickname].remove(qq)
+                    msg = f"已从昵称 {nickname} 中除去 {nk_txt[1:]}"
+                except ValueError:
+                    msg = f"昵称 {nickname} 中未找到 {qq}"
+        else:
+            # 删除整个昵称
             try:
-                at_data["nickname"][nickname].remove(qq)
-                msg = f"已从昵称 {nickname} 中除去 {nk_txt[1:]}"
-            except ValueError:
-                msg = f"昵称 {nickname} 中未找到 {qq}"
-    else:
-        # 删除整个昵称
-        try:
-            del at_data["nickname"][nickname]
-            msg = f"已删除昵称 {nickname}"
-        except KeyError:
-            msg = f"未找到昵称 {nickname}"
-
-    dump_json(config.DATA_PATHS['at'], at_data)
+                del at_data["nickname"][nickname]
+                msg = f"已删除昵称 {nickname}"
+            except KeyError:
+                msg = f"未找到昵称 {nickname}"
+
     send_group_message(group_id, msg)
\ No newline at end of file
@@ -2,7 +2,18 @@
 from services.database_manager import database_manager
 from utils.image_utils import image_manager
 from utils.api_utils import send_group_message
+from utils.reply_builder import ReplyBuilder, parse_page
+from utils.tracing import span
+from utils.message import (decode_cq, drop_words, encode_cq, image_segment, local_file, parse_message,
+                           plain_text, segment_text, strip_segments, text_segment)
 import config
+import re
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# 文本中直接粘贴的图片链接
+IMAGE_URL_PATTERN = re.compile(r'https?://[^\s]+\.(?:jpg|jpeg|png|gif|bmp|webp)(?:\?[^\s]*)?', re.IGNORECASE)
 
 def handle_faq_edit(event_data):
     """处理 #not edit [key] [contents] 命令，编辑FAQ内容"""
@@ -14,39 +25,35 @@ def handle_faq_edit(event_data):
             send_group_message(group_id, "格式错误，请使用: #not edit <key> <contents>")
             return
 
-        content_part = message_text[10:].strip()
-        if not content_part:
+        words = message_text[10:].split(None, 1)
+        if not words:
             send_group_message(group_id, "请提供key和内容")
             return
+        key = words[0]
 
-        space_index = content_part.find(' ')
-        if space_index == -1:
+        # 内容取自解析好的消息段："#not edit <key>" 之后的文本和图片，保持原有顺序
+        segments = event_data.get('segments') or parse_message(message_text)
+        content_segments = strip_segments(drop_words(segments, 3))
+        if not content_segments:
             send_group_message(group_id, "请提供key和内容，用空格分隔")
             return
 
-        key = content_part[:space_index].strip()
-        contents = content_part[space_index + 1:].strip()
-
-        if not key or not contents:
-            send_group_message(group_id, "key和内容不能为空")
-            return
-
-        # 先将图片URL转换为CQ码格式，然后再处理图片下载
-        cq_converted_contents = convert_content_to_cq(contents)
-        processed_contents = process_faq_content(cq_converted_contents)
+        # 先将图片链接转换为图片段，然后再处理图片下载
+        content_segments = process_faq_content(convert_content_to_segments(content_segments))
+        processed_contents = encode_cq(content_segments)
 
         success = database_manager.set_faq_content(key, processed_contents)
 
         if success:
             send_group_message(group_id, f"✅ FAQ条目 [{key}] 已更新")
-            if '[CQ:image' in processed_contents and processed_contents != contents:
+            if any(map(local_file, content_segments)):
                 send_group_message(group_id, "🖼️ 图片已下载并保存到本地")
         else:
             send_group_message(group_id, f"❌ 更新FAQ条目 [{key}] 失败")
 
     except Exception as e:
         error_msg = f"编辑FAQ失败: {str(e)}"
-        print(error_msg)
+        logger.error(error_msg)
         group_id = event_data.get('group_id')
         if group_id:
             send_group_message(group_id, error_msg)
@@ -64,7 +71,7 @@ def handle_faq_delete(event_data):
         send_group_message(group_id, "❌ 格式错误，请使用: #not delete <key>")
         return
 
-    key = parts[0].lower()
+    key = parts[0]
     success = database_manager.delete_faq_content(key)
 
     if success:
@@ -73,23 +80,58 @@ def handle_faq_delete(event_data):
         send_group_message(group_id, f"❌ 删除FAQ条目失败或条目不存在: {key}")
 
 def handle_faq_list(event_data):
-    """处理FAQ列表命令: #not list"""
+    """处理FAQ列表命令: #not list [页码]"""
     group_id = event_data['group_id']
     message = event_data['message'].strip()
 
-    if message != '#not list':
+    if not message.startswith('#not list'):
         return
 
-    keys = database_manager.list_all_faq_keys()
-
-    if keys:
-        response = "📚 FAQ 条目列表:\n\n"
-        for i, key in enumerate(keys, 1):
-            response += f"{i}. {key}\n"
-        response += f"\n共 {len(keys)} 个FAQ条目\n💡 使用 #not <key> 查看具体内容"
-        send_group_message(group_id, response)
-    else:
+    page = parse_page(message[len('#not list'):])
+    page_size = config.LIST_PAGE_SIZE
+    keys, total = database_manager.list_faq_keys_page(page, page_size)
+    if not total:
         send_group_message(group_id, "📚 暂无FAQ条目")
+        return
+
+    total_pages = (total + page_size - 1) // page_size
+    if not keys:
+        # 页码超出范围时显示最后一页
+        page = total_pages
+        keys, total = database_manager.list_faq_keys_page(page, page_size)
+
+    reply = ReplyBuilder(group_id, header=f"📚 FAQ 条目列表 ({page}/{total_pages}):\n")
+    start = (page - 1) * page_size
+    for i, key in enumerate(keys, start + 1):
+        reply.add(f"{i}. {key}")
+    reply.add(f"\n共 {total} 个FAQ条目\n💡 使用 #not <key> 查看具体内容")
+    if page < total_pages:
+        reply.add(f"📄 下一页: #not list {page + 1}")
+    reply.send()
+
+def handle_faq_search(event_data):
+    """处理FAQ搜索命令: #not search <关键词...>"""
+    group_id = event_data['group_id']
+    message = event_data['message'].strip()
+
+    query = message[len('#not search'):].strip()
+    if not query:
+        send_group_message(group_id, "❌ 格式错误，请使用: #not search <关键词>")
+        return
+
+    results = database_manager.search_faq(query, limit=10)
+    if not results:
+        send_group_message(group_id, f"🔍 没有找到包含 [{query}] 的FAQ条目")
+        return
+
+    response = f"🔍 搜索 [{query}] 的结果:\n\n"
+    for i, (key, contents) in enumerate(results, 1):
+        preview = plain_text(decode_cq(contents), {'image': '[图片]'}).replace('\n', ' ').strip()
+        if len(preview) > 30:
+            preview = preview[:30] + '…'
+        response += f"{i}. {key}: {preview}\n"
+    response += "\n💡 使用 #not <key> 查看具体内容"
+    send_group_message(group_id, response)
 
 def handle_faq_help(event_data):
     """处理FAQ帮助命令: #not help"""
@@ -102,9 +144,10 @@ def handle_faq_help(event_data):
     help_text = """📖 FAQ系统使用帮助:
 
 🔍 查询FAQ: #not <key>
+🔎 搜索FAQ: #not search <关键词>
 📝 编辑FAQ: #not edit <key> <contents>
 🗑️ 删除FAQ: #not delete <key>
-📋 列表FAQ: #not list
+📋 列表FAQ: #not list [页码]
 ❓ 显示帮助: #not help
 
 💡 说明:
@@ -115,30 +158,43 @@ def handle_faq_help(event_data):
 
     send_group_message(group_id, help_text)
 
-def process_faq_content(content):
-    """处理FAQ内容，将图片URL下载到本地并转换为CQ码格式"""
+def process_faq_content(segments):
+    """处理FAQ内容，将网络图片下载到本地并替换为本地图片段"""
     try:
         # 使用图片管理器处理内容中的图片
-        processed_content = image_manager.process_content_images(content)
-        return processed_content
+        with span('download'):
+            return image_manager.localize_images(segments)
     except Exception as e:
-        print(f"处理FAQ内容失败: {e}")
-        return content
-
-def convert_content_to_cq(content):
-    """将内容中的图片URL转换为CQ码格式（如果还没有转换的话）"""
-    import re
-
-    if '[CQ:image' in content:
-        return content
-
-    image_url_pattern = r'https?://[^\s]+\.(?:jpg|jpeg|png|gif|bmp|webp)(?:\?[^\s]*)?'
-    def replace_image_url(match):
-        url = match.group(0)
-        return f'[CQ:image,url={url}]'
-
-    converted_content = re.sub(image_url_pattern, replace_image_url, content, flags=re.IGNORECASE)
-    return converted_content
+        logger.error("处理FAQ内容失败: %s", e)
+        return segments
+
+def convert_content_to_segments(segments):
+    """
+    规范化FAQ内容的消息段
+
+    图片段只保留URL（NapCat 上报的 file/file_size 等字段不需要存储）；
+    消息中没有图片时，把文本里直接粘贴的图片链接转换为图片段。
+    """
+    if any(segment['type'] == 'image' for segment in segments):
+        return [image_segment(url=segment['data']['url'])
+                if segment['type'] == 'image' and segment['data'].get('url') else segment
+                for segment in segments]
+
+    converted = []
+    for segment in segments:
+        if segment['type'] != 'text':
+            converted.append(segment)
+            continue
+        text = segment_text(segment)
+        position = 0
+        for match in IMAGE_URL_PATTERN.finditer(text):
+            if match.start() > position:
+                converted.append(text_segment(text[position:match.start()]))
+            converted.append(image_segment(url=match.group(0)))
+            position = match.end()
+        if position < len(text):
+            converted.append(text_segment(text[position:]))
+    return converted
 
 def handle_faq_command(event_data):
     """主FAQ命令路由器"""
@@ -158,10 +214,12 @@ def handle_faq_command(event_data):
             reconstructed_message = '#not ' + command_part
             event_data['message'] = reconstructed_message
             handle_faq_delete(event_data)
-        elif command_part == 'list':
+        elif command_part == 'list' or command_part.startswith('list '):
             handle_faq_list(event_data)
         elif command_part == 'help':
             handle_faq_help(event_data)
+        elif command_part == 'search' or command_part.startswith('search '):
+            handle_faq_search(event_data)
         elif command_part and not command_part.startswith(('edit', 'delete', 'list', 'help')):
             # 认为是查询命令
             handle_faq_query(event_data)
@@ -188,15 +246,20 @@ def handle_faq_query(event_data):
         content = database_manager.get_faq_content(key)
 
         if content is None:
-            send_group_message(group_id, f"未找到FAQ条目: {key}")
+            response = f"未找到FAQ条目: {key}"
+            suggestions = database_manager.suggest_faq_keys(key)
+            if suggestions:
+                response += f"\n💡 你是不是想找: {'、'.join(suggestions)}"
+            send_group_message(group_id, response)
             return
 
-        response = f"📖 FAQ [{key}]:\n\n{content}"
+        # 默认发送编辑时生成的缩小版图片
+        response = f"📖 FAQ [{key}]:\n\n{image_manager.compact_content(content)}"
         send_group_message(group_id, response)
 
     except Exception as e:
         error_msg = f"查询FAQ失败: {str(e)}"
-        print(error_msg)
+        logger.error(error_msg)
         group_id = event_data.get('group_id')
         if group_id:
             send_group_message(group_id, error_msg)
\ No newline at end of file
@@ -1,7 +1,8 @@
 # handlers/game_handler.py
 import random
-from utils.file_utils import load_json, dump_json
+from utils.file_utils import load_json, json_transaction
 from utils.api_utils import send_group_message
+from utils.reply_builder import ReplyBuilder, paginate, parse_page
 import config
 
 def handle_help_command(event):
@@ -14,19 +15,19 @@ def handle_help_command(event):
 
         "🎮 游戏管理功能\n"
         "  • #玩什么 - 随机选择游戏\n"
-        "  • #游戏列表 - 查看所有游戏\n"
+        "  • #游戏列表 [页码] - 查看所有游戏\n"
         "  • #添加游戏 <游戏名> - 添加游戏到列表\n"
         "  • #删除游戏 <游戏名> - 从列表删除游戏\n\n"
 
         "📺 万达游戏管理\n"
         "  • #wdhow - 随机选择万达游戏\n"
-        "  • #wdlst - 查看所有万达游戏\n"
+        "  • #wdlst [页码] - 查看所有万达游戏\n"
         "  • #wdadd <游戏名> - 添加万达游戏\n"
         "  • #wddel <游戏名> - 删除万达游戏\n\n"
 
         "🏠 Minecraft 游戏管理\n"
         "  • #mchow - 随机选择MC游戏\n"
-        "  • #mclst - 查看所有MC游戏\n"
+        "  • #mclst [页码] - 查看所有MC游戏\n"
         "  • #mcadd <游戏名> - 添加MC游戏\n"
         "  • #mcdel <游戏名> - 删除MC游戏\n\n"
 
@@ -38,7 +39,7 @@ def handle_help_command(event):
         "👤 @ 功能\n"
         "  • #at - 查询@信息\n"
         "  • #atadd <用户名> - 添加@信息\n"
-        "  • #atls - 列出所有@信息\n"
+        "  • #atls [页码] - 列出所有@信息\n"
         "  • #atdel <用户名> - 删除@信息\n\n"
 
         "🔐 AQL 验证器\n"
@@ -78,8 +79,15 @@ def handle_game_command(event):
             game_lst = load_json(path)
             
             if action == 'list':
-                msg = '\n'.join(str(e) for e in game_lst)
-                send_group_message(group_id, msg)
+                if not game_lst:
+                    send_group_message(group_id, "列表是空的。")
+                    return
+                items, page, total_pages = paginate(game_lst, parse_page(message[len(cmd_prefix):]))
+                reply = ReplyBuilder(group_id)
+                reply.extend(str(e) for e in items)
+                if total_pages > 1:
+                    reply.add(f"📄 第 {page}/{total_pages} 页" + (f"，下一页: {cmd_prefix} {page + 1}" if page < total_pages else ""))
+                reply.send()
                 return
 
             if action == 'random':
@@ -96,20 +104,19 @@ def handle_game_command(event):
                 send_group_message(group_id, "请输入要操作的内容。")
                 return
             
+            # 在文件锁内重新读取列表再修改，避免并发命令互相覆盖
             if action == 'add':
-                if content not in game_lst:
-                    game_lst.append(content)
-                    dump_json(path, game_lst)
-                    send_group_message(group_id, "添加成功")
-                else:
-                    send_group_message(group_id, "这个已经在列表里啦。")
+                with json_transaction(path) as game_lst:
+                    added = content not in game_lst
+                    if added:
+                        game_lst.append(content)
+                send_group_message(group_id, "添加成功" if added else "这个已经在列表里啦。")
                 return
 
             if action == 'del':
-                if content in game_lst:
-                    game_lst.remove(content)
-                    dump_json(path, game_lst)
-                    send_group_message(group_id, "删除成功")
-                else:
-                    send_group_message(group_id, "列表里没有这个哦。")
+                with json_transaction(path) as game_lst:
+                    removed = content in game_lst
+                    if removed:
+                        game_lst.remove(content)
+                send_group_message(group_id, "删除成功" if removed else "列表里没有这个哦。")
                 return
\ No newline at end of file
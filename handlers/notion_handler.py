@@ -1,11 +1,16 @@
 # handlers/notion_handler.py
+import itertools
 import json
 from datetime import datetime
 from services.notion_service import daily_manager, notion_service
-from utils.notion_utils import process_notion_blocks
+from utils.notion_utils import iter_notion_block_texts
 from utils.api_utils import send_group_message
+from utils.reply_builder import ReplyBuilder
 import config
 from typing import List
+from utils.log import get_logger
+
+logger = get_logger(__name__)
 
 
 def handle_daily_command(event_data):
@@ -25,13 +30,16 @@ def handle_daily_command(event_data):
         else:
             # 获取页面内容
             try:
-                page_content = notion_service.get_page_children(today_page["id"])
-                blocks = page_content.get("results", [])
-
-                if blocks:
-                    # 处理页面内容并转换为文本
-                    content_text = process_notion_blocks(blocks)
-                    message = f"📅 今日日记内容:\n\n{content_text}"
+                # 连同折叠块、列表子项等嵌套内容一起加载，每个顶层块的子树加载完就加入回复
+                blocks = notion_service.iter_block_tree(today_page["id"])
+                first = next(blocks, None)
+
+                if first is not None:
+                    # 按块分段发送，每段凑满单条消息长度上限就先发出
+                    reply = ReplyBuilder(event_data.get('group_id'), header="📅 今日日记内容:", separator="\n\n")
+                    reply.extend(iter_notion_block_texts(itertools.chain([first], blocks)))
+                    reply.send()
+                    message = None
                 else:
                     message = "今日日记页面为空，快去添加一些内容吧！"
 
@@ -40,12 +48,12 @@ def handle_daily_command(event_data):
 
         # 发送消息到群
         group_id = event_data.get('group_id')
-        if group_id:
+        if group_id and message:
             send_group_message(group_id, message)
 
     except Exception as e:
         error_msg = f"处理每日命令时出错: {str(e)}"
-        print(error_msg)
+        logger.error(error_msg)
         group_id = event_data.get('group_id')
         if group_id:
             send_group_message(group_id, error_msg)
@@ -72,7 +80,7 @@ def handle_add_daily_command(event_data):
 
     except Exception as e:
         error_msg = f"创建今日日记失败: {str(e)}"
-        print(error_msg)
+        logger.error(error_msg)
         group_id = event_data.get('group_id')
         if group_id:
             send_group_message(group_id, error_msg)
@@ -96,7 +104,7 @@ def handle_update_cover_command(event_data):
 
     except Exception as e:
         error_msg = f"更新封面失败: {str(e)}"
-        print(error_msg)
+        logger.error(error_msg)
         group_id = event_data.get('group_id')
         if group_id:
             send_group_message(group_id, error_msg)
@@ -136,13 +144,16 @@ def handle_weekly_command(event_data):
         else:
             # 获取页面内容
             try:
-                page_content = notion_service.get_page_children(week_page["id"])
-                blocks = page_content.get("results", [])
-
-                if blocks:
-                    # 处理页面内容并转换为文本
-                    content_text = process_notion_blocks(blocks)
-                    message = f"📅 本周周记内容:\n\n{content_text}"
+                # 连同折叠块、列表子项等嵌套内容一起加载，每个顶层块的子树加载完就加入回复
+                blocks = notion_service.iter_block_tree(week_page["id"])
+                first = next(blocks, None)
+
+                if first is not None:
+                    # 按块分段发送，每段凑满单条消息长度上限就先发出
+                    reply = ReplyBuilder(event_data.get('group_id'), header="📅 本周周记内容:", separator="\n\n")
+                    reply.extend(iter_notion_block_texts(itertools.chain([first], blocks)))
+                    reply.send()
+                    message = None
                 else:
                     message = f"📅 本周周记页面为空，快去添加一些内容吧！\n周名称: {week_name}"
 
@@ -151,12 +162,12 @@ def handle_weekly_command(event_data):
 
         # 发送消息到群
         group_id = event_data.get('group_id')
-        if group_id:
+        if group_id and message:
             send_group_message(group_id, message)
 
     except Exception as e:
         error_msg = f"❌ 处理周记命令时出错: {str(e)}"
-        print(error_msg)
+        logger.error(error_msg)
         group_id = event_data.get('group_id')
         if group_id:
             send_group_message(group_id, error_msg)
@@ -197,7 +208,7 @@ def handle_add_weekly_command(event_data):
 
     except Exception as e:
         error_msg = f"❌ 创建本周周记失败: {str(e)}"
-        print(error_msg)
+        logger.error(error_msg)
         group_id = event_data.get('group_id')
         if group_id:
             send_group_message(group_id, error_msg)
@@ -0,0 +1,179 @@
+# services/async_notion_service.py
+import asyncio
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+import config
+from services.notion_service import NotionService, has_nested_blocks, page_params
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+
+async def aiter_paginated(fetch: Callable[[Optional[str]], Awaitable[Dict[str, Any]]]) -> AsyncIterator[Dict[str, Any]]:
+    """iter_paginated 的异步版本：按 has_more / next_cursor 逐页请求并产出 results"""
+    cursor = None
+    while True:
+        page = await fetch(cursor)
+        for item in page.get("results", []):
+            yield item
+        cursor = page.get("next_cursor")
+        if not page.get("has_more") or not cursor:
+            return
+
+
+class AsyncNotionService(NotionService):
+    """
+    Notion API 异步服务类，供 ASGI 入口使用
+
+    请求头、数据库映射与 NotionService 相同；请求改用 httpx.AsyncClient，
+    重试等待使用 asyncio.sleep，等待 Notion 响应期间不占用线程。
+    """
+
+    def __init__(self, token_type="default"):
+        self.base_url = "https://api.notion.com/v1/"
+        self.token_type = token_type
+        self._init_headers()
+        self.proxy = getattr(config, 'NOTION_PROXY', None) or None
+        self.timeout = 30
+        self.max_retries = 3
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # AsyncClient 绑定创建它的事件循环，首次请求时才创建
+        if self._client is None:
+            # 与同步版 query_database 一致，不校验证书（代理环境下需要）
+            self._client = httpx.AsyncClient(proxy=self.proxy, timeout=self.timeout, verify=False)
+        return self._client
+
+    async def _make_request_with_retry(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """带重试机制的请求方法"""
+        for attempt in range(self.max_retries):
+            delay = self._throttle_delay()
+            if delay:
+                await asyncio.sleep(delay)
+            try:
+                response = await self.client.request(method, url, headers=self.headers, **kwargs)
+                response.raise_for_status()
+                return response
+            except httpx.ConnectError as e:
+                if attempt == self.max_retries - 1:
+                    raise Exception(f"Connection failed after {self.max_retries} attempts: {e}")
+                logger.warning("Connection attempt %d failed, retrying in 2 seconds...", attempt + 1)
+                await asyncio.sleep(2)
+            except httpx.TimeoutException as e:
+                if attempt == self.max_retries - 1:
+                    raise Exception(f"Request timeout after {self.max_retries} attempts: {e}")
+                logger.warning("Request timeout attempt %d, retrying in 2 seconds...", attempt + 1)
+                await asyncio.sleep(2)
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code >= 500:
+                    if attempt == self.max_retries - 1:
+                        raise Exception(f"Server error after {self.max_retries} attempts: {e}")
+                    logger.warning("Server error (status %s) attempt %d, retrying in 3 seconds...", e.response.status_code, attempt + 1)
+                    await asyncio.sleep(3)
+                else:
+                    # 对于客户端错误（如401，404），直接抛出
+                    raise Exception(f"HTTP error: {e}")
+            except Exception as e:
+                if attempt == self.max_retries - 1:
+                    raise Exception(f"Request failed after {self.max_retries} attempts: {e}")
+                logger.warning("Request attempt %d failed: %s, retrying in 2 seconds...", attempt + 1, e)
+                await asyncio.sleep(2)
+
+        raise Exception(f"Request failed after {self.max_retries} attempts")
+
+    async def query_database(self, database_name: str, filter_json: Optional[Dict] = None,
+                             start_cursor: Optional[str] = None, page_size: Optional[int] = None) -> Dict[str, Any]:
+        """查询数据库（单页，完整结果用 iter_database）"""
+        database_id = self._get_database_id(database_name)
+        url = f"{self.base_url}databases/{database_id}/query/"
+
+        payload = page_params(start_cursor, page_size)
+        if filter_json:
+            payload["filter"] = filter_json
+
+        response = await self._make_request_with_retry("POST", url, json=payload)
+        return response.json()
+
+    def iter_database(self, database_name: str, filter_json: Optional[Dict] = None,
+                      page_size: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        """逐页查询数据库，按顺序产出全部结果（async for）"""
+        return aiter_paginated(lambda cursor: self.query_database(database_name, filter_json, cursor, page_size))
+
+    async def add_page(self, database_name: str, page_data: Dict[str, Any]) -> Dict[str, Any]:
+        """添加页面"""
+        page_data["parent"] = {
+            "type": "database_id",
+            "database_id": self._get_database_id(database_name)
+        }
+        response = await self._make_request_with_retry("POST", f"{self.base_url}pages/", json=page_data)
+        return response.json()
+
+    async def update_page(self, page_id: str, update_data: Dict[str, Any]) -> Dict[str, Any]:
+        """更新页面"""
+        response = await self._make_request_with_retry("PATCH", f"{self.base_url}pages/{page_id}", json=update_data)
+        return response.json()
+
+    async def get_page_children(self, page_id: str, start_cursor: Optional[str] = None,
+                                page_size: Optional[int] = None) -> Dict[str, Any]:
+        """获取页面子项（单页，完整结果用 iter_page_children）"""
+        response = await self._make_request_with_retry("GET", f"{self.base_url}blocks/{page_id}/children",
+                                                       params=page_params(start_cursor, page_size))
+        return response.json()
+
+    def iter_page_children(self, page_id: str, page_size: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        """逐页获取页面的全部子块，按顺序产出（async for）"""
+        return aiter_paginated(lambda cursor: self.get_page_children(page_id, cursor, page_size))
+
+    async def iter_block_tree(self, page_id: str, max_depth: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        """按页面顺序逐个产出加载完子树的顶层块（同 NotionService.iter_block_tree），并发数由信号量限制"""
+        tree_config = config.NOTION_BLOCK_TREE
+        max_depth = tree_config['max_depth'] if max_depth is None else max_depth
+        if not tree_config['enabled']:
+            max_depth = 0
+        slots = asyncio.Semaphore(tree_config['concurrency'])
+
+        async def attach(block, depth):
+            async with slots:
+                block["children"] = [child async for child in self.iter_page_children(block["id"])]
+            if depth < max_depth:
+                await asyncio.gather(*(attach(child, depth + 1) for child in block["children"]
+                                       if has_nested_blocks(child)))
+
+        waiting = deque()  # (顶层块, 加载子树的任务或 None)
+        try:
+            async for block in self.iter_page_children(page_id):
+                task = asyncio.create_task(attach(block, 1)) if has_nested_blocks(block) and max_depth > 0 else None
+                waiting.append((block, task))
+                while waiting and (waiting[0][1] is None or waiting[0][1].done()):
+                    block, task = waiting.popleft()
+                    if task is not None:
+                        await task
+                    yield block
+            while waiting:
+                block, task = waiting.popleft()
+                if task is not None:
+                    await task
+                yield block
+        finally:
+            for _, task in waiting:
+                if task is not None:
+                    task.cancel()
+
+    async def load_block_tree(self, page_id: str, max_depth: Optional[int] = None) -> List[Dict[str, Any]]:
+        """一次加载页面的完整块树（见 iter_block_tree）"""
+        return [block async for block in self.iter_block_tree(page_id, max_depth)]
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# 全局异步服务实例（与 notion_service.notion_service / daily_manager.notion_service 对应）
+async_notion_service = AsyncNotionService()
+async_diary_service = AsyncNotionService(token_type="diary")
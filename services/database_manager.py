@@ -1,24 +1,149 @@
 # services/database_manager.py
 import sqlite3
 import os
-from typing import List, Optional
+import queue
+import re
+import threading
+import time
+import unicodedata
+from contextlib import contextmanager
+from difflib import SequenceMatcher
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import config
+from utils.lru_cache import LRUCache
+from utils.message import iter_cq_codes, local_file
+from utils.tracing import span
+from utils.log import get_logger
+
+logger = get_logger(__name__)
 
 class DatabaseManager:
     """本地FAQ数据库管理器"""
 
-    def __init__(self, db_path: str = "data/faq.db"):
+    # 固定的SQL文本，配合连接上的语句缓存重复使用已编译的语句
+    # 查询和删除都走 key_norm 唯一索引，key 列只保留最近一次写入时的原始写法用于展示
+    _SQL_GET = 'SELECT contents FROM faq WHERE key_norm = ?'
+    # 使用 UPSERT 而不是 INSERT OR REPLACE：REPLACE 删除旧行时不会触发删除触发器，全文索引会残留旧内容
+    _SQL_SET = '''
+        INSERT INTO faq (key, key_norm, contents, updated_at)
+        VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(key_norm) DO UPDATE SET
+            key = excluded.key, contents = excluded.contents, updated_at = CURRENT_TIMESTAMP
+    '''
+    _SQL_DELETE = 'DELETE FROM faq WHERE key_norm = ?'
+    _SQL_LIST_KEYS = 'SELECT key FROM faq ORDER BY key'
+    _SQL_LIST_KEYS_PAGE = 'SELECT key FROM faq ORDER BY key LIMIT ? OFFSET ?'
+    _SQL_COUNT = 'SELECT COUNT(*) FROM faq'
+
+    # 数据库结构版本，记录在 PRAGMA user_version 中
+    SCHEMA_VERSION = 2
+
+    # 图片引用计数：引用数降为0时记录时间，垃圾回收按时间分批删除
+    _SQL_IMAGE_ADD_REF = '''
+        INSERT INTO faq_images (filename, refcount, orphaned_at) VALUES (?, 1, NULL)
+        ON CONFLICT(filename) DO UPDATE SET refcount = refcount + 1, orphaned_at = NULL
+    '''
+    _SQL_IMAGE_DROP_REF = '''
+        UPDATE faq_images
+        SET refcount = refcount - 1,
+            orphaned_at = CASE WHEN refcount - 1 <= 0 THEN ? ELSE NULL END
+        WHERE filename = ?
+    '''
+
+    # 全文索引：trigram 分词同时适用于中文子串搜索和key的模糊匹配
+    _SQL_CREATE_FTS = [
+        '''
+        CREATE VIRTUAL TABLE IF NOT EXISTS faq_fts USING fts5(
+            key, contents, content='faq', content_rowid='id', tokenize='trigram'
+        )
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS faq_fts_insert AFTER INSERT ON faq BEGIN
+            INSERT INTO faq_fts (rowid, key, contents) VALUES (new.id, new.key, new.contents);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS faq_fts_delete AFTER DELETE ON faq BEGIN
+            INSERT INTO faq_fts (faq_fts, rowid, key, contents) VALUES ('delete', old.id, old.key, old.contents);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS faq_fts_update AFTER UPDATE ON faq BEGIN
+            INSERT INTO faq_fts (faq_fts, rowid, key, contents) VALUES ('delete', old.id, old.key, old.contents);
+            INSERT INTO faq_fts (rowid, key, contents) VALUES (new.id, new.key, new.contents);
+        END
+        ''',
+    ]
+
+    def __init__(self, db_path: str = "data/faq.db", pool_size: int = None):
         self.db_path = db_path
+        self.pool_size = pool_size or config.FAQ_DB_POOL_SIZE
+        # 空闲连接池，按需创建，最多 pool_size 个连接
+        self._pool = queue.LifoQueue(maxsize=self.pool_size)
+        self._created = 0
+        self._pool_lock = threading.Lock()
+        # 当前SQLite是否支持FTS5，不支持时搜索退化为LIKE扫描
+        self.has_fts = False
+        # 热点FAQ内容缓存，写入和删除时按key精确失效
+        self._cache = LRUCache(max_size=config.FAQ_CACHE_SIZE, ttl=config.FAQ_CACHE_TTL)
         # 确保数据目录存在
         os.makedirs(os.path.dirname(db_path), exist_ok=True)
         self._init_database()
 
+    def _connect(self) -> sqlite3.Connection:
+        """创建一个新的数据库连接"""
+        conn = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False, cached_statements=64)
+        # WAL 模式下读不阻塞写、写不阻塞读；WAL 下 synchronous=NORMAL 仍能保证崩溃一致性
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(f'PRAGMA synchronous={config.FAQ_DB_SYNCHRONOUS}')
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        """从连接池借出一个连接，用完后归还"""
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._pool_lock:
+                if self._created < self.pool_size:
+                    self._created += 1
+                    create = True
+                else:
+                    create = False
+            if create:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._pool_lock:
+                        self._created -= 1
+                    raise
+            else:
+                conn = self._pool.get()
+
+        try:
+            with span('storage'):
+                yield conn
+        finally:
+            self._pool.put(conn)
+
+    def close(self):
+        """关闭所有空闲连接"""
+        while True:
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._pool_lock:
+                self._created -= 1
+
     def _init_database(self):
         """初始化数据库和表结构"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-
+        with self._connection() as conn, conn:
             # 创建FAQ表
-            cursor.execute('''
+            conn.execute('''
                 CREATE TABLE IF NOT EXISTS faq (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     key TEXT NOT NULL UNIQUE,
@@ -28,58 +153,323 @@ class DatabaseManager:
                 )
             ''')
 
-            conn.commit()
+        self._migrate()
+        self._init_fts()
+
+    @staticmethod
+    def normalize_key(key: str) -> str:
+        """规范化FAQ key：NFKC 统一全角/半角和兼容字符，casefold 忽略大小写"""
+        return unicodedata.normalize('NFKC', key.strip()).casefold()
+
+    def _migrate(self):
+        """按 user_version 依次升级数据库结构"""
+        with self._connection() as conn, conn:
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+            if version < 1:
+                self._migrate_key_norm(conn)
+            if version < 2:
+                self._migrate_image_refs(conn)
+            if version < self.SCHEMA_VERSION:
+                conn.execute(f'PRAGMA user_version = {self.SCHEMA_VERSION}')
+
+    def _migrate_key_norm(self, conn: sqlite3.Connection):
+        """版本1：增加规范化key列及其唯一索引，并回填已有数据"""
+        columns = [row[1] for row in conn.execute('PRAGMA table_info(faq)')]
+        if 'key_norm' not in columns:
+            conn.execute('ALTER TABLE faq ADD COLUMN key_norm TEXT')
+
+        # 旧数据中仅大小写/全半角不同的key会规范化成同一个：最近更新的一条保留原key，
+        # 其余的改名为 key_2、key_3 ...（避开所有已有key），内容不丢失
+        rows = conn.execute('SELECT id, key FROM faq ORDER BY updated_at DESC, id DESC').fetchall()
+        taken = {self.normalize_key(key) for _, key in rows}
+        seen = set()
+        for row_id, key in rows:
+            key_norm = self.normalize_key(key)
+            if key_norm in seen:
+                suffix = 2
+                while self.normalize_key(f"{key}_{suffix}") in taken:
+                    suffix += 1
+                new_key = f"{key}_{suffix}"
+                key_norm = self.normalize_key(new_key)
+                taken.add(key_norm)
+                logger.warning("FAQ条目 [%s] 与已有条目规范化后重复，迁移时重命名为 [%s]", key, new_key)
+                conn.execute('UPDATE faq SET key = ? WHERE id = ?', (new_key, row_id))
+            seen.add(key_norm)
+            conn.execute('UPDATE faq SET key_norm = ? WHERE id = ?', (key_norm, row_id))
+
+        conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_faq_key_norm ON faq (key_norm)')
+
+    def _migrate_image_refs(self, conn: sqlite3.Connection):
+        """版本2：建立图片引用索引，并根据已有FAQ内容回填引用计数"""
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS faq_images (
+                filename TEXT PRIMARY KEY,
+                refcount INTEGER NOT NULL DEFAULT 0,
+                orphaned_at REAL
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS faq_image_refs (
+                faq_id INTEGER NOT NULL,
+                filename TEXT NOT NULL,
+                PRIMARY KEY (faq_id, filename)
+            )
+        ''')
+        # 只索引待回收的图片，垃圾回收按 orphaned_at 顺序取一批
+        conn.execute('''
+            CREATE INDEX IF NOT EXISTS idx_faq_images_orphaned
+            ON faq_images (orphaned_at) WHERE refcount <= 0
+        ''')
+
+        for faq_id, contents in conn.execute('SELECT id, contents FROM faq').fetchall():
+            for filename in self.extract_image_files(contents):
+                conn.execute('INSERT OR IGNORE INTO faq_image_refs (faq_id, filename) VALUES (?, ?)',
+                             (faq_id, filename))
+                conn.execute(self._SQL_IMAGE_ADD_REF, (filename,))
+
+    def _init_fts(self):
+        """初始化全文索引及同步触发器，首次创建时为已有数据建立索引"""
+        try:
+            with self._connection() as conn, conn:
+                exists = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'faq_fts'"
+                ).fetchone()
+                for sql in self._SQL_CREATE_FTS:
+                    conn.execute(sql)
+                if not exists:
+                    conn.execute("INSERT INTO faq_fts (faq_fts) VALUES ('rebuild')")
+            self.has_fts = True
+        except sqlite3.OperationalError as e:
+            logger.warning("FAQ全文索引不可用，搜索将使用LIKE扫描: %s", e)
 
     def get_faq_content(self, key: str) -> Optional[str]:
-        """根据key获取FAQ内容"""
+        """根据key获取FAQ内容（不区分大小写和全半角）"""
+        key = self.normalize_key(key)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        generation = self._cache.generation
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('SELECT contents FROM faq WHERE key = ?', (key,))
-                row = cursor.fetchone()
-                return row[0] if row else None
+            with self._connection() as conn:
+                row = conn.execute(self._SQL_GET, (key,)).fetchone()
+            if row is None:
+                return None
+            self._cache.put(key, row[0], generation=generation)
+            return row[0]
         except Exception as e:
-            print(f"获取FAQ内容失败: {e}")
+            logger.error("获取FAQ内容失败: %s", e)
             return None
 
+    @classmethod
+    def extract_image_files(cls, contents: str) -> List[str]:
+        """提取FAQ内容引用的本地图片文件名（去重）"""
+        # 本地图片形如 [CQ:image,file=file:///data/faq_images/<文件名>]
+        paths = [path for path in map(local_file, iter_cq_codes(contents, 'image')) if path]
+        return list(dict.fromkeys(re.split(r'[\\/]', path)[-1] for path in paths))
+
     def set_faq_content(self, key: str, contents: str) -> bool:
-        """设置或更新FAQ内容"""
+        """设置或更新FAQ内容，并在同一事务中更新图片引用计数"""
+        key = key.strip()
+        key_norm = self.normalize_key(key)
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT OR REPLACE INTO faq (key, contents, updated_at)
-                    VALUES (?, ?, CURRENT_TIMESTAMP)
-                ''', (key, contents))
-                conn.commit()
-                return True
+            with self._connection() as conn, conn:
+                conn.execute(self._SQL_SET, (key, key_norm, contents))
+                faq_id = conn.execute('SELECT id FROM faq WHERE key_norm = ?', (key_norm,)).fetchone()[0]
+
+                old_files = {row[0] for row in conn.execute(
+                    'SELECT filename FROM faq_image_refs WHERE faq_id = ?', (faq_id,))}
+                new_files = set(self.extract_image_files(contents))
+                now = time.time()
+                for filename in new_files - old_files:
+                    conn.execute('INSERT INTO faq_image_refs (faq_id, filename) VALUES (?, ?)', (faq_id, filename))
+                    conn.execute(self._SQL_IMAGE_ADD_REF, (filename,))
+                for filename in old_files - new_files:
+                    conn.execute('DELETE FROM faq_image_refs WHERE faq_id = ? AND filename = ?', (faq_id, filename))
+                    conn.execute(self._SQL_IMAGE_DROP_REF, (now, filename))
+            self._cache.invalidate(key_norm)
+            return True
         except Exception as e:
-            print(f"设置FAQ内容失败: {e}")
+            logger.error("设置FAQ内容失败: %s", e)
             return False
 
     def delete_faq_content(self, key: str) -> bool:
         """删除FAQ条目"""
+        key = self.normalize_key(key)
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('DELETE FROM faq WHERE key = ?', (key,))
-                conn.commit()
-                return cursor.rowcount > 0
+            with self._connection() as conn, conn:
+                row = conn.execute('SELECT id FROM faq WHERE key_norm = ?', (key,)).fetchone()
+                if row is not None:
+                    now = time.time()
+                    for (filename,) in conn.execute(
+                            'SELECT filename FROM faq_image_refs WHERE faq_id = ?', (row[0],)).fetchall():
+                        conn.execute(self._SQL_IMAGE_DROP_REF, (now, filename))
+                    conn.execute('DELETE FROM faq_image_refs WHERE faq_id = ?', (row[0],))
+                cursor = conn.execute(self._SQL_DELETE, (key,))
+            self._cache.invalidate(key)
+            return cursor.rowcount > 0
         except Exception as e:
-            print(f"删除FAQ内容失败: {e}")
+            logger.error("删除FAQ内容失败: %s", e)
             return False
 
+    @staticmethod
+    def _fts_phrase(text: str) -> str:
+        """转义为FTS5短语"""
+        return '"' + text.replace('"', '""') + '"'
+
+    @staticmethod
+    def _like_pattern(text: str) -> str:
+        """转义为LIKE子串匹配模式"""
+        escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        return f"%{escaped}%"
+
+    def search_faq(self, query: str, limit: int = 10) -> List[Tuple[str, str]]:
+        """按关键词全文搜索FAQ，返回 (key, contents) 列表，所有关键词都需命中"""
+        terms = query.split()
+        if not terms:
+            return []
+
+        # trigram 索引只能处理不少于3个字符的词，更短的词用LIKE在候选结果上过滤
+        long_terms = [t for t in terms if len(t) >= 3]
+        short_terms = [t for t in terms if len(t) < 3]
+
+        conditions = []
+        params: List[Any] = []
+        for term in short_terms:
+            conditions.append("(faq.key LIKE ? ESCAPE '\\' OR faq.contents LIKE ? ESCAPE '\\')")
+            pattern = self._like_pattern(term)
+            params.extend([pattern, pattern])
+
+        if self.has_fts and long_terms:
+            sql = (
+                "SELECT faq.key, faq.contents FROM faq_fts JOIN faq ON faq.id = faq_fts.rowid "
+                "WHERE faq_fts MATCH ?"
+                + "".join(" AND " + c for c in conditions)
+                + " ORDER BY bm25(faq_fts, 10.0, 1.0) LIMIT ?"
+            )
+            params.insert(0, " AND ".join(self._fts_phrase(t) for t in long_terms))
+        else:
+            for term in long_terms:
+                conditions.append("(faq.key LIKE ? ESCAPE '\\' OR faq.contents LIKE ? ESCAPE '\\')")
+                pattern = self._like_pattern(term)
+                params.extend([pattern, pattern])
+            sql = "SELECT faq.key, faq.contents FROM faq WHERE " + " AND ".join(conditions) + " ORDER BY faq.key LIMIT ?"
+        params.append(limit)
+
+        try:
+            with self._connection() as conn:
+                return [(row[0], row[1]) for row in conn.execute(sql, params).fetchall()]
+        except Exception as e:
+            logger.error("搜索FAQ失败: %s", e)
+            return []
+
+    def suggest_faq_keys(self, key: str, limit: int = 5, min_ratio: float = 0.5) -> List[str]:
+        """为未命中的key寻找相近的已有key（"你是不是想找"）"""
+        key = key.strip()
+        if not key:
+            return []
+
+        try:
+            with self._connection() as conn:
+                if self.has_fts and len(key) >= 3:
+                    # 用key的所有trigram做OR查询召回候选，再按编辑相似度重排
+                    trigrams = {key[i:i + 3] for i in range(len(key) - 2)}
+                    match = "key : (" + " OR ".join(self._fts_phrase(t) for t in trigrams) + ")"
+                    rows = conn.execute(
+                        "SELECT faq.key FROM faq_fts JOIN faq ON faq.id = faq_fts.rowid "
+                        "WHERE faq_fts MATCH ? ORDER BY bm25(faq_fts, 10.0, 1.0) LIMIT 50",
+                        (match,)
+                    ).fetchall()
+                else:
+                    # 过短的key无法生成trigram，用包含任一字符的key作为候选
+                    chars = list(dict.fromkeys(key))
+                    where = " OR ".join("key LIKE ? ESCAPE '\\'" for _ in chars)
+                    rows = conn.execute(
+                        f"SELECT key FROM faq WHERE {where} LIMIT 200",
+                        [self._like_pattern(c) for c in chars]
+                    ).fetchall()
+        except Exception as e:
+            logger.error("查找相似FAQ失败: %s", e)
+            return []
+
+        key_norm = self.normalize_key(key)
+        scored = []
+        for (candidate,) in rows:
+            candidate_norm = self.normalize_key(candidate)
+            ratio = SequenceMatcher(None, key_norm, candidate_norm).ratio()
+            if ratio >= min_ratio and candidate_norm != key_norm:
+                scored.append((ratio, candidate))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [candidate for _, candidate in scored[:limit]]
+
+    def register_image_file(self, filename: str):
+        """
+        登记将要被FAQ使用的图片文件，未被任何FAQ引用时会在宽限期后被回收
+
+        复用已有文件时也要调用：无引用的图片从此刻重新计算宽限期，
+        避免在下载完成到FAQ保存之间被垃圾回收删除。
+        """
+        try:
+            with self._connection() as conn, conn:
+                conn.execute(
+                    'INSERT INTO faq_images (filename, refcount, orphaned_at) VALUES (?, 0, ?) '
+                    'ON CONFLICT(filename) DO UPDATE SET orphaned_at = excluded.orphaned_at '
+                    'WHERE faq_images.refcount <= 0',
+                    (filename, time.time())
+                )
+        except Exception as e:
+            logger.error("登记FAQ图片失败: %s - %s", filename, e)
+
+    def collect_orphan_images(self, batch_size: int, grace_seconds: float,
+                              remove_file: Callable[[str], bool]) -> List[str]:
+        """
+        回收一批无引用的图片
+
+        取出引用数为0且超过宽限期的图片（最多 batch_size 个），逐个调用 remove_file 删除文件，
+        删除成功（或文件已不存在）时移除索引记录。整个过程持有写锁，期间的FAQ编辑会等待回收完成。
+        返回已回收的文件名列表。
+        """
+        removed = []
+        try:
+            with self._connection() as conn, conn:
+                conn.execute('BEGIN IMMEDIATE')
+                rows = conn.execute(
+                    'SELECT filename FROM faq_images WHERE refcount <= 0 AND orphaned_at <= ? '
+                    'ORDER BY orphaned_at LIMIT ?',
+                    (time.time() - grace_seconds, batch_size)
+                ).fetchall()
+                for (filename,) in rows:
+                    if remove_file(filename):
+                        conn.execute('DELETE FROM faq_images WHERE filename = ? AND refcount <= 0', (filename,))
+                        removed.append(filename)
+        except Exception as e:
+            logger.error("回收FAQ图片失败: %s", e)
+        return removed
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """获取FAQ缓存的命中统计"""
+        return self._cache.stats()
+
     def list_all_faq_keys(self) -> List[str]:
         """获取所有FAQ key列表"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('SELECT key FROM faq ORDER BY key')
-                rows = cursor.fetchall()
+            with self._connection() as conn:
+                rows = conn.execute(self._SQL_LIST_KEYS).fetchall()
                 return [row[0] for row in rows]
         except Exception as e:
-            print(f"获取FAQ列表失败: {e}")
+            logger.error("获取FAQ列表失败: %s", e)
             return []
 
+    def list_faq_keys_page(self, page: int, page_size: int) -> Tuple[List[str], int]:
+        """按 key 排序分页获取FAQ key，返回 (本页key列表, 条目总数)"""
+        try:
+            with self._connection() as conn:
+                total = conn.execute(self._SQL_COUNT).fetchone()[0]
+                rows = conn.execute(self._SQL_LIST_KEYS_PAGE, (page_size, (page - 1) * page_size)).fetchall()
+                return [row[0] for row in rows], total
+        except Exception as e:
+            logger.error("获取FAQ列表失败: %s", e)
+            return [], 0
+
 # 全局FAQ数据库管理器实例
-database_manager = DatabaseManager()
\ No newline at end of file
+database_manager = DatabaseManager()
@@ -1,46 +1,58 @@
 # services/notion_scheduler.py
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.schedulers.blocking import BlockingScheduler
-from datetime import datetime, timedelta
 from services.notion_service import daily_manager
+import config
 import time
+from utils.log import get_logger
+
+logger = get_logger(__name__)
 
 
 def add_today_job():
     """添加今天的日记页面（带封面）"""
     try:
-        print(f"[{datetime.now()}] 开始创建今日日记页面...")
+        logger.info("开始创建今日日记页面...")
         result = daily_manager.add_today_page(with_cover=True)
-        print(f"[{datetime.now()}] 今日日记页面创建成功: {result['id']}")
+        logger.info("今日日记页面创建成功: %s", result['id'])
     except Exception as e:
-        print(f"[{datetime.now()}] 创建今日日记页面失败: {e}")
+        logger.error("创建今日日记页面失败: %s", e)
 
 
 def add_next_week_job():
     """添加下周的页面（如果需要的话）"""
     try:
-        print(f"[{datetime.now()}] 检查是否需要创建当前周页面...")
+        logger.info("检查是否需要创建当前周页面...")
         from services.notion_service import weekly_manager
         success = weekly_manager.check_and_create_current_week()
         if success:
-            print(f"[{datetime.now()}] 当前周页面检查/创建完成")
+            logger.info("当前周页面检查/创建完成")
         else:
-            print(f"[{datetime.now()}] 当前周页面处理失败")
+            logger.error("当前周页面处理失败")
     except Exception as e:
-        print(f"[{datetime.now()}] 下周页面处理失败: {e}")
+        logger.error("下周页面处理失败: %s", e)
 
 
 def update_daily_cover_job():
     """更新今日日记封面"""
     try:
-        print(f"[{datetime.now()}] 开始更新今日日记封面...")
+        logger.info("开始更新今日日记封面...")
         success = daily_manager.update_daily_cover()
         if success:
-            print(f"[{datetime.now()}] 今日日记封面更新成功")
+            logger.info("今日日记封面更新成功")
         else:
-            print(f"[{datetime.now()}] 今日日记封面更新失败")
+            logger.error("今日日记封面更新失败")
+    except Exception as e:
+        logger.error("更新封面失败: %s", e)
+
+
+def cleanup_faq_images_job():
+    """增量回收不再被FAQ引用的图片"""
+    try:
+        from utils.image_utils import image_manager
+        image_manager.collect_garbage()
     except Exception as e:
-        print(f"[{datetime.now()}] 更新封面失败: {e}")
+        logger.error("回收FAQ图片失败: %s", e)
 
 
 class NotionScheduler:
@@ -90,17 +102,25 @@ class NotionScheduler:
             id='update_cover_job'
         )
 
+        # 定期分批回收无引用的FAQ图片
+        self.scheduler.add_job(
+            cleanup_faq_images_job,
+            'interval',
+            minutes=config.FAQ_IMAGE_GC['interval_minutes'],
+            id='cleanup_faq_images_job'
+        )
+
     def start(self):
         """启动调度器"""
-        print(f"[{datetime.now()}] 启动 Notion 定时任务调度器...")
+        logger.info("启动 Notion 定时任务调度器...")
         self.scheduler.start()
-        print(f"[{datetime.now()}] Notion 定时任务调度器已启动")
+        logger.info("Notion 定时任务调度器已启动")
 
     def stop(self):
         """停止调度器"""
-        print(f"[{datetime.now()}] 停止 Notion 定时任务调度器...")
+        logger.info("停止 Notion 定时任务调度器...")
         self.scheduler.shutdown()
-        print(f"[{datetime.now()}] Notion 定时任务调度器已停止")
+        logger.info("Notion 定时任务调度器已停止")
 
     def add_job(self, func, trigger, **kwargs):
         """添加自定义任务"""
@@ -110,9 +130,9 @@ class NotionScheduler:
         """移除任务"""
         try:
             self.scheduler.remove_job(job_id)
-            print(f"[{datetime.now()}] 任务 {job_id} 已移除")
+            logger.info("任务 %s 已移除", job_id)
         except Exception as e:
-            print(f"[{datetime.now()}] 移除任务 {job_id} 失败: {e}")
+            logger.error("移除任务 %s 失败: %s", job_id, e)
 
 
 # 全局调度器实例
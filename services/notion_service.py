@@ -1,11 +1,52 @@
 # services/notion_service.py
 import requests
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime, timedelta, date
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, Iterator, List, Optional
 import json
 import os
 import time
 import config
+from utils.log import get_logger
+from utils.rate_limiter import TokenBucketLimiter
+
+logger = get_logger(__name__)
+
+# 所有 Notion 请求共用的令牌桶，按 token 类型分别计数（同步和异步服务共用）
+request_limiter = TokenBucketLimiter(config.NOTION_RATE_LIMIT['rate'], config.NOTION_RATE_LIMIT['burst'])
+
+
+# 子页面、子数据库的子块是另一个页面的全部内容：块树只保留它们的标题，不展开
+SUBPAGE_BLOCK_TYPES = {"child_page", "child_database"}
+
+
+def has_nested_blocks(block: Dict[str, Any]) -> bool:
+    """块树加载时是否需要获取该块的子块"""
+    return bool(block.get("has_children")) and block.get("type") not in SUBPAGE_BLOCK_TYPES
+
+
+def page_params(start_cursor: Optional[str] = None, page_size: Optional[int] = None) -> Dict[str, Any]:
+    """分页参数：page_size 缺省取 config.NOTION_PAGE_SIZE，start_cursor 为上一页返回的 next_cursor"""
+    params: Dict[str, Any] = {"page_size": page_size or config.NOTION_PAGE_SIZE}
+    if start_cursor:
+        params["start_cursor"] = start_cursor
+    return params
+
+
+def iter_paginated(fetch: Callable[[Optional[str]], Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """
+    按 has_more / next_cursor 逐页请求，依次产出每一页的 results
+
+    fetch(cursor) 请求一页并返回 Notion 的列表响应；只有消费到当前页末尾时才请求下一页。
+    """
+    cursor = None
+    while True:
+        page = fetch(cursor)
+        yield from page.get("results", [])
+        cursor = page.get("next_cursor")
+        if not page.get("has_more") or not cursor:
+            return
 
 
 class NotionService:
@@ -39,11 +80,20 @@ class NotionService:
         }
         # print(self.headers)  # 注释掉调试输出
 
+    def _throttle_delay(self) -> float:
+        """预约一次请求，返回按 Notion 速率限制需要等待的秒数"""
+        if not config.NOTION_RATE_LIMIT['enabled']:
+            return 0.0
+        return request_limiter.reserve(self.token_type)
+
     def _make_request_with_retry(self, method: str, url: str, **kwargs) -> requests.Response:
         """带重试机制的请求方法"""
         kwargs.setdefault('timeout', self.timeout)
 
         for attempt in range(self.max_retries):
+            delay = self._throttle_delay()
+            if delay:
+                time.sleep(delay)
             try:
                 response = self.session.request(method, url, headers=self.headers, **kwargs)
                 response.raise_for_status()
@@ -51,18 +101,18 @@ class NotionService:
             except requests.exceptions.ConnectionError as e:
                 if attempt == self.max_retries - 1:
                     raise Exception(f"Connection failed after {self.max_retries} attempts: {e}")
-                print(f"Connection attempt {attempt + 1} failed, retrying in 2 seconds...")
+                logger.warning("Connection attempt %d failed, retrying in 2 seconds...", attempt + 1)
                 time.sleep(2)
             except requests.exceptions.Timeout as e:
                 if attempt == self.max_retries - 1:
                     raise Exception(f"Request timeout after {self.max_retries} attempts: {e}")
-                print(f"Request timeout attempt {attempt + 1}, retrying in 2 seconds...")
+                logger.warning("Request timeout attempt %d, retrying in 2 seconds...", attempt + 1)
                 time.sleep(2)
             except requests.exceptions.HTTPError as e:
                 if e.response.status_code >= 500:
                     if attempt == self.max_retries - 1:
                         raise Exception(f"Server error after {self.max_retries} attempts: {e}")
-                    print(f"Server error (status {e.response.status_code}) attempt {attempt + 1}, retrying in 3 seconds...")
+                    logger.warning("Server error (status %s) attempt %d, retrying in 3 seconds...", e.response.status_code, attempt + 1)
                     time.sleep(3)
                 else:
                     # 对于客户端错误（如401，404），直接抛出
@@ -70,7 +120,7 @@ class NotionService:
             except Exception as e:
                 if attempt == self.max_retries - 1:
                     raise Exception(f"Request failed after {self.max_retries} attempts: {e}")
-                print(f"Request attempt {attempt + 1} failed: {e}, retrying in 2 seconds...")
+                logger.warning("Request attempt %d failed: %s, retrying in 2 seconds...", attempt + 1, e)
                 time.sleep(2)
 
         raise Exception(f"Request failed after {self.max_retries} attempts")
@@ -86,18 +136,24 @@ class NotionService:
         else:
             raise ValueError(f"Unknown database: {database_name}")
 
-    def query_database(self, database_name: str, filter_json: Optional[Dict] = None) -> Dict[str, Any]:
-        """查询数据库"""
+    def query_database(self, database_name: str, filter_json: Optional[Dict] = None,
+                       start_cursor: Optional[str] = None, page_size: Optional[int] = None) -> Dict[str, Any]:
+        """查询数据库（单页，完整结果用 iter_database）"""
         database_id = self._get_database_id(database_name)
         url = f"{self.base_url}databases/{database_id}/query/"
 
-        payload = {}
+        payload = page_params(start_cursor, page_size)
         if filter_json:
-            payload = {"filter": filter_json}
+            payload["filter"] = filter_json
 
         response = self._make_request_with_retry("POST", url, json=payload, verify=False)
         return response.json()
 
+    def iter_database(self, database_name: str, filter_json: Optional[Dict] = None,
+                      page_size: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """逐页查询数据库，按顺序产出全部结果"""
+        return iter_paginated(lambda cursor: self.query_database(database_name, filter_json, cursor, page_size))
+
     def add_page(self, database_name: str, page_data: Dict[str, Any]) -> Dict[str, Any]:
         """添加页面"""
         database_id = self._get_database_id(database_name)
@@ -119,13 +175,77 @@ class NotionService:
         response = self._make_request_with_retry("PATCH", url, json=update_data)
         return response.json()
 
-    def get_page_children(self, page_id: str) -> Dict[str, Any]:
-        """获取页面子项"""
+    def get_page_children(self, page_id: str, start_cursor: Optional[str] = None,
+                          page_size: Optional[int] = None) -> Dict[str, Any]:
+        """获取页面子项（单页，完整结果用 iter_page_children）"""
         url = f"{self.base_url}blocks/{page_id}/children"
 
-        response = self._make_request_with_retry("GET", url)
+        response = self._make_request_with_retry("GET", url, params=page_params(start_cursor, page_size))
         return response.json()
 
+    def iter_page_children(self, page_id: str, page_size: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """逐页获取页面的全部子块，按顺序产出"""
+        return iter_paginated(lambda cursor: self.get_page_children(page_id, cursor, page_size))
+
+    def iter_block_tree(self, page_id: str, max_depth: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        按页面顺序逐个产出顶层块，每个块在它的整棵子树加载完后立即产出
+
+        has_children 的块的子块放在该块的 "children" 列表中。子块请求在线程池中并发进行
+        （config.NOTION_BLOCK_TREE['concurrency']），某个块的子块一返回就提交它下一层的请求；
+        顶层块边分页拉取边提交，所有请求都经过 Notion 速率限制排队。
+        最多展开 max_depth 层嵌套，子页面和子数据库不展开。
+        """
+        tree_config = config.NOTION_BLOCK_TREE
+        max_depth = tree_config['max_depth'] if max_depth is None else max_depth
+        top_blocks = self.iter_page_children(page_id)
+        if not tree_config['enabled'] or max_depth <= 0:
+            yield from top_blocks
+            return
+
+        with ThreadPoolExecutor(max_workers=tree_config['concurrency'], thread_name_prefix='notion-tree') as executor:
+            pending = {}       # future -> (块, 层级, 所属顶层块序号)
+            remaining = []     # 每个顶层块还未返回的子块请求数
+            waiting = deque()  # 等待产出的顶层块 (序号, 块)
+
+            def expand(children, depth, root):
+                for block in children:
+                    if has_nested_blocks(block) and depth < max_depth:
+                        future = executor.submit(lambda block_id: list(self.iter_page_children(block_id)), block["id"])
+                        pending[future] = (block, depth + 1, root)
+                        remaining[root] += 1
+
+            def collect(done):
+                for future in done:
+                    block, depth, root = pending.pop(future)
+                    block["children"] = future.result()
+                    remaining[root] -= 1
+                    expand(block["children"], depth, root)
+
+            try:
+                for block in top_blocks:
+                    root = len(remaining)
+                    remaining.append(0)
+                    waiting.append((root, block))
+                    expand([block], 0, root)
+                    collect([future for future in pending if future.done()])
+                    while waiting and remaining[waiting[0][0]] == 0:
+                        yield waiting.popleft()[1]
+
+                while waiting:
+                    if remaining[waiting[0][0]] == 0:
+                        yield waiting.popleft()[1]
+                        continue
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def load_block_tree(self, page_id: str, max_depth: Optional[int] = None) -> List[Dict[str, Any]]:
+        """一次加载页面的完整块树（见 iter_block_tree）"""
+        return list(self.iter_block_tree(page_id, max_depth))
+
 
 class NotionDailyManager:
     """每日日记管理器"""
@@ -164,13 +284,13 @@ class NotionDailyManager:
             if result["results"]:
                 return result["results"][0]
         except requests.exceptions.ConnectionError as e:
-            print(f"网络连接错误，无法获取今日日记页面: {e}")
+            logger.error("网络连接错误，无法获取今日日记页面: %s", e)
         except requests.exceptions.Timeout as e:
-            print(f"请求超时，无法获取今日日记页面: {e}")
+            logger.error("请求超时，无法获取今日日记页面: %s", e)
         except requests.exceptions.HTTPError as e:
-            print(f"HTTP错误，无法获取今日日记页面: {e}")
+            logger.error("HTTP错误，无法获取今日日记页面: %s", e)
         except Exception as e:
-            print(f"获取今日日记页面时出现未知错误: {e}")
+            logger.error("获取今日日记页面时出现未知错误: %s", e)
 
         return None
 
@@ -221,7 +341,7 @@ class NotionDailyManager:
                     }
                 }
             except Exception as e:
-                print(f"Error getting Bing image: {e}")
+                logger.error("Error getting Bing image: %s", e)
                 # 使用默认图片
                 page_data["cover"] = {
                     "type": "external",
@@ -232,10 +352,10 @@ class NotionDailyManager:
 
         try:
             result = self.notion_service.add_page("Daily Dairy 2.0", page_data)
-            print(f"Added today page: {self.date_dt2nt(today)}")
+            logger.info("Added today page: %s", self.date_dt2nt(today))
             return result
         except Exception as e:
-            print(f"Error adding today page: {e}")
+            logger.error("Error adding today page: %s", e)
             raise
 
     def update_daily_cover(self) -> bool:
@@ -245,7 +365,7 @@ class NotionDailyManager:
 
             today_page = self.get_today_page()
             if not today_page:
-                print("No today page found to update")
+                logger.warning("No today page found to update")
                 return False
 
             update_data = {
@@ -258,11 +378,11 @@ class NotionDailyManager:
             }
 
             result = self.notion_service.update_page(today_page["id"], update_data)
-            print(f"Updated cover for page: {today_page['id']}")
+            logger.info("Updated cover for page: %s", today_page['id'])
             return True
 
         except Exception as e:
-            print(f"Error updating daily cover: {e}")
+            logger.error("Error updating daily cover: %s", e)
             return False
 
 
@@ -289,7 +409,7 @@ class NotionWeeklyManager:
             if result["results"]:
                 return result["results"][0]
         except Exception as e:
-            print(f"获取周页面失败: {e}")
+            logger.error("获取周页面失败: %s", e)
 
         return None
 
@@ -325,10 +445,10 @@ class NotionWeeklyManager:
 
         try:
             result = self.notion_service.add_page("Weekly Dairy 2.0", page_data)
-            print(f"添加周页面成功: {week_name}")
+            logger.info("添加周页面成功: %s", week_name)
             return result
         except Exception as e:
-            print(f"添加周页面失败: {e}")
+            logger.error("添加周页面失败: %s", e)
             raise
 
     def check_and_create_current_week(self) -> bool:
@@ -339,7 +459,7 @@ class NotionWeeklyManager:
             # 获取当前学期和周信息
             current_term = get_term()
             if not current_term:
-                print("无法获取当前学期信息")
+                logger.error("无法获取当前学期信息")
                 return False
 
             week_num = get_week_num()
@@ -348,7 +468,7 @@ class NotionWeeklyManager:
             # 检查周页面是否已存在
             existing_page = self.get_week_page(week_name)
             if existing_page:
-                print(f"周页面已存在: {week_name}")
+                logger.info("周页面已存在: %s", week_name)
                 return True
 
             # 计算周的开始和结束日期
@@ -361,7 +481,7 @@ class NotionWeeklyManager:
             return True
 
         except Exception as e:
-            print(f"检查并创建当前周页面失败: {e}")
+            logger.error("检查并创建当前周页面失败: %s", e)
             return False
 
 
@@ -7,27 +7,26 @@ import os
 # 将项目根目录添加到Python路径，以便导入config和utils
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utils.file_utils import load_json, dump_json
+from utils.file_utils import load_json, json_transaction
 import config
 
 def generate_codes():
     """生成并保存TOTP验证码"""
     auth_file = load_json(config.DATA_PATHS['auth_list'])
-    code_file = load_json(config.DATA_PATHS['code']) or {}
 
     auth_list = auth_file.get("list", [])
     if not auth_list:
         print("认证列表为空，不生成code。")
         return
 
-    for item in auth_list:
-        try:
-            totp = pyotp.TOTP(item["secret"], digits=8, interval=30, digest='sha1')
-            code_file[item["account"]] = totp.now()
-        except Exception as e:
-            print(f"为账户 {item.get('account')} 生成code时出错: {e}")
+    with json_transaction(config.DATA_PATHS['code'], default={}) as code_file:
+        for item in auth_list:
+            try:
+                totp = pyotp.TOTP(item["secret"], digits=8, interval=30, digest='sha1')
+                code_file[item["account"]] = totp.now()
+            except Exception as e:
+                print(f"为账户 {item.get('account')} 生成code时出错: {e}")
 
-    dump_json(config.DATA_PATHS['code'], code_file)
     print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] Code文件已更新。")
 
 if __name__ == '__main__':
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# bench_asgi_server.py - WSGI(Flask) 与 ASGI 入口的负载对比
+#
+# 启动本地模拟 Notion（带固定延迟）和模拟 NapCat，向两个服务器并发上报 #daily 事件，
+# 统计全部回复到达 NapCat 的总耗时、webhook 响应延迟和 Notion 侧观察到的最大并发请求数：
+#   wsgi: Flask 多线程服务器 + 入站事件线程池，每个处理中的命令占用一个线程
+#   asgi: uvicorn + asgi_app，Notion 查询在事件循环中异步等待
+# 需要安装 uvicorn。
+# 用法: python tests/bench_asgi_server.py [--events 300] [--groups 100] [--delay 0.2]
+
+import argparse
+import contextlib
+import io
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import requests
+import uvicorn
+from werkzeug.serving import make_server
+
+import config
+import app as wsgi_module
+import asgi_app
+from services import notion_service as notion_module
+from services.async_notion_service import async_notion_service, async_diary_service
+from utils.log import ROOT_LOGGER_NAME
+from utils.worker_pool import PartitionedWorkerPool
+from fake_napcat import start_fake_napcat
+from fake_notion import start_fake_notion
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_wsgi(port):
+    server = make_server('127.0.0.1', port, wsgi_module.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.shutdown
+
+
+def start_asgi(port):
+    server = uvicorn.Server(uvicorn.Config(asgi_app.app, host='127.0.0.1', port=port, log_level='warning'))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+
+    def stop():
+        server.should_exit = True
+        thread.join()
+    return stop
+
+
+def event(group_id):
+    return {
+        'post_type': 'message', 'message_type': 'group', 'group_id': group_id, 'user_id': 10001,
+        'message': [{'type': 'text', 'data': {'text': '#daily'}}],
+    }
+
+
+def run(url, napcat, notion, events, groups):
+    napcat.messages.clear()
+    notion.max_active = 0
+    session_local = threading.local()
+    latencies = []
+
+    def post(i):
+        session = getattr(session_local, 'session', None) or requests.Session()
+        session_local.session = session
+        start = time.perf_counter()
+        status = session.post(url, json=event(1000 + i % groups)).status_code
+        latencies.append(time.perf_counter() - start)
+        return status
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(32) as pool:
+        statuses = list(pool.map(post, range(events)))
+    accepted = sum(1 for status in statuses if status == 200)
+    while len(napcat.messages) < accepted:
+        time.sleep(0.01)
+    total = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'total': total,
+        'rate': accepted / total,
+        'p50': latencies[len(latencies) // 2] * 1000,
+        'max': latencies[-1] * 1000,
+        'rejected': events - accepted,
+        'concurrency': notion.max_active,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--events', type=int, default=300)
+    parser.add_argument('--groups', type=int, default=100)
+    parser.add_argument('--delay', type=float, default=0.2, help="模拟 Notion 每次请求的延迟(秒)")
+    args = parser.parse_args()
+
+    notion = start_fake_notion(delay=args.delay)
+    napcat = start_fake_napcat()
+    config.NAPCAT_BASE_URL = napcat.base_url
+    config.MONITORED_GROUPS = set(range(1000, 1000 + args.groups))
+    config.RATE_LIMIT['enabled'] = False
+    # 两个入口的回复都经出站队列发送；关闭合并，使每个事件恰好对应一条 NapCat 消息
+    config.OUTBOUND_COALESCE['enabled'] = False
+    # 模拟的 Notion 不限速；开启节流时两种入口都被限制在 3 次/秒，无法比较
+    config.NOTION_RATE_LIMIT['enabled'] = False
+    # 只保留警告以上的日志，避免日志输出影响测量
+    logging.getLogger(ROOT_LOGGER_NAME).setLevel(logging.WARNING)
+    for service in (notion_module.notion_service, notion_module.daily_manager.notion_service,
+                    async_notion_service, async_diary_service):
+        service.base_url = notion.base_url
+    wsgi_module.event_pool = PartitionedWorkerPool(
+        'events', workers=config.EVENT_QUEUE['workers'], max_pending=args.events * 2)
+
+    print(f"{args.events} #daily events from {args.groups} groups, Notion delay {args.delay * 1000:.0f}ms "
+          f"(2 Notion calls per event)\n")
+    print(f"{'server':>6} {'total s':>8} {'events/s':>9} {'p50 ms':>8} {'max ms':>8} {'rejected':>9} {'notion concurrency':>19}")
+
+    for name, starter in (('wsgi', start_wsgi), ('asgi', start_asgi)):
+        port = free_port()
+        # 屏蔽服务器的访问日志，避免终端输出成为瓶颈
+        with contextlib.redirect_stdout(io.StringIO()):
+            stop = starter(port)
+            result = run(f"http://127.0.0.1:{port}/", napcat, notion, args.events, args.groups)
+            stop()
+        print(f"{name:>6} {result['total']:>8.2f} {result['rate']:>9.1f} {result['p50']:>8.1f} "
+              f"{result['max']:>8.1f} {result['rejected']:>9} {result['concurrency']:>19}")
+
+    notion.stop()
+    napcat.stop()
+
+
+if __name__ == "__main__":
+    main()
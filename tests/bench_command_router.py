@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# bench_command_router.py - 命令分发耗时基准测试
+#
+# 对比旧的线性 startswith 扫描与前缀树路由在命令表增长时的单条消息分发耗时。
+# 用法: python tests/bench_command_router.py
+
+import sys
+import os
+import random
+import timeit
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.command_router import CommandRouter
+
+
+def linear_match(routes, message_text):
+    """旧实现：按字典顺序逐个 startswith"""
+    for command, handler in routes.items():
+        if message_text.startswith(command):
+            return command, handler
+    return None
+
+
+def build_routes(size):
+    """构造包含 size 个命令的路由表"""
+    routes = {}
+    rng = random.Random(size)
+    while len(routes) < size:
+        name = ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz_') for _ in range(rng.randint(2, 12)))
+        routes['#' + name] = print
+    return routes
+
+
+def main():
+    print(f"{'commands':>9} {'linear (us)':>12} {'trie (us)':>10} {'speedup':>8}")
+    for size in (10, 50, 100, 200, 500, 1000):
+        routes = build_routes(size)
+        router = CommandRouter(routes)
+        commands = list(routes)
+        rng = random.Random(0)
+        # 一半命中随机命令，一半是普通聊天消息
+        messages = [rng.choice(commands) + ' 参数 内容' for _ in range(500)]
+        messages += ['今天玩什么游戏呢' for _ in range(500)]
+
+        number = 5
+        linear = timeit.timeit(lambda: [linear_match(routes, m) for m in messages], number=number)
+        trie = timeit.timeit(lambda: [router.match(m) for m in messages], number=number)
+        per_linear = linear / (number * len(messages)) * 1e6
+        per_trie = trie / (number * len(messages)) * 1e6
+        print(f"{size:>9} {per_linear:>12.2f} {per_trie:>10.2f} {per_linear / per_trie:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
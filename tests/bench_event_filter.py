@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# bench_event_filter.py - 入站事件预过滤的吞吐对比
+#
+# 回放一组 OneBot 上报报文（心跳、通知、私聊、未监听群和监听群的消息），
+# 分别在开启和关闭预过滤时调用 handle_raw_event，统计每秒处理的事件数。
+# 命令使用空处理器并同步执行，只测量 webhook 一侧的开销。
+# 可以用 --events-file 回放抓取的真实上报（每行一条 JSON 报文），否则使用内置的混合比例生成。
+# 用法: python tests/bench_event_filter.py [--events 50000] [--events-file capture.jsonl]
+
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+import app as bot_app
+from utils.log import ROOT_LOGGER_NAME
+
+MONITORED = 1000
+UNMONITORED = range(2000, 2050)
+
+
+def group_message(group_id, text, seq):
+    return {
+        'self_id': 3889000000, 'user_id': 10000 + seq % 500, 'time': 1700000000 + seq,
+        'message_id': seq, 'message_seq': seq, 'real_id': seq,
+        'post_type': 'message', 'message_type': 'group', 'sub_type': 'normal', 'group_id': group_id,
+        'message': [{'type': 'text', 'data': {'text': text}}], 'message_format': 'array',
+        'raw_message': text, 'font': 14,
+        'sender': {'user_id': 10000 + seq % 500, 'nickname': f'user{seq % 500}', 'card': '', 'role': 'member'},
+    }
+
+
+def synthetic_mix(count):
+    """NapCat 常见的上报比例：大量心跳和其他群的聊天，少量本群消息"""
+    rng = random.Random(42)
+    events = []
+    for seq in range(count):
+        roll = rng.random()
+        if roll < 0.35:
+            event = {'time': 1700000000 + seq, 'self_id': 3889000000, 'post_type': 'meta_event',
+                     'meta_event_type': 'heartbeat', 'interval': 30000,
+                     'status': {'online': True, 'good': True}}
+        elif roll < 0.45:
+            event = {'time': 1700000000 + seq, 'self_id': 3889000000, 'post_type': 'notice',
+                     'notice_type': 'group_recall', 'group_id': MONITORED, 'user_id': 10001,
+                     'operator_id': 10001, 'message_id': seq}
+        elif roll < 0.50:
+            event = group_message(MONITORED, '私聊内容', seq)
+            event['message_type'] = 'private'
+            del event['group_id']
+        elif roll < 0.90:
+            text = '今天吃什么' * rng.randint(1, 20)
+            event = group_message(rng.choice(UNMONITORED), text, seq)
+        elif roll < 0.95:
+            event = group_message(MONITORED, '普通聊天消息' * rng.randint(1, 10), seq)
+        else:
+            event = group_message(MONITORED, f'#benchnoop {seq}', seq)
+        events.append(json.dumps(event, ensure_ascii=False).encode())
+    return events
+
+
+def replay(events):
+    start = time.perf_counter()
+    for body in events:
+        bot_app.handle_raw_event(body)
+    return len(events) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--events', type=int, default=50000)
+    parser.add_argument('--events-file', help='每行一条 OneBot 上报 JSON 的抓包文件')
+    args = parser.parse_args()
+
+    if args.events_file:
+        with open(args.events_file, 'rb') as f:
+            events = [line.strip() for line in f if line.strip()]
+    else:
+        events = synthetic_mix(args.events)
+
+    config.MONITORED_GROUPS = {MONITORED}
+    config.EVENT_QUEUE['enabled'] = False
+    config.RATE_LIMIT['enabled'] = False
+    config.TRACING['enabled'] = False
+    logging.getLogger(ROOT_LOGGER_NAME).setLevel(logging.WARNING)
+    bot_app.command_router.add('#benchnoop', lambda event_data: None)
+
+    print(f"replaying {len(events)} events, {sum(map(len, events)) / len(events):.0f} bytes on average\n")
+    print(f"{'prefilter':>9} {'events/s':>10}")
+    for enabled in (False, True):
+        config.EVENT_PREFILTER['enabled'] = enabled
+        replay(events[:1000])  # 预热
+        rate = replay(events)
+        print(f"{'on' if enabled else 'off':>9} {rate:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
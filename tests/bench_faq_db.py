@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# bench_faq_db.py - FAQ数据库并发读写基准测试
+#
+# 在混合读写负载下对比：
+#   before: 每次操作新建 sqlite3 连接，默认回滚日志
+#   after:  DatabaseManager 连接池 + WAL + synchronous=NORMAL + 语句缓存
+# 用法: python tests/bench_faq_db.py [--threads 8] [--ops 2000] [--write-ratio 0.1]
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.database_manager import DatabaseManager
+
+
+class ConnectPerCallFAQ:
+    """旧实现：每次调用都重新连接数据库"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        with sqlite3.connect(db_path) as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS faq (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    key TEXT NOT NULL UNIQUE,
+                    contents TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+
+    def get_faq_content(self, key):
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                row = conn.execute('SELECT contents FROM faq WHERE key = ?', (key,)).fetchone()
+                return row[0] if row else None
+        except sqlite3.OperationalError:
+            return None
+
+    def set_faq_content(self, key, contents):
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.execute('INSERT OR REPLACE INTO faq (key, contents, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP)',
+                             (key, contents))
+                return True
+        except sqlite3.OperationalError:
+            return False
+
+
+def run(manager, threads, ops, write_ratio, keys):
+    for key in keys:
+        manager.set_faq_content(key, f"content of {key} " * 20)
+
+    errors = []
+
+    def worker(seed):
+        rng = random.Random(seed)
+        for _ in range(ops // threads):
+            key = rng.choice(keys)
+            if rng.random() < write_ratio:
+                if not manager.set_faq_content(key, f"updated {rng.random()}"):
+                    errors.append(key)
+            else:
+                manager.get_faq_content(key)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return (ops // threads * threads) / elapsed, len(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--ops', type=int, default=2000)
+    parser.add_argument('--write-ratio', type=float, default=0.1)
+    args = parser.parse_args()
+
+    keys = [f"key{i}" for i in range(200)]
+    print(f"{args.threads} threads, {args.ops} ops, {args.write_ratio:.0%} writes\n")
+    print(f"{'mode':>8} {'queries/sec':>12} {'failed writes':>14}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        before = ConnectPerCallFAQ(os.path.join(tmp, 'before.db'))
+        rate, errors = run(before, args.threads, args.ops, args.write_ratio, keys)
+        print(f"{'before':>8} {rate:>12.0f} {errors:>14}")
+
+        after = DatabaseManager(os.path.join(tmp, 'after.db'), pool_size=args.threads)
+        rate, errors = run(after, args.threads, args.ops, args.write_ratio, keys)
+        print(f"{'after':>8} {rate:>12.0f} {errors:>14}")
+        after.close()
+
+
+if __name__ == "__main__":
+    main()
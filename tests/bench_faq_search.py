@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# bench_faq_search.py - FAQ全文搜索和相似key推荐基准测试
+#
+# 向临时数据库写入大量合成FAQ条目，对比：
+#   like:  对 key/contents 做 LIKE '%词%' 全表扫描（无索引时的做法）
+#   fts:   DatabaseManager.search_faq (FTS5 trigram 索引)
+#   suggest: DatabaseManager.suggest_faq_keys (trigram召回 + 编辑相似度重排)
+# 用法: python tests/bench_faq_search.py [--entries 30000] [--queries 200]
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.database_manager import DatabaseManager
+
+WORDS = ("服务器 地址 群规 禁止 刷屏 广告 模组 整合包 下载 链接 版本 更新 公告 活动 报名 "
+         "教程 新手 指南 白名单 申请 备份 存档 插件 配置 端口 密码 账号 规则 说明 帮助").split()
+
+
+def seed(manager, entries, rng):
+    """批量写入合成FAQ条目"""
+    rows = []
+    for i in range(entries):
+        key = f"{rng.choice(WORDS)}_{rng.choice(WORDS)}_{i}"
+        contents = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(10, 40))) + f" token{i}"
+        rows.append((key, manager.normalize_key(key), contents))
+    with manager._connection() as conn, conn:
+        conn.executemany(manager._SQL_SET, rows)
+    return [row[0] for row in rows]
+
+
+def like_search(manager, query, limit=10):
+    sql = "SELECT key, contents FROM faq WHERE " + " AND ".join(
+        "(key LIKE ? OR contents LIKE ?)" for _ in query.split()) + " LIMIT ?"
+    params = []
+    for term in query.split():
+        params.extend([f"%{term}%", f"%{term}%"])
+    with manager._connection() as conn:
+        return conn.execute(sql, params + [limit]).fetchall()
+
+
+def timed(func, items):
+    start = time.perf_counter()
+    for item in items:
+        func(item)
+    return (time.perf_counter() - start) / len(items) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--entries', type=int, default=30000)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = DatabaseManager(os.path.join(tmp, 'faq.db'))
+        start = time.perf_counter()
+        keys = seed(manager, args.entries, rng)
+        print(f"seeded {args.entries} entries in {time.perf_counter() - start:.1f}s (fts5: {manager.has_fts})\n")
+
+        # 稀有词查询：只命中极少条目，最能体现全表扫描和索引的差距
+        rare = [f"token{rng.randrange(args.entries)}" for _ in range(args.queries)]
+        common = [f"{rng.choice(WORDS)}{rng.choice(WORDS)}" for _ in range(args.queries)]
+        typos, originals = [], rng.sample(keys, args.queries)
+        for key in originals:
+            pos = rng.randrange(len(key))
+            typos.append(key[:pos] + key[pos + 1:])
+
+        print(f"{'workload':>22} {'ms/query':>10}")
+        print(f"{'rare term  / like':>22} {timed(lambda q: like_search(manager, q), rare):>10.2f}")
+        print(f"{'rare term  / fts':>22} {timed(manager.search_faq, rare):>10.2f}")
+        print(f"{'common pair / like':>22} {timed(lambda q: like_search(manager, q), common):>10.2f}")
+        print(f"{'common pair / fts':>22} {timed(manager.search_faq, common):>10.2f}")
+        print(f"{'did-you-mean':>22} {timed(manager.suggest_faq_keys, typos):>10.2f}")
+
+        hits = sum(1 for typo, key in zip(typos, originals) if key in manager.suggest_faq_keys(typo))
+        print(f"\noriginal key suggested for {hits}/{len(typos)} one-character typos")
+        manager.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# bench_image_download.py - FAQ编辑时图片下载基准测试
+#
+# 模拟一条包含20张图片（其中有重复URL）的 #not edit 内容，在带延迟的本地图片服务器上对比：
+#   before: 逐张串行下载，每张图片做一次全文 str.replace
+#   after:  ImageManager.process_content_images 并发下载 + 去重 + 单次正则替换
+# 用法: python tests/bench_image_download.py [--images 20] [--delay 0.1]
+
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import requests
+
+from services.database_manager import DatabaseManager
+from utils.image_utils import ImageManager
+from fake_image_server import start_fake_image_server
+
+
+def process_serial(content, images_dir):
+    """旧实现：串行下载并逐个替换"""
+    import re
+    for url in re.findall(r'\[CQ:image,url=([^\]]+)\]', content):
+        filepath = os.path.join(images_dir, hashlib.md5(url.encode()).hexdigest() + '.png')
+        if not os.path.exists(filepath):
+            response = requests.get(url, timeout=30)
+            response.raise_for_status()
+            with open(filepath, 'wb') as f:
+                f.write(response.content)
+        content = content.replace(f"[CQ:image,url={url}]", f"[CQ:image,file=file:///{filepath}]")
+    return content
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--images', type=int, default=20)
+    parser.add_argument('--delay', type=float, default=0.1, help="模拟图片服务器的响应延迟(秒)")
+    args = parser.parse_args()
+
+    server = start_fake_image_server(delay=args.delay)
+    # 约四分之一的图片是重复URL
+    urls = [f"{server.base_url}/img/{i % max(1, args.images * 3 // 4)}.png?rkey=abc" for i in range(args.images)]
+    content = "群文件说明：" + "".join(f"第{i}步 [CQ:image,url={url}] " for i, url in enumerate(urls))
+
+    print(f"{args.images} images ({len(set(urls))} unique), server delay {args.delay * 1000:.0f}ms\n")
+    print(f"{'mode':>8} {'seconds':>8} {'requests':>9} {'max concurrent':>15}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server.requests = server.max_active = 0
+        start = time.perf_counter()
+        process_serial(content, tmp)
+        print(f"{'before':>8} {time.perf_counter() - start:>8.2f} {server.requests:>9} {server.max_active:>15}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = ImageManager(tmp, database=DatabaseManager(os.path.join(tmp, 'faq.db')))
+        server.requests = server.max_active = 0
+        start = time.perf_counter()
+        result = manager.process_content_images(content)
+        print(f"{'after':>8} {time.perf_counter() - start:>8.2f} {server.requests:>9} {server.max_active:>15}")
+        assert 'url=' not in result
+
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# bench_message_codec.py - #not edit 消息处理链路的耗时对比
+#
+# 构造包含大量文本段和图片段的群消息，比较两种处理方式（图片下载替换为查表，只测字符串处理）：
+#   before: 旧实现，先把消息段拼成带 [CQ:image,url=...] 的字符串，再用多个正则反复解析
+#           (get_full_message_content -> convert_content_to_cq -> IMAGE_URL_PATTERN.findall/sub
+#            -> _LOCAL_IMAGE_PATTERN.findall)
+#   after:  消息只解析一次成消息段，按段处理后编码一次（utils.message）
+# 注意两者的输出并不相同：旧实现会把命令文本重复拼进内容，也不转义文本中的 & [ ]；
+# 新实现逐段处理有 Python 层面的开销，这里用来确认它在大消息上仍是同一数量级。
+# 用法: python tests/bench_message_codec.py
+
+import os
+import re
+import sys
+import timeit
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from handlers.faq_handler import convert_content_to_segments
+from utils.message import (drop_words, encode_cq, image_segment, iter_cq_codes, local_file, parse_message,
+                           plain_text, strip_segments)
+
+IMAGE_URL_PATTERN = re.compile(r'\[CQ:image,url=([^\]]+)\]')
+LOCAL_IMAGE_PATTERN = re.compile(r'\[CQ:image,file=file:///([^\],]+)\]')
+
+
+def build_message(segment_count):
+    message = [{'type': 'text', 'data': {'text': '#not edit 教程 '}}]
+    for i in range(segment_count):
+        if i % 3 == 2:
+            url = f'https://multimedia.nt.qq.com.cn/download?appid=1407&fileid=EhR{i:06d}&rkey=CAQSKAB6JWENi5'
+            message.append({'type': 'image', 'data': {'file': f'{i}.png', 'url': url, 'file_size': '20480'}})
+        else:
+            message.append({'type': 'text', 'data': {'text': f'第{i}步：打开设置，找到选项并确认。' * 3}})
+    return message
+
+
+def local_path(url):
+    """代替实际下载：URL 对应的本地文件"""
+    return f'data/faq_images/{abs(hash(url)) % 10 ** 8:08d}.png'
+
+
+def before(message):
+    message_text = ''.join(m['data']['text'] for m in message if m['type'] == 'text').strip()
+    parts = []
+    for m in message:
+        if m['type'] == 'text':
+            text = m['data']['text'].strip()
+            if text:
+                parts.append(text)
+        elif m['type'] == 'image' and m['data'].get('url'):
+            parts.append(f"[CQ:image,url={m['data']['url']}]")
+    full = ''.join(parts).strip()
+    merged = message_text + ' ' + full if full != message_text else message_text
+
+    contents = merged[10:].strip().split(' ', 1)[1]
+    if '[CQ:image' not in contents:
+        contents = re.sub(r'https?://[^\s]+\.(?:jpg|jpeg|png|gif|bmp|webp)(?:\?[^\s]*)?',
+                          lambda match: f'[CQ:image,url={match.group(0)}]', contents, flags=re.IGNORECASE)
+    replacements = {url: f"[CQ:image,file=file:///{local_path(url)}]"
+                    for url in dict.fromkeys(IMAGE_URL_PATTERN.findall(contents))}
+    stored = IMAGE_URL_PATTERN.sub(lambda m: replacements.get(m.group(1), m.group(0)), contents)
+    files = LOCAL_IMAGE_PATTERN.findall(stored)
+    return stored, files
+
+
+def after(message):
+    segments = parse_message(message)
+    message_text = plain_text(segments).strip()
+    assert message_text.startswith('#not edit ')
+
+    content = convert_content_to_segments(strip_segments(drop_words(segments, 3)))
+    localized = {url: image_segment(file=local_path(url))
+                 for url in dict.fromkeys(s['data']['url'] for s in content if s['type'] == 'image')}
+    content = [localized.get(s['data'].get('url'), s) if s['type'] == 'image' else s for s in content]
+    stored = encode_cq(content)
+    files = [local_file(s) for s in iter_cq_codes(stored, 'image')]
+    return stored, files
+
+
+def main():
+    print(f"{'segments':>9} {'chars':>8} {'before (us)':>12} {'after (us)':>11} {'speedup':>8}")
+    for count in (10, 100, 1000):
+        message = build_message(count)
+        chars = sum(len(m['data'].get('text', m['data'].get('url', ''))) for m in message)
+        number = max(10, 20000 // count)
+        t_before = timeit.timeit(lambda: before(message), number=number) / number * 1e6
+        t_after = timeit.timeit(lambda: after(message), number=number) / number * 1e6
+        print(f"{count:>9} {chars:>8} {t_before:>12.1f} {t_after:>11.1f} {t_before / t_after:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
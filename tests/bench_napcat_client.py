@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# bench_napcat_client.py - NapCat 发送吞吐基准测试
+#
+# 对比两种发送方式在本地模拟 NapCat 上的 messages/sec 和新建连接数：
+#   before: 每次调用模块级 requests.get，参数放在查询字符串里
+#   after:  NapCatClient，连接池 + keep-alive + JSON POST
+# 另外测试一条超长 FAQ 回复在两种方式下能否送达。
+# 用法: python tests/bench_napcat_client.py [--messages 1000] [--threads 4]
+
+import argparse
+import sys
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import requests
+
+from utils.napcat_client import NapCatClient
+from fake_napcat import start_fake_napcat
+
+
+def send_before(base_url, group_id, message):
+    """旧实现：每次新建连接，GET 查询字符串"""
+    response = requests.get(f"{base_url}/send_group_msg",
+                            params={"group_id": group_id, "message": message},
+                            verify=False, timeout=10)
+    return response.status_code == 200
+
+
+def run(send, messages, threads):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(lambda i: send(1000 + i % 8, f"bench message {i}"), range(messages)))
+    elapsed = time.perf_counter() - start
+    return messages / elapsed, sum(results)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=1000)
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+
+    server = start_fake_napcat()
+    base_url = server.base_url
+    client = NapCatClient(base_url=base_url, pool_size=args.threads)
+
+    print(f"{args.messages} messages, {args.threads} sender threads\n")
+    print(f"{'mode':>8} {'msgs/sec':>10} {'delivered':>10} {'connections':>12}")
+
+    server.connections = 0
+    rate, delivered = run(lambda g, m: send_before(base_url, g, m), args.messages, args.threads)
+    print(f"{'before':>8} {rate:>10.0f} {delivered:>10} {server.connections:>12}")
+
+    server.connections = 0
+    rate, delivered = run(client.send_group_msg, args.messages, args.threads)
+    print(f"{'after':>8} {rate:>10.0f} {delivered:>10} {server.connections:>12}")
+
+    long_message = "📖 FAQ [rules]:\n\n" + "群规第N条：请勿刷屏。\n" * 3000
+    print(f"\nlong reply ({len(long_message)} chars):")
+    try:
+        print(f"  before: {'ok' if send_before(base_url, 1000, long_message) else 'rejected'}")
+    except requests.RequestException as e:
+        print(f"  before: failed ({e.__class__.__name__})")
+    print(f"  after:  {'ok' if client.send_group_msg(1000, long_message) else 'rejected'}")
+
+    client.close()
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# bench_notion_tree.py - 嵌套页面块树加载的耗时对比
+#
+# 本地模拟的 Notion 提供一个多层嵌套的页面（每个请求固定延迟），比较：
+#   top-level:  只取顶层块（改动前 #daily 的做法，嵌套内容丢失）
+#   serial:     逐个请求子块（concurrency=1）
+#   concurrent: 按 --concurrency 并发请求子块
+# first 列是第一个顶层块（连同子树）就绪的耗时，即 #daily 最早可以开始组装回复的时间。
+# 默认关闭速率限制，只比较请求方式；加 --rate 3 可以看到真实 Notion 限速下的耗时下限
+# （请求数 - 突发数）/ rate。
+# 用法: python tests/bench_notion_tree.py [--delay 0.1] [--top 10 --fanout 3 --depth 3] [--rate 3]
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import config
+from services import notion_service as notion_service_module
+from services.async_notion_service import AsyncNotionService
+from services.notion_service import NotionService
+from utils.log import ROOT_LOGGER_NAME
+from utils.notion_utils import process_notion_blocks
+from utils.rate_limiter import TokenBucketLimiter
+from fake_notion import nested_blocks, start_fake_notion
+
+
+def timed(stream):
+    """消费顶层块迭代器，返回 (第一个顶层块就绪耗时, 总耗时, 块列表)"""
+    start = time.perf_counter()
+    blocks = []
+    first = None
+    for block in stream():
+        if first is None:
+            first = time.perf_counter() - start
+        blocks.append(block)
+    return first or 0.0, time.perf_counter() - start, blocks
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--delay', type=float, default=0.1, help='每个请求的模拟延迟(秒)')
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--fanout', type=int, default=3)
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--rate', type=float, default=0, help='Notion 速率限制(次/秒)，0 表示不限速')
+    args = parser.parse_args()
+
+    logging.getLogger(ROOT_LOGGER_NAME).setLevel(logging.WARNING)
+    blocks, outline = nested_blocks(top=args.top, fanout=args.fanout, depth=args.depth)
+    server = start_fake_notion(delay=args.delay, blocks=blocks)
+    config.NOTION_RATE_LIMIT.update({'enabled': bool(args.rate), 'rate': args.rate or 3.0})
+
+    service = NotionService()
+    async_service = AsyncNotionService()
+    service.base_url = async_service.base_url = server.base_url
+
+    def stream_async():
+        """在新的事件循环中消费异步迭代器，记录每个顶层块的到达时间"""
+        arrivals = []
+
+        async def consume():
+            try:
+                async for block in async_service.iter_block_tree('page-0'):
+                    arrivals.append((time.perf_counter(), block))
+            finally:
+                await async_service.aclose()
+
+        start = time.perf_counter()
+        asyncio.run(consume())
+        return arrivals, start
+
+    print(f"{len(outline)} blocks in {len(blocks)} parents, depth {args.depth}, "
+          f"{args.delay * 1000:.0f} ms per request, rate limit {args.rate or 'off'}\n")
+    print(f"{'mode':>18} {'requests':>9} {'lines':>7} {'first (s)':>10} {'time (s)':>9}")
+    runs = [
+        ('top-level', 1, lambda: service.iter_page_children('page-0')),
+        ('serial', 1, lambda: service.iter_block_tree('page-0')),
+        (f'concurrent x{args.concurrency}', args.concurrency, lambda: service.iter_block_tree('page-0')),
+        (f'async x{args.concurrency}', args.concurrency, None),
+    ]
+    for name, concurrency, load in runs:
+        config.NOTION_BLOCK_TREE.update({'enabled': True, 'concurrency': concurrency, 'max_depth': args.depth})
+        # 每种方式从满的令牌桶开始
+        notion_service_module.request_limiter = TokenBucketLimiter(config.NOTION_RATE_LIMIT['rate'],
+                                                                   config.NOTION_RATE_LIMIT['burst'])
+        requests_before = server.requests
+        if load is None:
+            arrivals, start = stream_async()
+            tree = [block for _, block in arrivals]
+            first = arrivals[0][0] - start if arrivals else 0.0
+            elapsed = time.perf_counter() - start
+        else:
+            first, elapsed, tree = timed(load)
+        rendered = sum(1 for line in process_notion_blocks(tree).split('\n') if line)
+        print(f"{name:>18} {server.requests - requests_before:>9} {rendered:>7} {first:>10.2f} {elapsed:>9.2f}")
+
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
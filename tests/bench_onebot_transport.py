@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# bench_onebot_transport.py - HTTP 与 WebSocket 两种 NapCat 通信方式的端到端延迟对比
+#
+# 模拟 NapCat 上报一条 #ping 事件，处理器回复一条群消息，测量从上报到回复到达模拟 NapCat 的耗时：
+#   http: 事件 POST 到 Flask webhook，回复通过 HTTP 调用 send_group_msg
+#   ws:   事件和回复都走同一条 WebSocket 长连接
+# 先逐条测量延迟分位数，再一次性上报一批事件测量吞吐。
+# 用法: python tests/bench_onebot_transport.py [--pings 300] [--burst 1000] [--groups 20]
+
+import argparse
+import contextlib
+import io
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import requests
+from werkzeug.serving import make_server
+
+import config
+import app as bot_app
+from utils import api_utils
+from utils.log import ROOT_LOGGER_NAME
+from utils.onebot_ws import OneBotWebSocketClient
+from fake_napcat import FakeNapCatServer
+from fake_onebot_ws import start_fake_onebot_ws
+
+
+class TimedFakeNapCat(FakeNapCatServer):
+    """记录每条消息到达时间的模拟 NapCat"""
+
+    def __init__(self):
+        super().__init__()
+        self.message_times = []
+
+    def record(self, action, params):
+        with self._lock:
+            self.messages.append((action, params))
+            self.message_times.append(time.perf_counter())
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def ping_event(group_id, seq):
+    return {
+        'post_type': 'message', 'message_type': 'group', 'group_id': group_id, 'user_id': 10001,
+        'message': [{'type': 'text', 'data': {'text': f'#ping {seq}'}}],
+    }
+
+
+def handle_ping(event_data):
+    api_utils.send_group_message(event_data['group_id'], f"pong {event_data['args']}")
+
+
+def measure(deliver, napcat, pings, burst, groups):
+    """deliver(event) 负责把事件交给机器人"""
+    napcat.messages.clear()
+    napcat.message_times.clear()
+
+    latencies = []
+    for seq in range(pings):
+        start = time.perf_counter()
+        deliver(ping_event(1000 + seq % groups, seq))
+        while len(napcat.message_times) <= seq:
+            time.sleep(0.0001)
+        latencies.append(napcat.message_times[seq] - start)
+
+    napcat.messages.clear()
+    napcat.message_times.clear()
+    start = time.perf_counter()
+    for seq in range(burst):
+        deliver(ping_event(1000 + seq % groups, seq))
+    while len(napcat.message_times) < burst:
+        time.sleep(0.001)
+    burst_elapsed = napcat.message_times[-1] - start
+
+    latencies.sort()
+    return {
+        'p50': latencies[len(latencies) // 2] * 1000,
+        'p99': latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        'rate': burst / burst_elapsed,
+    }
+
+
+def run_http(args):
+    napcat = TimedFakeNapCat().start()
+    config.NAPCAT_TRANSPORT = 'http'
+    config.NAPCAT_BASE_URL = napcat.base_url
+    port = free_port()
+    server = make_server('127.0.0.1', port, bot_app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    session = requests.Session()
+    url = f"http://127.0.0.1:{port}/"
+    try:
+        return measure(lambda event: session.post(url, json=event), napcat, args.pings, args.burst, args.groups)
+    finally:
+        server.shutdown()
+        napcat.stop()
+
+
+def run_ws(args):
+    napcat = start_fake_onebot_ws()
+    config.NAPCAT_TRANSPORT = 'ws'
+    client = OneBotWebSocketClient(url=napcat.url, access_token='')
+    api_utils.onebot_ws_client = client
+    client.start(on_event=bot_app.handle_event)
+    client.wait_connected(5)
+    try:
+        return measure(napcat.push_event, napcat, args.pings, args.burst, args.groups)
+    finally:
+        client.stop()
+        napcat.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pings', type=int, default=300)
+    parser.add_argument('--burst', type=int, default=1000)
+    parser.add_argument('--groups', type=int, default=20)
+    args = parser.parse_args()
+
+    config.MONITORED_GROUPS = set(range(1000, 1000 + args.groups))
+    config.RATE_LIMIT['enabled'] = False
+    # 只保留警告以上的日志，避免日志输出影响测量
+    logging.getLogger(ROOT_LOGGER_NAME).setLevel(logging.WARNING)
+    config.OUTBOUND_COALESCE['enabled'] = False
+    bot_app.command_router.add('#ping', handle_ping)
+
+    print(f"{args.pings} sequential pings, then a burst of {args.burst} events from {args.groups} groups\n")
+    print(f"{'transport':>9} {'p50 ms':>8} {'p99 ms':>8} {'burst events/s':>15}")
+    for name, runner in (('http', run_http), ('ws', run_ws)):
+        # 屏蔽服务器的访问日志，避免终端输出成为瓶颈
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            result = runner(args)
+        print(f"{name:>9} {result['p50']:>8.2f} {result['p99']:>8.2f} {result['rate']:>15.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# bench_outbound_queue.py - 出站消息队列基准测试
+#
+# 使用本地模拟 NapCat（带固定延迟）离线对比：
+#   1. 同步发送：处理线程需要等待每次发送完成
+#   2. 队列发送：处理线程只入队，后台线程并发发送
+#   3. 队列发送 + 合并窗口：同一个群窗口内的消息合并为一次发送
+# 并检查每个群内的消息顺序是否保持不变。
+# 用法: python tests/bench_outbound_queue.py [--messages 400] [--groups 8] [--delay 0.02]
+
+import argparse
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import config
+from utils import api_utils
+from utils.worker_pool import PartitionedWorkerPool
+from fake_napcat import start_fake_napcat
+
+
+def check_order(server, groups):
+    """检查每个群收到的消息序号是否递增"""
+    last = {}
+    for action, params in server.messages:
+        group_id = str(params['group_id'])
+        seq = int(str(params['message']).split('#')[-1])
+        if seq <= last.get(group_id, -1):
+            return False
+        last[group_id] = seq
+    return len(last) == groups
+
+
+def run(messages, groups, workers, server, coalesce=False):
+    server.messages.clear()
+    api_utils.outbound_pool = PartitionedWorkerPool('bench', workers=max(workers, 1), max_pending=messages)
+    config.OUTBOUND_QUEUE['enabled'] = workers > 0
+    config.OUTBOUND_COALESCE['enabled'] = coalesce
+
+    start = time.perf_counter()
+    for i in range(messages):
+        api_utils.send_group_message(1000 + i % groups, f"bench message #{i}")
+    enqueue_elapsed = time.perf_counter() - start
+    if coalesce:
+        # 等待最后一个合并窗口结束并完成入队
+        time.sleep(config.OUTBOUND_COALESCE['window'] * 2)
+        while api_utils.get_outbound_stats()['coalesce']['buffered']:
+            time.sleep(0.01)
+    api_utils.outbound_pool.join()
+    total_elapsed = time.perf_counter() - start
+
+    stats = api_utils.get_outbound_stats()
+    return enqueue_elapsed, total_elapsed, stats, check_order(server, groups)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=400)
+    parser.add_argument('--groups', type=int, default=8)
+    parser.add_argument('--delay', type=float, default=0.02, help="模拟 NapCat 每次发送的延迟(秒)")
+    args = parser.parse_args()
+
+    server = start_fake_napcat(delay=args.delay)
+    config.NAPCAT_BASE_URL = server.base_url
+    print(f"{args.messages} messages to {args.groups} groups, NapCat delay {args.delay * 1000:.0f}ms\n")
+    print(f"{'mode':>14} {'handler ms/msg':>15} {'msgs/sec':>10} {'max depth':>10} {'ordered':>8} {'napcat calls':>13}")
+
+    for workers, coalesce in ((0, False), (1, False), (4, False), (8, False), (4, True)):
+        enqueue, total, stats, ordered = run(args.messages, args.groups, workers, server, coalesce)
+        mode = 'sync' if workers == 0 else f'queue x{workers}'
+        if coalesce:
+            mode += '+merge'
+        print(f"{mode:>14} {enqueue / args.messages * 1000:>15.3f} {args.messages / total:>10.0f} "
+              f"{stats['max_depth']:>10} {str(ordered):>8} {len(server.messages):>13}")
+
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# fake_image_server.py - 本地模拟图片CDN，用于离线测试和基准测试
+#
+# 任意路径都返回一张图片，路径中的数字决定图片内容（/img/3.png 与 /other/3.png 内容相同），
+# 可以设置固定延迟模拟较慢的 QQ CDN，并统计请求次数。
+
+import threading
+import time
+import zlib
+import struct
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_png(seed, size=64):
+    """生成一张 size x size 的纯色PNG，seed 不同颜色不同"""
+    color = bytes([(seed * 53) % 256, (seed * 97) % 256, (seed * 193) % 256])
+    raw = b''.join(b'\x00' + color * size for _ in range(size))
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    header = struct.pack('>IIBBBBB', size, size, 8, 2, 0, 0, 0)
+    return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', zlib.compress(raw)) + chunk(b'IEND', b'')
+
+
+class FakeImageServer(ThreadingHTTPServer):
+    """模拟的图片服务器"""
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, delay=0.0, image_size=64):
+        super().__init__((host, port), _FakeImageHandler)
+        self.delay = delay
+        self.image_size = image_size
+        self.requests = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class _FakeImageHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server._lock:
+            server.requests += 1
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        try:
+            if server.delay:
+                time.sleep(server.delay)
+            digits = ''.join(ch for ch in self.path.split('?')[0] if ch.isdigit()) or '0'
+            body = make_png(int(digits), server.image_size)
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/png')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with server._lock:
+                server.active -= 1
+
+
+def start_fake_image_server(delay=0.0, image_size=64):
+    """启动模拟图片服务器并返回实例"""
+    return FakeImageServer(delay=delay, image_size=image_size).start()
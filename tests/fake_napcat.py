@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# fake_napcat.py - 本地模拟 NapCat HTTP 接口，用于离线测试和基准测试
+#
+# 支持 GET（查询参数）和 POST（JSON/表单）两种方式调用 OneBot 动作，
+# 记录收到的消息，并可以设置固定延迟来模拟较慢的 NapCat。
+# 单独运行: python tests/fake_napcat.py --port 23333 --delay 0.05
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class FakeNapCatServer(ThreadingHTTPServer):
+    """模拟的 NapCat 服务器"""
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, delay=0.0):
+        super().__init__((host, port), _FakeNapCatHandler)
+        self.delay = delay
+        self.messages = []
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def record(self, action, params):
+        with self._lock:
+            self.messages.append((action, params))
+
+    def start(self):
+        """在后台线程中启动服务器"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class _FakeNapCatHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # 支持 keep-alive
+    disable_nagle_algorithm = True  # 避免 keep-alive 连接上的 Nagle/延迟确认 造成 40ms 卡顿
+
+    def setup(self):
+        super().setup()
+        with self.server._lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self):
+        body = json.dumps({"status": "ok", "retcode": 0, "data": {"message_id": len(self.server.messages)}}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        self.server.record(parsed.path.strip('/'), params)
+        self._reply()
+
+    def do_POST(self):
+        parsed = urlparse(self.path)
+        length = int(self.headers.get('Content-Length', 0))
+        raw = self.rfile.read(length) if length else b''
+        if self.headers.get('Content-Type', '').startswith('application/json'):
+            params = json.loads(raw or b'{}')
+        else:
+            params = {k: v[0] for k, v in parse_qs(raw.decode()).items()}
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        self.server.record(parsed.path.strip('/'), params)
+        self._reply()
+
+
+def start_fake_napcat(port=0, delay=0.0):
+    """启动模拟服务器并返回实例，port为0时自动分配端口"""
+    return FakeNapCatServer(port=port, delay=delay).start()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake NapCat HTTP server")
+    parser.add_argument('--port', type=int, default=23333)
+    parser.add_argument('--delay', type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = FakeNapCatServer(port=args.port, delay=args.delay)
+    print(f"Fake NapCat listening on {server.base_url} (delay={args.delay}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# fake_notion.py - 本地模拟 Notion API，用于离线测试和基准测试
+#
+# 支持 databases/{id}/query 和 blocks/{id}/children 两个接口：
+#   query    返回 pages 列表中的页面（默认一个页面 page-0）
+#   children 返回 blocks 字典中对应页面的子块（默认几段文字）
+# 两个接口都按 page_size / start_cursor 分页（与 Notion 一样默认 100 条，游标为下一条的序号）。
+# 可以设置固定延迟来模拟较慢的 Notion。
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def paragraph(text, block_id=None, has_children=False):
+    """构造一个段落块"""
+    return {
+        "object": "block",
+        "id": block_id or f"block-{text}",
+        "type": "paragraph",
+        "has_children": has_children,
+        "paragraph": {"rich_text": [{"type": "text", "plain_text": text, "text": {"content": text}}]},
+    }
+
+
+def nested_blocks(page_id='page-0', top=5, fanout=3, depth=3):
+    """
+    构造嵌套页面：top 个顶层段落，每个段落下有 fanout 个子段落，共 depth 层
+
+    文字按位置编号（"2"、"2.1"、"2.1.3"），返回 (blocks 字典, 按页面顺序排列的 (层级, 文字) 列表)。
+    """
+    blocks, outline = {}, []
+
+    def build(parent_id, prefix, level):
+        count = top if level == 0 else fanout
+        children = []
+        for i in range(1, count + 1):
+            text = f"{prefix}{i}"
+            has_children = level + 1 < depth
+            children.append(paragraph(text, block_id=f"block-{text}", has_children=has_children))
+            outline.append((level, text))
+            if has_children:
+                build(f"block-{text}", f"{text}.", level + 1)
+        blocks[parent_id] = children
+
+    build(page_id, "", 0)
+    return blocks, outline
+
+
+class FakeNotionServer(ThreadingHTTPServer):
+    """模拟的 Notion API 服务器"""
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, delay=0.0, blocks=None, pages=None):
+        super().__init__((host, port), _FakeNotionHandler)
+        self.delay = delay
+        self.pages = pages if pages is not None else [{"object": "page", "id": "page-0"}]
+        self.blocks = blocks if blocks is not None else {
+            'page-0': [paragraph(f"line {i}") for i in range(3)]
+        }
+        self.holds = {}       # 块ID -> threading.Event，设置后该块的子块请求等到事件触发才返回
+        self.requests = 0
+        self.active = 0
+        self.max_active = 0   # 同时处理中的最大请求数，反映客户端的并发度
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1/"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class _FakeNotionHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.body = json.loads(self.rfile.read(length)) if length else {}
+        with self.server._lock:
+            self.server.requests += 1
+            self.server.active += 1
+            self.server.max_active = max(self.server.max_active, self.server.active)
+        try:
+            if self.server.delay:
+                time.sleep(self.server.delay)
+            self._route()
+        finally:
+            with self.server._lock:
+                self.server.active -= 1
+
+    def _reply_list(self, items, params):
+        """按 page_size / start_cursor 返回列表的一页"""
+        start = int(params.get('start_cursor') or 0)
+        end = start + int(params.get('page_size') or 100)
+        has_more = end < len(items)
+        self._reply({"object": "list", "results": items[start:end], "has_more": has_more,
+                     "next_cursor": str(end) if has_more else None})
+
+    def _route(self):
+        url = urlparse(self.path)
+        parts = url.path.strip('/').split('/')
+        if len(parts) >= 4 and parts[1] == 'databases' and parts[3] == 'query':
+            self._reply_list(self.server.pages, self.body)
+        elif len(parts) >= 4 and parts[1] == 'blocks' and parts[3] == 'children':
+            hold = self.server.holds.get(parts[2])
+            if hold is not None:
+                hold.wait(5)
+            blocks = self.server.blocks.get(parts[2])
+            if blocks is None:
+                self._reply({"object": "error", "status": 404}, status=404)
+            else:
+                self._reply_list(blocks, {k: v[0] for k, v in parse_qs(url.query).items()})
+        else:
+            self._reply({"object": "error", "status": 404}, status=404)
+
+    do_GET = _handle
+    do_POST = _handle
+    do_PATCH = _handle
+
+
+def start_fake_notion(port=0, delay=0.0, blocks=None, pages=None):
+    """启动模拟服务器并返回实例，port为0时自动分配端口"""
+    return FakeNotionServer(port=port, delay=delay, blocks=blocks, pages=pages).start()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# fake_onebot_ws.py - 本地模拟 NapCat 正向 WebSocket 接口，用于离线测试和基准测试
+#
+# 接收 {"action", "params", "echo"} 请求，记录 send_group_msg 消息并按 echo 回复；
+# push_event() 向所有已连接的客户端推送上报事件，drop_connections() 断开所有连接以测试重连。
+# 单独运行: python tests/fake_onebot_ws.py --port 3001 --delay 0.05
+
+import argparse
+import asyncio
+import json
+import threading
+import time
+
+from websockets.asyncio.server import serve
+
+
+class FakeOneBotWebSocketServer:
+    """模拟的 NapCat WebSocket 服务器，在后台线程的事件循环中运行"""
+
+    def __init__(self, host='127.0.0.1', port=0, delay=0.0):
+        self.host = host
+        self.port = port
+        self.delay = delay
+        self.messages = []
+        self.message_times = []     # 每条消息到达的 perf_counter 时间
+        self.connections = 0
+        self._clients = set()
+        self._lock = threading.Lock()
+        self._loop = asyncio.new_event_loop()
+        self._stopped = None
+        self._ready = threading.Event()
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._ready.wait(5)
+        return self
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(self._serve())
+
+    async def _serve(self):
+        self._stopped = asyncio.Event()
+        async with serve(self._handler, self.host, self.port) as server:
+            self.port = server.sockets[0].getsockname()[1]
+            self._ready.set()
+            await self._stopped.wait()
+
+    async def _handler(self, ws):
+        with self._lock:
+            self.connections += 1
+        self._clients.add(ws)
+        try:
+            async for raw in ws:
+                request = json.loads(raw)
+                # 每个请求单独处理，模拟 NapCat 并发执行流水线发送的动作
+                asyncio.ensure_future(self._respond(ws, request))
+        except Exception:
+            pass
+        finally:
+            self._clients.discard(ws)
+
+    async def _respond(self, ws, request):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        action = request.get('action')
+        if action == 'send_group_msg':
+            with self._lock:
+                self.messages.append((action, request.get('params', {})))
+                self.message_times.append(time.perf_counter())
+        response = {"status": "ok", "retcode": 0, "data": {"message_id": len(self.messages)},
+                    "echo": request.get('echo')}
+        try:
+            await ws.send(json.dumps(response))
+        except Exception:
+            pass
+
+    def push_event(self, event):
+        """向所有已连接的客户端推送一条事件"""
+        payload = json.dumps(event)
+
+        async def broadcast():
+            for ws in list(self._clients):
+                await ws.send(payload)
+        asyncio.run_coroutine_threadsafe(broadcast(), self._loop).result(5)
+
+    def drop_connections(self):
+        """断开所有客户端连接"""
+        async def close_all():
+            for ws in list(self._clients):
+                await ws.close()
+        asyncio.run_coroutine_threadsafe(close_all(), self._loop).result(5)
+
+    def stop(self):
+        self._loop.call_soon_threadsafe(self._stopped.set)
+        self._thread.join(5)
+
+
+def start_fake_onebot_ws(port=0, delay=0.0):
+    """启动模拟服务器并返回实例，port为0时自动分配端口"""
+    return FakeOneBotWebSocketServer(port=port, delay=delay).start()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake NapCat WebSocket server")
+    parser.add_argument('--port', type=int, default=3001)
+    parser.add_argument('--delay', type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = start_fake_onebot_ws(port=args.port, delay=args.delay)
+    print(f"Fake NapCat WebSocket listening on {server.url} (delay={args.delay}s)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,12 @@
+#!/usr/bin/env python3
+# onebot_events.py - 构造测试用的 OneBot 上报事件
+
+
+def group_event(group_id, text, user_id=10001):
+    """NapCat 上报的群文本消息事件"""
+    return {
+        'self_id': 1, 'user_id': user_id, 'time': 1700000000, 'message_id': 1,
+        'post_type': 'message', 'message_type': 'group', 'sub_type': 'normal', 'group_id': group_id,
+        'message': [{'type': 'text', 'data': {'text': text}}], 'raw_message': text,
+        'sender': {'user_id': user_id, 'nickname': 'tester'},
+    }
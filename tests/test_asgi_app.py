@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# test_asgi_app.py - 测试可选的 ASGI 入口
+
+import asyncio
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+
+import config
+import asgi_app
+from services.async_notion_service import async_notion_service, async_diary_service
+from utils.api_utils import outbound_coalescer, outbound_pool
+from fake_napcat import start_fake_napcat
+from onebot_events import group_event
+from fake_notion import start_fake_notion
+
+
+def test_daily_runs_on_event_loop():
+    """#daily 通过异步 Notion 客户端查询，回复经共用的出站队列发给 NapCat"""
+    group_id = next(iter(config.MONITORED_GROUPS))
+    notion = start_fake_notion()
+    napcat = start_fake_napcat()
+    original = (async_notion_service.base_url, async_diary_service.base_url, config.NAPCAT_BASE_URL)
+    async_notion_service.base_url = async_diary_service.base_url = notion.base_url
+    config.NAPCAT_BASE_URL = napcat.base_url
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=asgi_app.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://bot') as client:
+            ignored = await client.post('/', json=group_event(group_id, 'hello'))
+            accepted = await client.post('/', json=group_event(group_id, '#daily'))
+            await asgi_app.dispatcher.join()
+        outbound_coalescer.flush_all()
+        outbound_pool.join()
+        await async_notion_service.aclose()
+        await async_diary_service.aclose()
+        return ignored, accepted
+
+    try:
+        ignored, accepted = asyncio.run(scenario())
+        assert ignored.text == "No command matched"
+        assert accepted.status_code == 200 and accepted.text == "Accepted"
+        assert len(napcat.messages) == 1
+        action, params = napcat.messages[0]
+        assert action == 'send_group_msg'
+        assert params['group_id'] == group_id
+        assert 'line 0' in params['message']
+    finally:
+        async_notion_service.base_url, async_diary_service.base_url, config.NAPCAT_BASE_URL = original
+        notion.stop()
+        napcat.stop()
+
+
+if __name__ == "__main__":
+    test_daily_runs_on_event_loop()
+    print("asgi tests passed")
@@ -7,7 +7,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 def test_command_matching():
     """测试命令匹配"""
-    from app import COMMAND_ROUTER
+    from app import command_router
 
     test_commands = [
         "#machine_search 铁锭",
@@ -15,18 +15,17 @@ def test_command_matching():
         "#machine_regions",
         "#mechine_search 铁锭",  # 拼写错误
         "#aql test",
+        "#atadd 小明 123456",
+        "#not edit key 内容",
         "#help"
     ]
 
     print("Testing command matching...")
     for cmd in test_commands:
-        matched = False
-        for route_cmd in COMMAND_ROUTER:
-            if cmd.startswith(route_cmd):
-                print(f"[MATCH] '{cmd}' -> '{route_cmd}' -> {COMMAND_ROUTER[route_cmd].__name__}")
-                matched = True
-                break
-        if not matched:
+        route = command_router.match(cmd)
+        if route:
+            print(f"[MATCH] '{cmd}' -> '{route.command}' -> {route.handler.__name__} (args: '{route.args}')")
+        else:
             print(f"[NO MATCH] '{cmd}'")
 
 def test_machine_handler():
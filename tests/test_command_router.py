@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# test_command_router.py - 测试前缀树命令路由器
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.command_router import CommandRouter
+
+
+def _handler(name):
+    def handler(event):
+        return name
+    handler.__name__ = name
+    return handler
+
+
+def test_longest_prefix_wins():
+    """测试最长前缀优先，与注册顺序无关"""
+    router = CommandRouter({
+        '#at': _handler('at'),
+        '#atadd': _handler('atadd'),
+        '#not': _handler('not'),
+        '#not edit': _handler('not_edit'),
+    })
+
+    route = router.match('#atadd 小明 123')
+    assert route.command == '#atadd'
+    assert route.handler.__name__ == 'atadd'
+    assert route.args == '小明 123'
+
+    assert router.match('#at 全体').command == '#at'
+    assert router.match('#not edit key 内容').args == 'key 内容'
+    assert router.match('#not rules').command == '#not'
+
+
+def test_no_match():
+    """测试未命中命令"""
+    router = CommandRouter({'#help': _handler('help')})
+    assert router.match('hello') is None
+    assert router.match('#hel') is None
+    assert router.match('') is None
+    assert len(router) == 1
+
+
+if __name__ == "__main__":
+    test_longest_prefix_wins()
+    test_no_match()
+    print("command router tests passed")
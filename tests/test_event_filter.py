@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# test_event_filter.py - 测试解析 JSON 之前的事件预过滤
+
+import json
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import config
+from utils.event_filter import prefilter_event
+from onebot_events import group_event
+
+MONITORED = next(iter(config.MONITORED_GROUPS))
+UNMONITORED = max(config.MONITORED_GROUPS) + 1
+
+
+def _raw(event, compact=False):
+    return json.dumps(event, ensure_ascii=False, separators=(',', ':') if compact else None).encode()
+
+
+def test_irrelevant_events_are_dropped():
+    """心跳、通知、私聊和未监听群的消息在解析前被丢弃"""
+    heartbeat = {'post_type': 'meta_event', 'meta_event_type': 'heartbeat', 'status': {'online': True}}
+    notice = {'post_type': 'notice', 'notice_type': 'group_increase', 'group_id': MONITORED}
+    private = {'post_type': 'message', 'message_type': 'private', 'user_id': 10001, 'message': '#daily'}
+
+    assert prefilter_event(_raw(heartbeat)) == "Not a group message event"
+    assert prefilter_event(_raw(notice, compact=True)) == "Not a group message event"
+    assert prefilter_event(_raw(private)) == "Not a group message event"
+    assert prefilter_event(_raw(group_event(UNMONITORED, '#daily'))) == "Group not monitored"
+    assert prefilter_event(json.dumps(heartbeat)) == "Not a group message event"
+
+
+def test_relevant_or_ambiguous_events_pass():
+    """需要处理或无法确定的报文交给完整解析"""
+    assert prefilter_event(_raw(group_event(MONITORED, '#daily'))) is None
+    # 消息文本里的引号被转义，不会被当成字段
+    spoof = group_event(MONITORED, '"post_type": "notice", "group_id": 1')
+    assert prefilter_event(_raw(spoof)) is None
+    # 嵌套对象里出现不同的 group_id 时不做判断
+    nested = group_event(MONITORED, 'hi')
+    nested['extra'] = {'group_id': UNMONITORED}
+    assert prefilter_event(_raw(nested)) is None
+    # WebSocket 动作响应没有 post_type
+    response = {'status': 'ok', 'retcode': 0, 'data': {'group_id': UNMONITORED}, 'echo': '1'}
+    assert prefilter_event(json.dumps(response)) is None
+    assert prefilter_event(b'not json') is None
+
+
+def test_prefilter_can_be_disabled():
+    config.EVENT_PREFILTER['enabled'] = False
+    try:
+        assert prefilter_event(_raw({'post_type': 'meta_event'})) is None
+    finally:
+        config.EVENT_PREFILTER['enabled'] = True
+
+
+def test_webhook_drops_heartbeat():
+    import app as bot_app
+
+    client = bot_app.app.test_client()
+    response = client.post('/', data=_raw({'post_type': 'meta_event', 'meta_event_type': 'heartbeat'}),
+                           content_type='application/json')
+    assert response.get_data(as_text=True) == "Not a group message event"
+    response = client.post('/', data=b'{broken', content_type='application/json')
+    assert response.get_data(as_text=True) == "Not a group message event"
+
+
+if __name__ == "__main__":
+    test_irrelevant_events_are_dropped()
+    test_relevant_or_ambiguous_events_pass()
+    test_prefilter_can_be_disabled()
+    test_webhook_drops_heartbeat()
+    print("event filter tests passed")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# test_event_queue.py - 测试 webhook 入站事件队列
+
+import os
+import sys
+import threading
+import time
+from unittest import mock
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import config
+import app as bot_app
+from utils.command_router import CommandRouter
+from utils.worker_pool import PartitionedWorkerPool
+from onebot_events import group_event
+
+
+def test_receive_event_returns_before_handler_finishes():
+    """慢命令不阻塞 webhook，同一个群的命令按到达顺序执行"""
+    group_id = next(iter(config.MONITORED_GROUPS))
+    seen = []
+    release = threading.Event()
+
+    def slow_handler(event_data):
+        release.wait(5)
+        seen.append(event_data['args'])
+
+    original_pool = bot_app.event_pool
+    config.RATE_LIMIT['enabled'] = False
+    bot_app.event_pool = PartitionedWorkerPool('test-events', workers=2, max_pending=10, put_timeout=0)
+    client = bot_app.app.test_client()
+    try:
+        start = time.perf_counter()
+        with mock.patch.object(bot_app, 'command_router', CommandRouter({'#queuetest': slow_handler})):
+            for i in range(5):
+                response = client.post('/', json=group_event(group_id, f'#queuetest {i}'))
+                assert response.status_code == 200
+        assert time.perf_counter() - start < 1.0
+        assert seen == []
+
+        release.set()
+        bot_app.event_pool.join()
+        assert seen == ['0', '1', '2', '3', '4']
+        assert bot_app.event_pool.stats()['completed'] == 5
+    finally:
+        bot_app.event_pool = original_pool
+        config.RATE_LIMIT['enabled'] = True
+
+
+def test_receive_event_sheds_load_when_full():
+    """队列已满时丢弃事件并返回 503"""
+    group_id = next(iter(config.MONITORED_GROUPS))
+    release = threading.Event()
+
+    original_pool = bot_app.event_pool
+    config.RATE_LIMIT['enabled'] = False
+    bot_app.event_pool = PartitionedWorkerPool('test-events', workers=1, max_pending=1, put_timeout=0)
+    router = CommandRouter({'#queuetest': lambda event_data: release.wait(5)})
+    client = bot_app.app.test_client()
+    try:
+        with mock.patch.object(bot_app, 'command_router', router):
+            codes = [client.post('/', json=group_event(group_id, '#queuetest')).status_code for _ in range(4)]
+        assert 503 in codes
+        assert bot_app.event_pool.stats()['rejected'] >= 1
+    finally:
+        release.set()
+        bot_app.event_pool.join()
+        bot_app.event_pool = original_pool
+        config.RATE_LIMIT['enabled'] = True
+
+
+def test_slow_group_does_not_block_other_groups():
+    """慢任务只占用一个线程，其他群的任务不受影响，排队名额由所有群共用"""
+    pool = PartitionedWorkerPool('test-hol', workers=2, max_pending=5, put_timeout=0)
+    release = threading.Event()
+    done = []
+    try:
+        # 无论群号如何散列，群 1 的慢任务和后续任务都不会挡住群 2、群 3
+        assert pool.submit(1, release.wait, 5)
+        assert pool.submit(1, done.append, 'a1')
+        for group_id in (2, 3, 2):
+            assert pool.submit(group_id, done.append, f'g{group_id}')
+        deadline = time.monotonic() + 2
+        while len(done) < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert sorted(done) == ['g2', 'g2', 'g3']
+
+        # 群 1 独占剩余的全部名额
+        for i in range(4):
+            assert pool.submit(1, done.append, f'a{i + 2}')
+        assert pool.depth() == 5
+        assert not pool.submit(1, done.append, 'overflow')
+        assert pool.stats()['rejected'] == 1
+    finally:
+        release.set()
+        pool.join()
+    assert done[3:] == ['a1', 'a2', 'a3', 'a4', 'a5']
+
+
+if __name__ == "__main__":
+    test_receive_event_returns_before_handler_finishes()
+    test_receive_event_sheds_load_when_full()
+    test_slow_group_does_not_block_other_groups()
+    print("event queue tests passed")
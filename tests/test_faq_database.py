@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# test_faq_database.py - 测试FAQ数据库管理器
+
+import sys
+import os
+import sqlite3
+import tempfile
+from unittest import mock
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.database_manager import DatabaseManager
+
+
+def _make_manager(tmp):
+    return DatabaseManager(os.path.join(tmp, 'faq.db'))
+
+
+def test_hot_key_cache_and_invalidation():
+    """测试热点缓存命中，以及写入/删除后的精确失效"""
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = _make_manager(tmp)
+        manager.set_faq_content('rules', '群规 v1')
+        manager.set_faq_content('ip', '127.0.0.1')
+
+        assert manager.get_faq_content('rules') == '群规 v1'
+        assert manager.get_faq_content('rules') == '群规 v1'
+        assert manager.get_faq_content('ip') == '127.0.0.1'
+        stats = manager.get_cache_stats()
+        assert stats['hits'] == 1 and stats['misses'] == 2
+
+        manager.set_faq_content('rules', '群规 v2')
+        assert manager.get_faq_content('rules') == '群规 v2'
+        # 未修改的key仍在缓存中
+        hits = manager.get_cache_stats()['hits']
+        assert manager.get_faq_content('ip') == '127.0.0.1'
+        assert manager.get_cache_stats()['hits'] == hits + 1
+
+        assert manager.delete_faq_content('rules')
+        assert manager.get_faq_content('rules') is None
+        manager.close()
+
+
+def test_full_text_search_stays_in_sync():
+    """测试全文搜索随写入、更新、删除同步"""
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = _make_manager(tmp)
+        manager.set_faq_content('rules', '群规：禁止刷屏，禁止广告')
+        manager.set_faq_content('server', '服务器地址 mc.example.com')
+
+        assert [k for k, _ in manager.search_faq('禁止刷屏')] == ['rules']
+        assert [k for k, _ in manager.search_faq('刷屏')] == ['rules']
+        assert [k for k, _ in manager.search_faq('example 服务器')] == ['server']
+
+        manager.set_faq_content('rules', '群规：友善交流')
+        assert manager.search_faq('禁止刷屏') == []
+        assert [k for k, _ in manager.search_faq('友善交流')] == ['rules']
+
+        manager.delete_faq_content('rules')
+        assert manager.search_faq('友善交流') == []
+        manager.close()
+
+
+def test_suggest_similar_keys():
+    """测试未命中时的相似key推荐"""
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = _make_manager(tmp)
+        for key in ('server_ip', 'rules', 'modpack', 'ip'):
+            manager.set_faq_content(key, f"{key} 内容")
+
+        assert manager.suggest_faq_keys('servr_ip')[0] == 'server_ip'
+        assert manager.suggest_faq_keys('modpak')[0] == 'modpack'
+        assert 'rules' in manager.suggest_faq_keys('rule')
+        assert manager.suggest_faq_keys('zzzzzz') == []
+        manager.close()
+
+
+def test_keys_are_case_insensitive():
+    """测试key不区分大小写和全半角"""
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = _make_manager(tmp)
+        manager.set_faq_content('Rules', '群规 v1')
+        assert manager.get_faq_content('rules') == '群规 v1'
+        assert manager.get_faq_content('ＲＵＬＥＳ') == '群规 v1'
+
+        # 不同写法写入的是同一条目，展示用的key更新为最近一次的写法
+        manager.set_faq_content('RULES', '群规 v2')
+        assert manager.list_all_faq_keys() == ['RULES']
+        assert manager.get_faq_content('Rules') == '群规 v2'
+
+        assert manager.delete_faq_content('rules')
+        assert manager.list_all_faq_keys() == []
+        manager.close()
+
+
+def test_migrates_legacy_database():
+    """测试旧版 faq.db 迁移：回填规范化key，重复条目改名保留，不丢内容"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'faq.db')
+        with sqlite3.connect(db_path) as conn:
+            conn.execute('''
+                CREATE TABLE faq (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    key TEXT NOT NULL UNIQUE,
+                    contents TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            conn.execute("INSERT INTO faq (key, contents, updated_at) VALUES ('IP', '旧地址', '2024-01-01')")
+            conn.execute("INSERT INTO faq (key, contents, updated_at) VALUES ('ip', '新地址', '2024-06-01')")
+            conn.execute("INSERT INTO faq (key, contents, updated_at) VALUES ('ＡＢＣ', '全角', '2024-01-01')")
+            conn.execute("INSERT INTO faq (key, contents, updated_at) VALUES ('abc', '半角', '2024-06-01')")
+            # 改名时避开已有的 key
+            conn.execute("INSERT INTO faq (key, contents, updated_at) VALUES ('abc_2', '已有', '2024-06-01')")
+            conn.execute("INSERT INTO faq (key, contents) VALUES ('rules', '群规')")
+
+        manager = DatabaseManager(db_path)
+        assert manager.list_all_faq_keys() == ['IP_2', 'abc', 'abc_2', 'ip', 'rules', 'ＡＢＣ_3']
+        assert manager.get_faq_content('IP') == '新地址'
+        assert manager.get_faq_content('ip_2') == '旧地址'
+        assert manager.get_faq_content('abc') == '半角'
+        assert manager.get_faq_content('abc_2') == '已有'
+        assert manager.get_faq_content('abc_3') == '全角'
+        assert [k for k, _ in manager.search_faq('旧地址')] == ['IP_2']
+        manager.close()
+
+        with sqlite3.connect(db_path) as conn:
+            assert conn.execute('SELECT COUNT(*) FROM faq').fetchone()[0] == 6
+            assert conn.execute('PRAGMA user_version').fetchone()[0] == DatabaseManager.SCHEMA_VERSION
+            plan = conn.execute("EXPLAIN QUERY PLAN SELECT contents FROM faq WHERE key_norm = 'ip'").fetchall()
+            assert 'idx_faq_key_norm' in str(plan)
+
+
+def test_list_keys_by_page():
+    """测试按页获取FAQ key"""
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = _make_manager(tmp)
+        for i in range(25):
+            manager.set_faq_content(f"key{i:02d}", "x")
+
+        keys, total = manager.list_faq_keys_page(2, 10)
+        assert total == 25
+        assert keys == [f"key{i:02d}" for i in range(10, 20)]
+        assert manager.list_faq_keys_page(3, 10)[0] == [f"key{i:02d}" for i in range(20, 25)]
+        assert manager.list_faq_keys_page(4, 10) == ([], 25)
+        manager.close()
+
+
+def test_search_command_dispatch():
+    """#not search 显示搜索用法，以 search 开头的key仍按查询处理"""
+    from handlers import faq_handler
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = _make_manager(tmp)
+        manager.set_faq_content('searching', '搜索教程')
+        sent = []
+        with mock.patch.object(faq_handler, 'database_manager', manager), \
+                mock.patch.object(faq_handler, 'send_group_message', lambda group_id, text: sent.append(text)):
+            for text in ('#not searching', '#not search', '#not search 教程'):
+                faq_handler.handle_faq_command({'group_id': 1, 'message': text})
+        assert sent[0] == '📖 FAQ [searching]:\n\n搜索教程'
+        assert sent[1] == "❌ 格式错误，请使用: #not search <关键词>"
+        assert sent[2].startswith("🔍 搜索 [教程] 的结果") and 'searching' in sent[2]
+        manager.close()
+
+
+if __name__ == "__main__":
+    test_hot_key_cache_and_invalidation()
+    test_full_text_search_stays_in_sync()
+    test_suggest_similar_keys()
+    test_keys_are_case_insensitive()
+    test_migrates_legacy_database()
+    test_list_keys_by_page()
+    test_search_command_dispatch()
+    print("faq database tests passed")
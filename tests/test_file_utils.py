@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# test_file_utils.py - 测试JSON文件缓存
+
+import sys
+import os
+import json
+import tempfile
+import threading
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import file_utils
+import config
+from utils.file_utils import load_json, dump_json, json_transaction
+
+
+def test_cache_hit_and_write_through():
+    """测试文件未变化时不重新解析，写入后直接命中缓存"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'list.json')
+        dump_json(path, ['a', 'b'])
+
+        calls = []
+        original_load = json.load
+        json.load = lambda f: calls.append(f) or original_load(f)
+        try:
+            assert load_json(path) == ['a', 'b']
+            assert load_json(path) == ['a', 'b']
+        finally:
+            json.load = original_load
+        assert calls == []
+
+
+def test_external_change_invalidates_cache():
+    """测试外部进程改写文件后能读到新内容"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'code.json')
+        dump_json(path, {'acc': '111'})
+        assert load_json(path) == {'acc': '111'}
+
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'acc': '222222'}, f)
+        assert load_json(path) == {'acc': '222222'}
+
+
+def test_returned_data_is_a_copy():
+    """测试修改返回值不会污染缓存"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'at.json')
+        dump_json(path, {'nickname': {'x': ['1']}})
+        data = load_json(path)
+        data['nickname']['x'].append('2')
+        assert load_json(path) == {'nickname': {'x': ['1']}}
+
+
+def test_missing_file_default():
+    """测试文件不存在时返回默认值"""
+    with tempfile.TemporaryDirectory() as tmp:
+        assert load_json(os.path.join(tmp, 'ze_account.json')) == {}
+        assert load_json(os.path.join(tmp, 'wd.json')) == []
+        file_utils.invalidate_json_cache()
+
+
+def test_parallel_transactions_lose_no_updates():
+    """压力测试：大量并发 读-改-写 不会丢失任何更新"""
+    threads_count, per_thread = 8, 250
+    fsync_mode = config.JSON_STORE['fsync']
+    config.JSON_STORE['fsync'] = 'never'
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            list_path = os.path.join(tmp, 'wd.json')
+            dict_path = os.path.join(tmp, 'ze_account.json')
+            dump_json(list_path, [])
+
+            def worker(index):
+                for i in range(per_thread):
+                    with json_transaction(list_path) as items:
+                        items.append(f"{index}-{i}")
+                    with json_transaction(dict_path) as counters:
+                        counters['total'] = counters.get('total', 0) + 1
+
+            threads = [threading.Thread(target=worker, args=(n,)) for n in range(threads_count)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            items = load_json(list_path)
+            assert len(items) == threads_count * per_thread
+            assert len(set(items)) == len(items)
+            assert load_json(dict_path)['total'] == threads_count * per_thread
+
+            # 从磁盘重新读取，确认文件内容完整
+            with open(list_path, encoding='utf-8') as f:
+                assert len(json.load(f)) == threads_count * per_thread
+            assert not [name for name in os.listdir(tmp) if name.endswith('.tmp')]
+    finally:
+        config.JSON_STORE['fsync'] = fsync_mode
+
+
+def test_failed_transaction_keeps_file():
+    """测试事务中抛出异常时不写回文件"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'mc.json')
+        dump_json(path, ['a'])
+        try:
+            with json_transaction(path) as items:
+                items.append('b')
+                raise RuntimeError("boom")
+        except RuntimeError:
+            pass
+        assert load_json(path) == ['a']
+
+
+if __name__ == "__main__":
+    test_cache_hit_and_write_through()
+    test_external_change_invalidates_cache()
+    test_returned_data_is_a_copy()
+    test_missing_file_default()
+    test_parallel_transactions_lose_no_updates()
+    test_failed_transaction_keeps_file()
+    print("file utils tests passed")
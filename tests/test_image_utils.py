@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# test_image_utils.py - 测试FAQ图片下载和内容寻址存储
+
+import sys
+import os
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.database_manager import DatabaseManager
+from utils.image_utils import ImageManager, HAS_PIL
+from fake_image_server import start_fake_image_server
+
+
+def _make_manager(tmp):
+    database = DatabaseManager(os.path.join(tmp, 'faq.db'))
+    return ImageManager(os.path.join(tmp, 'images'), database=database)
+
+
+def test_content_addressed_dedup():
+    """测试不同URL的相同图片只保存一份，重复URL不再访问网络"""
+    server = start_fake_image_server()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            manager = _make_manager(tmp)
+            images_dir = manager.images_dir
+            first = manager.download_image(f"{server.base_url}/cdn-a/7.png?rkey=1")
+            second = manager.download_image(f"{server.base_url}/cdn-b/7?rkey=2")
+            other = manager.download_image(f"{server.base_url}/cdn-a/8.png")
+
+            assert first == second
+            assert first != other
+            assert first.endswith('.png') and second.endswith('.png')
+            assert sorted(f for f in os.listdir(images_dir) if f.endswith('.png')) == sorted(
+                {os.path.basename(first), os.path.basename(other)})
+            assert not [f for f in os.listdir(images_dir) if f.endswith('.tmp')]
+
+            requests_before = server.requests
+            assert manager.download_image(f"{server.base_url}/cdn-b/7?rkey=2") == second
+            # 新实例从持久化的URL索引中加载
+            assert ImageManager(images_dir, database=manager.database).download_image(f"{server.base_url}/cdn-a/8.png") == other
+            assert server.requests == requests_before
+    finally:
+        server.stop()
+
+
+def test_process_content_images():
+    """测试内容中的图片URL被替换为本地CQ码"""
+    server = start_fake_image_server()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            manager = _make_manager(tmp)
+            url = f"{server.base_url}/img/1.png"
+            content = f"看图 [CQ:image,url={url}] 再看 [CQ:image,url={url}] [CQ:image,url=http://127.0.0.1:1/x.png]"
+            result = manager.process_content_images(content)
+
+            assert result.count('[CQ:image,file=file:///') == 2
+            # 下载失败的图片保留原样
+            assert '[CQ:image,url=http://127.0.0.1:1/x.png]' in result
+            assert server.requests == 1
+    finally:
+        server.stop()
+
+
+def test_garbage_collection_follows_references():
+    """测试垃圾回收只删除不再被FAQ引用的图片"""
+    server = start_fake_image_server()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            manager = _make_manager(tmp)
+            database = manager.database
+            urls = [f"{server.base_url}/img/{i}.png" for i in range(3)]
+            content = manager.process_content_images(' '.join(f"[CQ:image,url={u}]" for u in urls[:2]))
+            database.set_faq_content('guide', content)
+            # 第三张图下载了但没有保存到任何FAQ
+            unused = os.path.basename(manager.download_image(urls[2]))
+            first, second = database.extract_image_files(content)
+
+            # 宽限期内不回收
+            assert manager.collect_garbage(grace_seconds=3600) == 0
+            assert manager.collect_garbage(grace_seconds=0) == 1
+            assert not os.path.exists(os.path.join(manager.images_dir, unused))
+
+            # 编辑后只保留第一张图
+            database.set_faq_content('guide', content.split(' ')[0])
+            database.set_faq_content('copy', content.split(' ')[0])
+            assert manager.collect_garbage(grace_seconds=0) == 1
+            assert os.path.exists(os.path.join(manager.images_dir, first))
+            assert not os.path.exists(os.path.join(manager.images_dir, second))
+
+            # 仍有一个FAQ引用时不回收
+            database.delete_faq_content('guide')
+            assert manager.collect_garbage(grace_seconds=0) == 0
+            database.delete_faq_content('copy')
+            assert manager.collect_garbage(batch_size=10, grace_seconds=0) == 1
+            assert not os.path.exists(os.path.join(manager.images_dir, first))
+
+            # 被回收的URL需要重新下载
+            requests_before = server.requests
+            manager.download_image(urls[0])
+            assert server.requests == requests_before + 1
+    finally:
+        server.stop()
+
+
+def test_reused_image_survives_gc_before_save():
+    """复用已下载的图片时刷新宽限期，下载完成到FAQ保存之间的垃圾回收不会删除它"""
+    server = start_fake_image_server()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            manager = _make_manager(tmp)
+            database = manager.database
+
+            def expire_orphans():
+                # 模拟之前下载过、早已超过宽限期的无引用图片
+                with database._connection() as conn, conn:
+                    conn.execute('UPDATE faq_images SET orphaned_at = 0 WHERE refcount <= 0')
+
+            url = f"{server.base_url}/cdn-a/7.png"
+            for reuse_url in (url, f"{server.base_url}/cdn-b/7.png"):   # URL索引命中 / 内容哈希相同
+                manager.download_image(url)
+                expire_orphans()
+                filepath = manager.download_image(reuse_url)
+                assert manager.collect_garbage(grace_seconds=600) == 0
+                assert os.path.exists(filepath)
+
+                filename = os.path.basename(filepath)
+                database.set_faq_content('guide', f"[CQ:image,file=file:///{filename}]")
+                assert manager.collect_garbage(grace_seconds=0) == 0
+                database.delete_faq_content('guide')
+                assert manager.collect_garbage(grace_seconds=0) == 1
+    finally:
+        server.stop()
+
+
+def test_compact_variant_for_large_images():
+    """测试大图在编辑时生成缩小版，查询时替换为缩小版"""
+    if not HAS_PIL:
+        print("Pillow 不可用，跳过缩小版测试")
+        return
+
+    from PIL import Image
+
+    server = start_fake_image_server(image_size=1600)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            manager = _make_manager(tmp)
+            content = manager.process_content_images(f"大图 [CQ:image,url={server.base_url}/img/5.png]")
+            compact = manager.compact_content(content)
+
+            assert compact != content
+            variant = compact.split('file:///')[1].rstrip(']')
+            with Image.open(variant) as img:
+                assert max(img.size) <= 1280
+
+            # 回收原图时一并删除缩小版
+            manager.database.delete_faq_content('none')
+            assert manager.collect_garbage(grace_seconds=0) == 1
+            assert not os.path.exists(variant)
+            assert manager.compact_content(content) == content
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    test_content_addressed_dedup()
+    test_process_content_images()
+    test_garbage_collection_follows_references()
+    test_reused_image_survives_gc_before_save()
+    test_compact_variant_for_large_images()
+    print("image utils tests passed")
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# test_log.py - 测试队列日志处理器与 DEBUG 采样
+
+import io
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from unittest import mock
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import config
+from utils.command_router import CommandRouter
+from utils.log import DebugSampler, NonBlockingQueueHandler
+from onebot_events import group_event
+
+
+class CountingArg:
+    """记录被格式化次数的日志参数"""
+
+    def __init__(self):
+        self.formatted = 0
+
+    def __str__(self):
+        self.formatted += 1
+        return 'payload'
+
+
+def _logger(name, handler):
+    logger = logging.getLogger(f'qqbot.test.{name}')
+    logger.handlers[:] = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    return logger
+
+
+def test_formatting_happens_in_listener():
+    """调用方只入队，消息由后台线程格式化写出"""
+    stream = io.StringIO()
+    handler = NonBlockingQueueHandler(queue.Queue())
+    logger = _logger('lazy', handler)
+    arg = CountingArg()
+
+    logger.info("event %s", arg)
+    assert arg.formatted == 0
+
+    listener = logging.handlers.QueueListener(handler.queue, logging.StreamHandler(stream))
+    listener.start()
+    listener.stop()
+    assert arg.formatted == 1
+    assert stream.getvalue() == "event payload\n"
+
+
+def test_full_queue_drops_instead_of_blocking():
+    """队列满时丢弃并计数，调用方不阻塞"""
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=2))
+    logger = _logger('full', handler)
+    for i in range(5):
+        logger.warning("line %d", i)
+    assert handler.queue.qsize() == 2
+    assert handler.dropped == 3
+
+
+def test_debug_lines_are_sampled_per_template():
+    """同一 DEBUG 模板每 N 条输出 1 条，其他级别全部输出"""
+    handler = NonBlockingQueueHandler(queue.Queue())
+    handler.addFilter(DebugSampler(10))
+    logger = _logger('sample', handler)
+    for i in range(25):
+        logger.debug("event %d", i)
+        logger.debug("other %d", i)
+        logger.info("info %d", i)
+
+    records = []
+    while not handler.queue.empty():
+        records.append(handler.queue.get_nowait())
+    assert [r.getMessage() for r in records if r.msg == "event %d"] == ["event 0", "event 10", "event 20"]
+    assert len([r for r in records if r.msg == "other %d"]) == 3
+    assert len([r for r in records if r.levelno == logging.INFO]) == 25
+
+
+def test_event_debug_line_shows_raw_body():
+    """事件的 DEBUG 日志在后台线程格式化时仍是收到的原始报文，不受 prepare_event 改写影响"""
+    import app as bot_app
+
+    handler = NonBlockingQueueHandler(queue.Queue())
+    body = json.dumps(group_event(next(iter(config.MONITORED_GROUPS)), '#logtest 参数'), ensure_ascii=False)
+    with mock.patch.object(bot_app.logger, 'handlers', [handler]), \
+            mock.patch.object(bot_app.logger, 'propagate', False), \
+            mock.patch.object(bot_app, 'command_router', CommandRouter({'#logtest': lambda event_data: None})), \
+            mock.patch.dict(config.EVENT_QUEUE, {'enabled': False}), \
+            mock.patch.dict(config.RATE_LIMIT, {'enabled': False}):
+        level = bot_app.logger.level
+        bot_app.logger.setLevel(logging.DEBUG)
+        try:
+            bot_app.handle_raw_event(body.encode('utf-8'))
+        finally:
+            bot_app.logger.setLevel(level)
+
+    records = []
+    while not handler.queue.empty():
+        records.append(handler.queue.get_nowait())
+    assert [r.getMessage() for r in records if r.msg == "Event: %s"] == [f"Event: {body}"]
+
+
+if __name__ == "__main__":
+    test_formatting_happens_in_listener()
+    test_full_queue_drops_instead_of_blocking()
+    test_debug_lines_are_sampled_per_template()
+    test_event_debug_line_shows_raw_body()
+    print("log tests passed")
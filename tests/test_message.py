@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# test_message.py - 测试消息段模型与 CQ 码编解码
+
+import os
+import sys
+import tempfile
+from unittest import mock
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import config
+from services.database_manager import DatabaseManager
+from utils.image_utils import ImageManager
+from utils.message import (cq_code, decode_cq, drop_words, encode_cq, image_segment, iter_cq_codes, local_file,
+                           parse_message, plain_text, segment, strip_segments, sub_cq, text_segment)
+from fake_image_server import start_fake_image_server
+
+
+def test_encode_decode_round_trip():
+    """文本和参数中的特殊字符按 OneBot 规范转义，解码后还原"""
+    segments = [
+        text_segment('a[1]&b'),
+        image_segment(url='https://cdn.example.com/x?a=1&b=2,3'),
+        segment('at', qq='123'),
+        text_segment(' 结尾'),
+    ]
+    encoded = encode_cq(segments)
+    assert encoded == ('a&#91;1&#93;&amp;b[CQ:image,url=https://cdn.example.com/x?a=1&amp;b=2&#44;3]'
+                       '[CQ:at,qq=123] 结尾')
+    assert decode_cq(encoded) == segments
+    assert cq_code('at', qq=42) == '[CQ:at,qq=42]'
+
+
+def test_decode_legacy_content():
+    """兼容旧数据：未转义的 & 和 URL 中的逗号"""
+    content = '看图 [CQ:image,url=http://x/a.png?k=1&r=2,3] [CQ:image,file=file:///data/faq_images/ab.png]'
+    urls = [seg['data'].get('url') for seg in iter_cq_codes(content, 'image')]
+    assert urls == ['http://x/a.png?k=1&r=2,3', None]
+    assert [local_file(seg) for seg in iter_cq_codes(content)] == [None, 'data/faq_images/ab.png']
+    # 替换时文本部分原样保留
+    assert sub_cq(content, lambda seg: '[图]' if local_file(seg) else None) == \
+        '看图 [CQ:image,url=http://x/a.png?k=1&r=2,3] [图]'
+
+
+def test_parse_message_reuses_segment_data():
+    """数组格式的消息原样使用，字符串格式按 CQ 码解析"""
+    message = [{'type': 'text', 'data': {'text': '#not edit k '}}, {'type': 'image', 'data': {'url': 'u'}}]
+    segments = parse_message(message)
+    assert segments is message
+    assert parse_message('#ping[CQ:face,id=1]') == [text_segment('#ping'), segment('face', id='1')]
+    assert plain_text(segments) == '#not edit k '
+    assert plain_text(segments, {'image': '[图片]'}) == '#not edit k [图片]'
+
+
+def test_drop_words_keeps_following_segments():
+    segments = [segment('reply', id='9'), text_segment(' #not  edit key 第一行\n'),
+                image_segment(url='u'), text_segment('  ')]
+    assert strip_segments(drop_words(segments, 3)) == [text_segment('第一行\n'), image_segment(url='u')]
+    assert strip_segments(drop_words([text_segment('#not edit key')], 3)) == []
+
+
+def test_faq_edit_stores_text_and_images_once():
+    """#not edit 的文本和图片按原顺序保存，内容不重复"""
+    import app as bot_app
+    from handlers import faq_handler
+
+    server = start_fake_image_server()
+    sent = []
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            database = DatabaseManager(os.path.join(tmp, 'faq.db'))
+            images = ImageManager(os.path.join(tmp, 'images'), database=database)
+            event = {
+                'post_type': 'message', 'message_type': 'group', 'user_id': 10001,
+                'group_id': next(iter(config.MONITORED_GROUPS)),
+                'message': [
+                    {'type': 'text', 'data': {'text': '#not edit 路由 看 [这张]：'}},
+                    {'type': 'image', 'data': {'file': 'a.png', 'url': f'{server.base_url}/img/1.png', 'file_size': '9'}},
+                    {'type': 'text', 'data': {'text': ' 完'}},
+                ],
+            }
+            with mock.patch.object(faq_handler, 'database_manager', database), \
+                    mock.patch.object(faq_handler, 'image_manager', images), \
+                    mock.patch.object(faq_handler, 'send_group_message', lambda group_id, text: sent.append(text)), \
+                    mock.patch.dict(config.RATE_LIMIT, {'enabled': False}):
+                route, reason = bot_app.prepare_event(event)
+                route.handler(event)
+
+            stored = decode_cq(database.get_faq_content('路由'))
+            assert stored[0] == text_segment('看 [这张]：')
+            assert local_file(stored[1]).startswith(os.path.relpath(images.images_dir))
+            assert stored[2] == text_segment(' 完')
+            assert sent == ["✅ FAQ条目 [路由] 已更新", "🖼️ 图片已下载并保存到本地"]
+            database.close()
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    test_encode_decode_round_trip()
+    test_decode_legacy_content()
+    test_parse_message_reuses_segment_data()
+    test_drop_words_keeps_following_segments()
+    test_faq_edit_stores_text_and_images_once()
+    print("message tests passed")
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# test_message_coalescer.py - 测试出站消息合并
+
+import os
+import sys
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.message_coalescer import MessageCoalescer
+
+
+def test_pack_respects_length_and_cq_codes():
+    """合并后不超过长度上限，CQ码消息单独发送且顺序不变"""
+    coalescer = MessageCoalescer(lambda key, text: None, max_length=10)
+    messages = ["aaa", "bbb", "[CQ:at,qq=1]", "ccc", "dddddd", "e" * 12, "f"]
+    assert coalescer.pack(messages) == ["aaa\nbbb", "[CQ:at,qq=1]", "ccc\ndddddd", "e" * 12, "f"]
+
+
+def test_messages_within_window_are_merged_per_group():
+    """窗口内同一个群的消息合并为一次发送，不同群分开发送"""
+    sent = []
+    done = threading.Event()
+
+    def flush(key, text):
+        sent.append((key, text))
+        if len(sent) == 2:
+            done.set()
+
+    coalescer = MessageCoalescer(flush, window=0.05)
+    coalescer.add(1, "✅ FAQ条目 [rules] 已更新")
+    coalescer.add(2, "hello")
+    coalescer.add(1, "🖼️ 图片已下载并保存到本地")
+    assert done.wait(2)
+    time.sleep(0.1)
+
+    assert sorted(sent) == [(1, "✅ FAQ条目 [rules] 已更新\n🖼️ 图片已下载并保存到本地"), (2, "hello")]
+    stats = coalescer.stats()
+    assert stats['messages'] == 3 and stats['sends'] == 2 and stats['buffered'] == 0
+
+
+if __name__ == "__main__":
+    test_pack_respects_length_and_cq_codes()
+    test_messages_within_window_are_merged_per_group()
+    print("message coalescer tests passed")
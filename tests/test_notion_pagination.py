@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# test_notion_pagination.py - 测试 Notion 查询的分页迭代（使用本地模拟的 Notion）
+
+import asyncio
+import os
+import sys
+from unittest import mock
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import config
+from services.async_notion_service import AsyncNotionService
+from services.notion_service import NotionService
+from utils.notion_utils import process_notion_blocks
+from fake_notion import paragraph, start_fake_notion
+
+LONG_PAGE = {'page-long': [paragraph(f"line {i}") for i in range(250)]}
+
+
+def _service(server, service_class=NotionService):
+    service = service_class()
+    service.base_url = server.base_url
+    return service
+
+
+def test_page_children_follow_next_cursor():
+    """子块超过一页时按 next_cursor 取完，且只在消费到页末时才请求下一页"""
+    server = start_fake_notion(blocks=LONG_PAGE)
+    try:
+        service = _service(server)
+        blocks = service.iter_page_children('page-long', page_size=100)
+        assert next(blocks)['id'] == 'block-line 0'
+        assert server.requests == 1
+
+        rest = list(blocks)
+        assert [b['id'] for b in rest] == [f"block-line {i}" for i in range(1, 250)]
+        assert server.requests == 3
+
+        # 单页接口保持原样，只返回第一页
+        first = service.get_page_children('page-long')
+        assert len(first['results']) == config.NOTION_PAGE_SIZE and first['has_more']
+    finally:
+        server.stop()
+
+
+def test_database_query_is_paginated():
+    pages = [{"object": "page", "id": f"page-{i}"} for i in range(7)]
+    server = start_fake_notion(pages=pages)
+    try:
+        service = _service(server)
+        result = list(service.iter_database("Daily Dairy 2.0", {"property": "Date"}, page_size=3))
+        assert [p['id'] for p in result] == [p['id'] for p in pages]
+        assert server.requests == 3
+    finally:
+        server.stop()
+
+
+def test_process_notion_blocks_consumes_iterator():
+    server = start_fake_notion(blocks=LONG_PAGE)
+    try:
+        text = process_notion_blocks(_service(server).iter_page_children('page-long', page_size=64))
+        assert text.split("\n\n") == [f"line {i}" for i in range(250)]
+    finally:
+        server.stop()
+
+
+def test_async_page_children_follow_next_cursor():
+    server = start_fake_notion(blocks=LONG_PAGE)
+    service = _service(server, AsyncNotionService)
+
+    async def scenario():
+        try:
+            return [block['id'] async for block in service.iter_page_children('page-long', page_size=100)]
+        finally:
+            await service.aclose()
+
+    try:
+        assert asyncio.run(scenario()) == [f"block-line {i}" for i in range(250)]
+        assert server.requests == 3
+    finally:
+        server.stop()
+
+
+def test_daily_command_is_not_truncated():
+    """#daily 发送页面的全部内容，而不只是第一页"""
+    from handlers import notion_handler
+    from utils import reply_builder
+
+    server = start_fake_notion(blocks=LONG_PAGE)
+    sent = []
+    try:
+        with mock.patch.object(notion_handler.notion_service, 'base_url', server.base_url), \
+                mock.patch.object(notion_handler.daily_manager, 'get_today_page', lambda: {'id': 'page-long'}), \
+                mock.patch.object(reply_builder, 'send_group_message', lambda group_id, text: sent.append(text)), \
+                mock.patch.object(notion_handler, 'send_group_message', lambda group_id, text: sent.append(text)):
+            notion_handler.handle_daily_command({'group_id': 1, 'message': '#daily'})
+        lines = "\n\n".join(sent).split("\n\n")
+        assert lines[0] == "📅 今日日记内容:"
+        assert lines[1:] == [f"line {i}" for i in range(250)]
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    test_page_children_follow_next_cursor()
+    test_database_query_is_paginated()
+    test_process_notion_blocks_consumes_iterator()
+    test_async_page_children_follow_next_cursor()
+    test_daily_command_is_not_truncated()
+    print("notion pagination tests passed")
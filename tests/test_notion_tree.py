@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# test_notion_tree.py - 测试嵌套块的并发加载与渲染（使用本地模拟的 Notion）
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from unittest import mock
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import config
+from services import notion_service as notion_service_module
+from services.async_notion_service import AsyncNotionService
+from services.notion_service import NotionService
+from utils.notion_utils import iter_notion_block_texts, process_notion_blocks
+from utils.rate_limiter import TokenBucketLimiter
+from fake_notion import nested_blocks, paragraph, start_fake_notion
+
+TREE_CONFIG = {'enabled': True, 'concurrency': 3, 'max_depth': 5}
+NO_RATE_LIMIT = {'enabled': False, 'rate': 3.0, 'burst': 10}
+
+
+def _service(server, service_class=NotionService):
+    service = service_class()
+    service.base_url = server.base_url
+    return service
+
+
+def _outline(blocks, level=0):
+    """块树按页面顺序展开成 (层级, 文字) 列表"""
+    result = []
+    for block in blocks:
+        result.append((level, block["paragraph"]["rich_text"][0]["plain_text"]))
+        result.extend(_outline(block.get("children", []), level + 1))
+    return result
+
+
+def test_block_tree_is_complete_and_ordered():
+    """子块并发加载，但组装后的顺序与页面一致，并发数不超过配置"""
+    blocks, outline = nested_blocks(top=4, fanout=3, depth=3)
+    server = start_fake_notion(delay=0.01, blocks=blocks)
+    try:
+        with mock.patch.dict(config.NOTION_BLOCK_TREE, TREE_CONFIG), \
+                mock.patch.dict(config.NOTION_RATE_LIMIT, NO_RATE_LIMIT):
+            tree = _service(server).load_block_tree('page-0')
+        assert _outline(tree) == outline
+        assert server.requests == len(blocks)
+        assert 1 < server.max_active <= TREE_CONFIG['concurrency']
+    finally:
+        server.stop()
+
+
+def test_block_tree_respects_max_depth():
+    blocks, outline = nested_blocks(top=2, fanout=2, depth=4)
+    server = start_fake_notion(blocks=blocks)
+    try:
+        with mock.patch.dict(config.NOTION_BLOCK_TREE, TREE_CONFIG), \
+                mock.patch.dict(config.NOTION_RATE_LIMIT, NO_RATE_LIMIT):
+            tree = _service(server).load_block_tree('page-0', max_depth=1)
+        assert _outline(tree) == [item for item in outline if item[0] <= 1]
+        assert server.requests == 1 + 2
+    finally:
+        server.stop()
+
+
+def test_async_block_tree_matches_sync():
+    blocks, outline = nested_blocks(top=4, fanout=3, depth=3)
+    server = start_fake_notion(delay=0.01, blocks=blocks)
+    service = _service(server, AsyncNotionService)
+
+    async def scenario():
+        try:
+            return await service.load_block_tree('page-0')
+        finally:
+            await service.aclose()
+
+    try:
+        with mock.patch.dict(config.NOTION_BLOCK_TREE, TREE_CONFIG), \
+                mock.patch.dict(config.NOTION_RATE_LIMIT, NO_RATE_LIMIT):
+            tree = asyncio.run(scenario())
+        assert _outline(tree) == outline
+        assert 1 < server.max_active <= TREE_CONFIG['concurrency']
+    finally:
+        server.stop()
+
+
+def test_top_level_blocks_stream_in_order():
+    """顶层块在自己的子树加载完后立即产出，不等后面的块；顺序仍与页面一致"""
+    page = [paragraph("快", block_id='fast', has_children=True), paragraph("慢", block_id='slow', has_children=True),
+            paragraph("结尾")]
+    blocks = {'page-0': page, 'fast': [paragraph("快的子块")], 'slow': [paragraph("慢的子块")]}
+    server = start_fake_notion(blocks=blocks)
+    async_service = _service(server, AsyncNotionService)
+
+    async def stream_async(hold):
+        try:
+            start = time.monotonic()
+            tree = async_service.iter_block_tree('page-0')
+            first = await tree.__anext__()
+            # 慢块的请求最多挂起 5 秒，第一个块不应等它
+            assert time.monotonic() - start < 2
+            hold.set()
+            return [first] + [block async for block in tree]
+        finally:
+            await async_service.aclose()
+
+    try:
+        with mock.patch.dict(config.NOTION_BLOCK_TREE, TREE_CONFIG), \
+                mock.patch.dict(config.NOTION_RATE_LIMIT, NO_RATE_LIMIT):
+            hold = server.holds['slow'] = threading.Event()
+            start = time.monotonic()
+            tree = _service(server).iter_block_tree('page-0')
+            first = next(tree)
+            assert time.monotonic() - start < 2
+            hold.set()
+            sync_tree = [first] + list(tree)
+
+            hold = server.holds['slow'] = threading.Event()
+            async_tree = asyncio.run(stream_async(hold))
+    finally:
+        server.stop()
+
+    assert _outline(sync_tree[:1]) == [(0, "快"), (1, "快的子块")]
+    assert _outline(sync_tree) == [(0, "快"), (1, "快的子块"), (0, "慢"), (1, "慢的子块"), (0, "结尾")]
+    assert async_tree == sync_tree
+
+
+def test_requests_are_rate_limited():
+    """所有请求经过令牌桶排队，并发加载也不超过 Notion 的速率限制"""
+    blocks, _ = nested_blocks(top=6, fanout=1, depth=2)
+    server = start_fake_notion(blocks=blocks)
+    try:
+        with mock.patch.dict(config.NOTION_BLOCK_TREE, TREE_CONFIG), \
+                mock.patch.dict(config.NOTION_RATE_LIMIT, {'enabled': True}), \
+                mock.patch.object(notion_service_module, 'request_limiter', TokenBucketLimiter(rate=20, burst=1)):
+            start = time.monotonic()
+            _service(server).load_block_tree('page-0')
+            elapsed = time.monotonic() - start
+        # 7 个请求，突发 1 个，其余每个间隔 1/20 秒
+        assert server.requests == 7
+        assert elapsed >= 6 / 20 * 0.9
+    finally:
+        server.stop()
+
+
+def test_nested_blocks_render_with_indent():
+    """子块缩进后接在父块之后；分栏等容器块不增加缩进"""
+    toggle = {"type": "toggle", "toggle": {"rich_text": [{"plain_text": "详情"}]}, "children": [
+        paragraph("第一行"),
+        {"type": "bulleted_list_item", "bulleted_list_item": {"rich_text": [{"plain_text": "要点"}]},
+         "children": [paragraph("补充")]},
+    ]}
+    columns = {"type": "column_list", "column_list": {}, "children": [
+        {"type": "column", "column": {}, "children": [paragraph("左")]},
+        {"type": "column", "column": {}, "children": [paragraph("右")]},
+    ]}
+    blocks = [paragraph("开头"), toggle, columns]
+    assert list(iter_notion_block_texts(blocks)) == ["开头", "▸ 详情\n  第一行\n  • 要点\n    补充", "左\n右"]
+    assert process_notion_blocks([paragraph("a"), paragraph("b")]) == "a\n\nb"
+
+
+def test_daily_splits_large_toggle_on_lines():
+    """子块很多的折叠块超过单条消息上限时在行边界切分，标题不单独成条"""
+    from handlers import notion_handler
+    from utils import reply_builder
+
+    toggle = {"object": "block", "id": "toggle-1", "type": "toggle", "has_children": True,
+              "toggle": {"rich_text": [{"plain_text": "展开"}]}}
+    children = [paragraph(f"第 {i:03d} 条记录，内容稍微长一点") for i in range(200)]
+    server = start_fake_notion(blocks={'page-0': [toggle], 'toggle-1': children})
+    sent = []
+    try:
+        with mock.patch.dict(config.NOTION_BLOCK_TREE, TREE_CONFIG), \
+                mock.patch.dict(config.NOTION_RATE_LIMIT, NO_RATE_LIMIT), \
+                mock.patch.object(config, 'MESSAGE_MAX_LENGTH', 1000), \
+                mock.patch.object(notion_handler.notion_service, 'base_url', server.base_url), \
+                mock.patch.object(notion_handler.daily_manager, 'get_today_page', lambda: {'id': 'page-0'}), \
+                mock.patch.object(reply_builder, 'send_group_message', lambda group_id, text: sent.append(text)), \
+                mock.patch.object(notion_handler, 'send_group_message', lambda group_id, text: sent.append(text)):
+            notion_handler.handle_daily_command({'group_id': 1, 'message': '#daily'})
+    finally:
+        server.stop()
+
+    assert len(sent) > 1
+    assert all(len(text) <= 1000 for text in sent)
+    assert sent[0].startswith("📅 今日日记内容:\n\n▸ 展开\n  第 000 条")
+    lines = [line for text in sent for line in text.split("\n") if line]
+    assert lines[2:] == [f"  第 {i:03d} 条记录，内容稍微长一点" for i in range(200)]
+
+
+def test_subpages_are_not_expanded():
+    """子页面和子数据库只显示标题，不请求它们的内容"""
+    page = [
+        paragraph("开头"),
+        {"object": "block", "id": "sub-page", "type": "child_page", "has_children": True,
+         "child_page": {"title": "会议记录"}},
+        {"object": "block", "id": "sub-db", "type": "child_database", "has_children": True,
+         "child_database": {"title": "读书清单"}},
+        paragraph("折叠", block_id="toggle", has_children=True),
+    ]
+    blocks = {
+        'page-0': page,
+        'toggle': [paragraph("子内容")],
+        'sub-page': [paragraph(f"子页面第 {i} 段") for i in range(50)],
+        'sub-db': [paragraph("不应出现")],
+    }
+    server = start_fake_notion(blocks=blocks)
+    async_service = _service(server, AsyncNotionService)
+
+    async def load_async():
+        try:
+            return await async_service.load_block_tree('page-0')
+        finally:
+            await async_service.aclose()
+
+    try:
+        with mock.patch.dict(config.NOTION_BLOCK_TREE, TREE_CONFIG), \
+                mock.patch.dict(config.NOTION_RATE_LIMIT, NO_RATE_LIMIT):
+            tree = _service(server).load_block_tree('page-0')
+            assert server.requests == 2
+            assert asyncio.run(load_async()) == tree
+            assert server.requests == 4
+    finally:
+        server.stop()
+
+    assert list(iter_notion_block_texts(tree)) == ["开头", "📄 会议记录", "🗂️ 读书清单", "折叠\n  子内容"]
+
+
+if __name__ == "__main__":
+    test_block_tree_is_complete_and_ordered()
+    test_block_tree_respects_max_depth()
+    test_async_block_tree_matches_sync()
+    test_top_level_blocks_stream_in_order()
+    test_requests_are_rate_limited()
+    test_nested_blocks_render_with_indent()
+    test_daily_splits_large_toggle_on_lines()
+    test_subpages_are_not_expanded()
+    print("notion tree tests passed")
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# test_onebot_ws.py - 测试 OneBot WebSocket 客户端
+
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.onebot_ws import OneBotWebSocketClient
+from fake_onebot_ws import start_fake_onebot_ws
+
+
+def _make_client(server, **kwargs):
+    client = OneBotWebSocketClient(url=server.url, access_token='', timeout=5, **kwargs)
+    client.reconnect_delay = 0.05
+    client.start()
+    assert client.wait_connected(5)
+    return client
+
+
+def test_pipelined_actions_are_matched_by_echo():
+    """并发调用在同一连接上流水线发送，响应按 echo 对应"""
+    server = start_fake_onebot_ws(delay=0.1)
+    client = _make_client(server)
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(20) as pool:
+            results = list(pool.map(lambda i: client.call_action('send_group_msg', group_id=i, message=f"m{i}"),
+                                    range(20)))
+        elapsed = time.perf_counter() - start
+
+        assert all(result['status'] == 'ok' for result in results)
+        assert len({result['data']['message_id'] for result in results}) == 20
+        assert server.connections == 1
+        # 20 个请求各需 0.1 秒，流水线发送时总耗时接近单个请求
+        assert elapsed < 1.0
+    finally:
+        client.stop()
+        server.stop()
+
+
+def test_events_are_delivered_in_order():
+    """上报事件按到达顺序交给回调"""
+    server = start_fake_onebot_ws()
+    received = []
+    done = threading.Event()
+
+    def on_event(event):
+        received.append(event['seq'])
+        if len(received) == 10:
+            done.set()
+
+    client = _make_client(server, on_event=on_event)
+    try:
+        for i in range(10):
+            server.push_event({'post_type': 'message', 'seq': i})
+        assert done.wait(5)
+        assert received == list(range(10))
+    finally:
+        client.stop()
+        server.stop()
+
+
+def test_reconnects_after_disconnect():
+    """连接断开后自动重连并继续发送"""
+    server = start_fake_onebot_ws()
+    client = _make_client(server)
+    try:
+        assert client.send_group_msg(1, "before")
+        server.drop_connections()
+        deadline = time.time() + 5
+        while client.stats()['connects'] < 2 and time.time() < deadline:
+            time.sleep(0.02)
+        assert client.send_group_msg(1, "after")
+        assert server.connections == 2
+        assert [params['message'] for _, params in server.messages] == ["before", "after"]
+    finally:
+        client.stop()
+        server.stop()
+
+
+if __name__ == "__main__":
+    test_pipelined_actions_are_matched_by_echo()
+    test_events_are_delivered_in_order()
+    test_reconnects_after_disconnect()
+    print("onebot websocket tests passed")
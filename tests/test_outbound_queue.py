@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# test_outbound_queue.py - 测试出站消息队列的发送结果统计
+
+import os
+import sys
+import threading
+from unittest import mock
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from utils import api_utils
+from utils.worker_pool import PartitionedWorkerPool
+
+
+class _FakeClient:
+    def __init__(self, results):
+        self.results = list(results)
+
+    def send_group_msg(self, group_id, message):
+        return self.results.pop(0)
+
+
+class _RecordingClient:
+    """记录发送顺序；gate 未放行前发送会阻塞，用来占住工作线程"""
+
+    def __init__(self, gate=None):
+        self.gate = gate
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def send_group_msg(self, group_id, message):
+        if self.gate is not None:
+            self.gate.wait(5)
+        with self._lock:
+            self.sent.append((group_id, message))
+        return True
+
+
+def test_messages_keep_order_per_group():
+    """同一个群的消息按提交顺序发送，不同群并发发送"""
+    pool = PartitionedWorkerPool('test-outbound', workers=4)
+    client = _RecordingClient()
+    with mock.patch.object(api_utils, 'outbound_pool', pool), \
+            mock.patch.object(api_utils, 'get_napcat_client', lambda: client), \
+            mock.patch.dict(config.OUTBOUND_COALESCE, {'enabled': False}):
+        for i in range(50):
+            for group_id in (1, 2, 3):
+                assert api_utils.send_group_message(group_id, f"{group_id}-{i}")
+        pool.join()
+    for group_id in (1, 2, 3):
+        assert [m for g, m in client.sent if g == group_id] == [f"{group_id}-{i}" for i in range(50)]
+    assert pool.stats()['completed'] == 150
+
+
+def test_full_queue_rejects_messages():
+    """队列已满时等待 put_timeout 后丢弃消息，并计入 rejected"""
+    gate = threading.Event()
+    pool = PartitionedWorkerPool('test-outbound', workers=1, max_pending=1, put_timeout=0.05)
+    client = _RecordingClient(gate)
+    with mock.patch.object(api_utils, 'outbound_pool', pool), \
+            mock.patch.object(api_utils, 'get_napcat_client', lambda: client), \
+            mock.patch.dict(config.OUTBOUND_COALESCE, {'enabled': False}):
+        results = [api_utils.send_group_message(1, f"m{i}") for i in range(4)]
+        gate.set()
+        pool.join()
+    assert results[0] and not results[-1]
+    stats = pool.stats()
+    assert stats['rejected'] == results.count(False) >= 1
+    assert stats['blocked'] >= stats['rejected']
+    assert [m for _, m in client.sent] == [f"m{i}" for i, ok in enumerate(results) if ok]
+
+
+def test_failed_sends_are_counted():
+    """NapCat 发送失败时计入出站队列的 failed，而不是 completed"""
+    pool = PartitionedWorkerPool('test-outbound', workers=1)
+    client = _FakeClient([True, False, True])
+    with mock.patch.object(api_utils, 'outbound_pool', pool), \
+            mock.patch.object(api_utils, 'get_napcat_client', lambda: client), \
+            mock.patch.dict(config.OUTBOUND_COALESCE, {'enabled': False}):
+        for text in ("a", "b", "c"):
+            assert api_utils.send_group_message(1, text)
+        pool.join()
+    stats = pool.stats()
+    assert stats['completed'] == 2
+    assert stats['failed'] == 1
+
+
+def test_direct_send_reports_failure():
+    """关闭出站队列时直接发送，失败返回 False"""
+    client = _FakeClient([False, True])
+    with mock.patch.object(api_utils, 'get_napcat_client', lambda: client), \
+            mock.patch.dict(config.OUTBOUND_QUEUE, {'enabled': False}):
+        assert api_utils.send_group_message(1, "a") is False
+        assert api_utils.send_group_message(1, "b") is True
+
+
+if __name__ == "__main__":
+    test_messages_keep_order_per_group()
+    test_full_queue_rejects_messages()
+    test_failed_sends_are_counted()
+    test_direct_send_reports_failure()
+    print("outbound queue tests passed")
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# test_rate_limiter.py - 测试令牌桶限流器
+
+import os
+import sys
+from unittest import mock
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from utils import rate_limiter
+from utils.rate_limiter import TokenBucketLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+def test_burst_then_refill():
+    """桶满时允许 burst 次，之后按 rate 补充"""
+    clock = FakeClock()
+    with mock.patch.object(rate_limiter.time, 'monotonic', clock.monotonic):
+        limiter = TokenBucketLimiter(rate=0.5, burst=3)
+        assert [limiter.allow('a') for _ in range(4)] == [True, True, True, False]
+        assert limiter.allow('b')  # 不同键互不影响
+
+        clock.now += 1.0   # 补充 0.5 个，仍不足一个
+        assert not limiter.allow('a')
+        clock.now += 1.0
+        assert limiter.allow('a')
+        assert not limiter.allow('a')
+
+        stats = limiter.stats()
+        assert stats['allowed'] == 5
+        assert stats['rejected'] == 3
+
+
+def test_idle_buckets_are_evicted():
+    """空闲的桶被淘汰，内存只与活跃键数量相关"""
+    clock = FakeClock()
+    with mock.patch.object(rate_limiter.time, 'monotonic', clock.monotonic):
+        limiter = TokenBucketLimiter(rate=1, burst=2, idle_seconds=60)
+        for user in range(1000):
+            limiter.allow(user)
+        assert len(limiter) == 1000
+
+        clock.now += 61
+        limiter.allow('active')
+        assert len(limiter) == 1
+        assert limiter.stats()['evicted'] == 1000
+
+
+def test_reserve_queues_instead_of_rejecting():
+    """reserve 在令牌不足时返回需要等待的时间，连续调用依次排队"""
+    clock = FakeClock()
+    with mock.patch.object(rate_limiter.time, 'monotonic', clock.monotonic):
+        limiter = TokenBucketLimiter(rate=2, burst=2)
+        assert [limiter.reserve('notion') for _ in range(5)] == [0.0, 0.0, 0.5, 1.0, 1.5]
+
+        clock.now += 1.5   # 已预约的请求还在排队，新的请求排在最后
+        assert limiter.reserve('notion') == 0.5
+        clock.now += 10
+        assert limiter.reserve('notion') == 0.0
+
+
+def test_prepare_event_drops_spam():
+    """同一用户连续刷同一命令时超出的事件被丢弃"""
+    import app as bot_app
+
+    group_id = next(iter(config.MONITORED_GROUPS))
+    event = lambda: {
+        'post_type': 'message', 'message_type': 'group', 'group_id': group_id, 'user_id': 424242,
+        'message': [{'type': 'text', 'data': {'text': '#玩什么'}}],
+    }
+    burst = config.RATE_LIMIT['user']['burst']
+    results = [bot_app.prepare_event(event())[1] for _ in range(burst + 2)]
+    assert results[:burst] == [None] * burst
+    assert results[burst:] == ["Rate limited"] * 2
+
+
+def test_group_limit_does_not_charge_user():
+    """群限流拒绝的命令不执行，也不消耗该用户的令牌"""
+    import app as bot_app
+
+    group_id = next(iter(config.MONITORED_GROUPS))
+    event = lambda: {
+        'post_type': 'message', 'message_type': 'group', 'group_id': group_id, 'user_id': 434343,
+        'message': [{'type': 'text', 'data': {'text': '#玩什么'}}],
+    }
+    user_limiter = TokenBucketLimiter(rate=0.001, burst=3)
+    with mock.patch.object(bot_app, 'user_limiter', user_limiter), \
+            mock.patch.object(bot_app, 'group_limiter', TokenBucketLimiter(rate=0.001, burst=1)):
+        results = [bot_app.prepare_event(event())[1] for _ in range(4)]
+        assert results == [None] + ["Rate limited"] * 3
+        assert user_limiter.stats()['allowed'] == 1
+
+    # 群的令牌恢复后，该用户仍有 burst - 1 次可用
+    with mock.patch.object(bot_app, 'user_limiter', user_limiter), \
+            mock.patch.object(bot_app, 'group_limiter', TokenBucketLimiter(rate=0.001, burst=10)):
+        results = [bot_app.prepare_event(event())[1] for _ in range(3)]
+        assert results == [None, None, "Rate limited"]
+
+
+if __name__ == "__main__":
+    test_burst_then_refill()
+    test_idle_buckets_are_evicted()
+    test_reserve_queues_instead_of_rejecting()
+    test_prepare_event_drops_spam()
+    test_group_limit_does_not_charge_user()
+    print("rate limiter tests passed")
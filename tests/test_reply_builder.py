@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# test_reply_builder.py - 测试长回复分段和列表分页
+
+import os
+import sys
+from unittest import mock
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import reply_builder
+from utils.reply_builder import ReplyBuilder, iter_chunks, paginate, parse_page
+
+
+def test_chunks_split_on_line_boundaries():
+    """每段不超过上限，只在行边界切分，超长单行硬切"""
+    lines = [f"line {i:03d}" for i in range(100)]   # 每行8个字符
+    chunks = list(iter_chunks(iter(lines), max_length=50))
+    assert all(len(chunk) <= 50 for chunk in chunks)
+    assert '\n'.join(chunks).split('\n') == lines
+    assert chunks[0] == '\n'.join(lines[:5])
+
+    assert list(iter_chunks(["ab", "x" * 12, "cd"], max_length=5)) == ["ab", "xxxxx", "xxxxx", "xx\ncd"]
+
+
+def test_reply_builder_sends_chunks_in_order():
+    """累积到上限时立即发出一段，send() 发出剩余部分"""
+    sent = []
+    with mock.patch.object(reply_builder, 'send_group_message', lambda group_id, text: sent.append((group_id, text))):
+        reply = ReplyBuilder(1, header="标题", max_length=20)
+        reply.extend(f"item {i}" for i in range(6))
+        assert len(sent) == 2   # 标题和前几行已经发出
+        assert reply.send() == 3
+
+    texts = [text for _, text in sent]
+    assert all(len(text) <= 20 for text in texts)
+    assert '\n'.join(texts).split('\n') == ["标题"] + [f"item {i}" for i in range(6)]
+
+
+def test_oversized_entry_splits_on_newlines():
+    """超长的多行条目在换行处切分，标题与第一部分在同一段"""
+    entry = '\n'.join(f"  child {i:02d}" for i in range(20))   # 每行10个字符
+    chunks = list(iter_chunks(["标题", entry], max_length=45))
+    assert all(len(chunk) <= 45 for chunk in chunks)
+    assert chunks[0].startswith("标题\n  child 00")
+    assert '\n'.join(chunks).split('\n') == ["标题"] + entry.split('\n')
+
+    sent = []
+    with mock.patch.object(reply_builder, 'send_group_message', lambda group_id, text: sent.append(text)):
+        reply = ReplyBuilder(1, header="标题", max_length=45, separator="\n\n")
+        reply.add(entry)
+        reply.send()
+    assert sent[0].startswith("标题\n\n  child 00")
+    assert all(len(text) <= 45 for text in sent)
+    assert '\n'.join(sent).replace('\n\n', '\n').split('\n') == ["标题"] + entry.split('\n')
+
+
+def test_paginate():
+    """页码解析与分页"""
+    assert parse_page("") == 1
+    assert parse_page(" 3") == 3
+    assert parse_page("abc") == 1
+    assert parse_page("0") == 1
+
+    items = list(range(45))
+    assert paginate(items, 2, 20) == (list(range(20, 40)), 2, 3)
+    assert paginate(items, 9, 20) == (list(range(40, 45)), 3, 3)
+    assert paginate([], 1, 20) == ([], 1, 1)
+
+
+if __name__ == "__main__":
+    test_chunks_split_on_line_boundaries()
+    test_reply_builder_sends_chunks_in_order()
+    test_oversized_entry_splits_on_newlines()
+    test_paginate()
+    print("reply builder tests passed")
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# test_tracing.py - 测试事件追踪与延迟直方图
+
+import os
+import sys
+import time
+from unittest import mock
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import config
+from utils.command_router import CommandRouter
+from utils.tracing import LatencyHistogram, Trace, activate, metrics, span
+from onebot_events import group_event
+
+
+def test_histogram_percentiles():
+    """分位数误差不超过一个桶宽（10%）"""
+    histogram = LatencyHistogram()
+    for ms in range(1, 1001):
+        histogram.observe(float(ms))
+
+    summary = histogram.summary()
+    assert summary['count'] == 1000
+    assert summary['max'] == 1000
+    assert 500 <= summary['p50'] <= 550
+    assert 990 <= summary['p99'] <= 1000
+    assert LatencyHistogram().percentile(0.5) == 0.0
+
+
+def test_nested_spans_accumulate_into_active_trace():
+    """处理器内部的 span 记入当前追踪，多次进入同一阶段时累加；没有追踪时不记录"""
+    trace = Trace()
+    with activate(trace):
+        for _ in range(3):
+            with span('storage'):
+                time.sleep(0.002)
+    with span('storage'):
+        time.sleep(0.01)
+
+    assert 0.006 <= trace.spans['storage'] < 0.01
+
+
+def test_budget_exceeded_is_counted():
+    """处理器超出预算时计数并写入各阶段直方图"""
+    metrics.reset()
+    original = config.TRACING['budgets']
+    config.TRACING['budgets'] = {'#slowtest': 1}
+    try:
+        trace = Trace()
+        trace.command = '#slowtest'
+        with trace.span('handler'):
+            time.sleep(0.005)
+        trace.finish()
+    finally:
+        config.TRACING['budgets'] = original
+
+    snapshot = metrics.snapshot()
+    assert snapshot['budget_exceeded'] == {'#slowtest': 1}
+    assert set(snapshot['commands']['#slowtest']) == {'handler', 'total'}
+
+
+def test_metrics_endpoint_reports_pipeline_stages():
+    """webhook 事件经过 parse/route/queue/handler 各阶段，/metrics 按命令返回分位数"""
+    import app as bot_app
+
+    metrics.reset()
+    group_id = next(iter(config.MONITORED_GROUPS))
+    router = CommandRouter({'#tracetest': lambda event_data: None})
+    queue_enabled = config.EVENT_QUEUE['enabled']
+    rate_limit_enabled = config.RATE_LIMIT['enabled']
+    config.EVENT_QUEUE['enabled'] = False
+    config.RATE_LIMIT['enabled'] = False
+    client = bot_app.app.test_client()
+    try:
+        with mock.patch.object(bot_app, 'command_router', router):
+            response = client.post('/', json=group_event(group_id, '#tracetest'))
+        assert response.status_code == 200
+        stages = client.get('/metrics').get_json()['commands']['#tracetest']
+    finally:
+        config.EVENT_QUEUE['enabled'] = queue_enabled
+        config.RATE_LIMIT['enabled'] = rate_limit_enabled
+
+    assert {'parse', 'route', 'handler', 'total'} <= set(stages)
+    assert stages['total']['count'] == 1
+
+
+if __name__ == "__main__":
+    test_histogram_percentiles()
+    test_nested_spans_accumulate_into_active_trace()
+    test_budget_exceeded_is_counted()
+    test_metrics_endpoint_reports_pipeline_stages()
+    print("tracing tests passed")
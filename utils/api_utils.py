@@ -1,38 +1,93 @@
 import requests
+import time
+
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
 try:
     from bs4 import BeautifulSoup
     HAS_BS4 = True
 except ImportError:
     HAS_BS4 = False
-    print("Warning: BeautifulSoup (bs4) not available. Some features may not work properly.")
+    logger.warning("BeautifulSoup (bs4) not available. Some features may not work properly.")
 
 try:
     from openai import OpenAI
     HAS_OPENAI = True
 except ImportError:
     HAS_OPENAI = False
-    print("Warning: OpenAI package not available. AI features may not work properly.")
+    logger.warning("OpenAI package not available. AI features may not work properly.")
     # Create a dummy OpenAI class to prevent import errors
     class OpenAI:
         def __init__(self, api_key=None, base_url=None):
             pass
 import config # 导入配置
+from utils.napcat_client import napcat_client
+from utils.message_coalescer import MessageCoalescer
+from utils.onebot_ws import onebot_ws_client
+from utils.worker_pool import PartitionedWorkerPool
+from utils.tracing import metrics, span
+
+class SendFailedError(Exception):
+    """NapCat 未能发送消息（连接失败或返回 failed）"""
+
+
+# 出站消息队列：处理器只负责入队，由后台线程按群顺序发送到 NapCat
+outbound_pool = PartitionedWorkerPool(
+    'outbound',
+    workers=config.OUTBOUND_QUEUE['workers'],
+    max_pending=config.OUTBOUND_QUEUE['max_pending'],
+    put_timeout=config.OUTBOUND_QUEUE['put_timeout']
+)
+
+def _enqueue_group_message(group_id, message):
+    return outbound_pool.submit(group_id, _send_group_message_now, group_id, message)
+
+# 出站消息合并：同一个群短时间内的多条文本回复合并后再入队
+outbound_coalescer = MessageCoalescer(
+    _enqueue_group_message,
+    window=config.OUTBOUND_COALESCE['window'],
+    max_length=config.MESSAGE_MAX_LENGTH
+)
 
 def send_group_message(group_id, message):
-    """发送群聊消息"""
-    url = f"{config.NAPCAT_BASE_URL}/send_group_msg"
-    params = {
-        "group_id": group_id,
-        "message": message,
-    }
-    try:
-        response = requests.get(url, params=params, verify=False, timeout=10)
-        if response.status_code == 200:
-            print(f"向群 {group_id} 发送消息成功")
-        else:
-            print(f"向群 {group_id} 发送消息失败: {response.status_code}, {response.text}")
-    except requests.RequestException as e:
-        print(f"发送消息时发生网络异常: {e}")
+    """发送群聊消息（入队后立即返回，由后台线程实际发送）"""
+    with span('send'):
+        if not config.OUTBOUND_QUEUE['enabled']:
+            try:
+                _send_group_message_now(group_id, message)
+            except SendFailedError:
+                return False
+            return True
+        if config.OUTBOUND_COALESCE['enabled'] and isinstance(message, str):
+            outbound_coalescer.add(group_id, message)
+            return True
+        return _enqueue_group_message(group_id, message)
+
+def get_outbound_stats():
+    """获取出站队列的统计信息"""
+    snapshot = outbound_pool.stats()
+    snapshot['coalesce'] = outbound_coalescer.stats()
+    return snapshot
+
+def get_napcat_client():
+    """根据 NAPCAT_TRANSPORT 选择 HTTP 或 WebSocket 客户端"""
+    if config.NAPCAT_TRANSPORT == 'ws':
+        return onebot_ws_client
+    return napcat_client
+
+def _send_group_message_now(group_id, message):
+    """同步发送群聊消息，失败时抛出 SendFailedError（出站队列据此计入 failed）"""
+    start = time.perf_counter()
+    sent = get_napcat_client().send_group_msg(group_id, message)
+    if config.TRACING['enabled']:
+        # 实际发送发生在出站线程，不属于任何事件的追踪，单独统计
+        metrics.observe('outbound', 'napcat', (time.perf_counter() - start) * 1000)
+    if not sent:
+        logger.warning("向群 %s 发送消息失败", group_id)
+        raise SendFailedError(f"send_group_msg to {group_id} failed")
+    logger.debug("向群 %s 发送消息成功", group_id)
 
 def get_verification_code(token):
     """从云码平台获取验证码 (原方法1)"""
@@ -43,10 +98,10 @@ def get_verification_code(token):
         if result.get('code') == 0:
             return result.get('data', '')
         else:
-            print(f"请求验证码失败: {result.get('msg', '未知错误')}")
+            logger.warning("请求验证码失败: %s", result.get('msg', '未知错误'))
             return None
     except Exception as e:
-        print(f"请求验证码时发生异常: {e}")
+        logger.error("请求验证码时发生异常: %s", e)
         return None
 
 def get_dynamic_code_2(api_key):
@@ -56,11 +111,11 @@ def get_dynamic_code_2(api_key):
         with requests.Session() as s:
             response = s.post(config.DYNAMIC_CODE_URL, data=payload)
             if response.status_code != 200:
-                print(f"请求动态码失败，状态码：{response.status_code}")
+                logger.warning("请求动态码失败，状态码：%s", response.status_code)
                 return None
 
             if not HAS_BS4:
-                print("BeautifulSoup not available, cannot parse HTML response")
+                logger.error("BeautifulSoup not available, cannot parse HTML response")
                 return None
 
             soup = BeautifulSoup(response.text, 'html.parser')
@@ -70,10 +125,10 @@ def get_dynamic_code_2(api_key):
                 dynamic_code = code_div.get_text(strip=True)
                 if dynamic_code and dynamic_code != "等待提交...":
                     return dynamic_code
-            print("未找到有效的动态码")
+            logger.warning("未找到有效的动态码")
             return None
     except Exception as e:
-        print(f"请求动态码时发生异常: {e}")
+        logger.error("请求动态码时发生异常: %s", e)
         return None
 
 def get_ai_response_stream(model, messages):
@@ -0,0 +1,73 @@
+# utils/command_router.py
+from typing import Callable, Dict, NamedTuple, Optional
+
+
+class RouteMatch(NamedTuple):
+    """一次命令匹配的结果"""
+    command: str      # 命中的命令前缀
+    handler: Callable  # 对应的处理函数
+    args: str         # 命令前缀之后的参数部分（已去除首尾空白）
+
+
+class _TrieNode:
+    """前缀树节点"""
+    __slots__ = ('children', 'command', 'handler')
+
+    def __init__(self):
+        self.children: Dict[str, '_TrieNode'] = {}
+        self.command: Optional[str] = None
+        self.handler: Optional[Callable] = None
+
+
+class CommandRouter:
+    """
+    基于前缀树的命令路由器
+
+    在构建时将命令前缀编译成前缀树，匹配时只需沿消息文本逐字符向下走一遍，
+    返回最长匹配的命令前缀，因此 '#atadd' 不会再被 '#at' 抢先匹配，
+    且匹配耗时只与命令长度相关，与命令表大小无关。
+    """
+
+    def __init__(self, routes: Optional[Dict[str, Callable]] = None):
+        self._root = _TrieNode()
+        self._size = 0
+        for command, handler in (routes or {}).items():
+            self.add(command, handler)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, command: str, handler: Callable):
+        """注册一个命令前缀，重复注册时覆盖原处理函数"""
+        if not command:
+            raise ValueError("命令前缀不能为空")
+
+        node = self._root
+        for ch in command:
+            child = node.children.get(ch)
+            if child is None:
+                child = node.children[ch] = _TrieNode()
+            node = child
+
+        if node.command is None:
+            self._size += 1
+        node.command = command
+        node.handler = handler
+
+    def match(self, message_text: str) -> Optional[RouteMatch]:
+        """按最长前缀匹配消息文本，未命中时返回None"""
+        node = self._root
+        best = None
+        best_end = 0
+
+        for i, ch in enumerate(message_text):
+            node = node.children.get(ch)
+            if node is None:
+                break
+            if node.command is not None:
+                best = node
+                best_end = i + 1
+
+        if best is None:
+            return None
+        return RouteMatch(best.command, best.handler, message_text[best_end:].strip())
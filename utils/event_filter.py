@@ -0,0 +1,52 @@
+# utils/event_filter.py
+import re
+from typing import Optional, Union
+
+import config
+
+# 只匹配顶层形式的 "key": value。消息文本里的引号在 JSON 中会被转义成 \"，不会被误匹配
+_FIELD_PATTERNS = {
+    'post_type': r'"post_type"\s*:\s*"([a-z_]+)"',
+    'message_type': r'"message_type"\s*:\s*"([a-z_]+)"',
+    'group_id': r'"group_id"\s*:\s*"?(\d+)',
+}
+_BYTES_PATTERNS = {name: re.compile(pattern.encode()) for name, pattern in _FIELD_PATTERNS.items()}
+_STR_PATTERNS = {name: re.compile(pattern) for name, pattern in _FIELD_PATTERNS.items()}
+
+
+def _field(patterns, body, name):
+    """取字段的唯一值；找不到或出现多个不同的值（例如嵌套对象里也有同名字段）时返回 None"""
+    values = set(patterns[name].findall(body))
+    if len(values) != 1:
+        return None
+    value = values.pop()
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def prefilter_event(body: Union[bytes, str]) -> Optional[str]:
+    """
+    在完整解析 JSON 之前，根据原始报文判断事件是否一定会被丢弃
+
+    返回丢弃原因（与 prepare_event 的返回值一致），无法确定时返回 None，
+    由调用方照常解析后交给 prepare_event 做完整校验。只有字段明确存在且不符合条件时才丢弃，
+    因此不会误丢本应处理的事件。
+    """
+    if not config.EVENT_PREFILTER['enabled']:
+        return None
+    patterns = _BYTES_PATTERNS if isinstance(body, (bytes, bytearray)) else _STR_PATTERNS
+
+    post_type = _field(patterns, body, 'post_type')
+    if post_type is None:
+        # 不是上报事件（例如 WebSocket 上的动作响应）或格式无法识别
+        return None
+    if post_type != 'message':
+        return "Not a group message event"
+
+    message_type = _field(patterns, body, 'message_type')
+    if message_type is not None and message_type != 'group':
+        return "Not a group message event"
+
+    group_id = _field(patterns, body, 'group_id')
+    if group_id is not None and int(group_id) not in config.MONITORED_GROUPS:
+        return "Group not monitored"
+    return None
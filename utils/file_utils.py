@@ -1,16 +1,202 @@
 # utils/file_utils.py
 import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+import config
+from utils.tracing import span
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# JSON文件缓存: 绝对路径 -> (文件签名, 解析后的内容)
+# 文件签名由 mtime/ctime/size/inode 组成，外部进程（如 totp_generator）改写文件后签名变化，下次读取会重新解析
+_json_cache = {}
+_json_cache_lock = threading.Lock()
+
+# 每个文件一把锁，保证同一文件的 读-改-写 串行执行
+_file_locks = {}
+_file_locks_guard = threading.Lock()
+
+# fsync 批处理: 等待刷盘的文件路径
+_pending_fsync = set()
+_pending_fsync_lock = threading.Lock()
+_fsync_timer = None
+
+
+def _file_signature(path):
+    """获取用于判断文件是否变化的签名"""
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_ctime_ns, st.st_size, st.st_ino)
+
+
+def _copy_json(value):
+    """复制JSON结构，避免调用方修改缓存中的对象"""
+    if isinstance(value, dict):
+        return {k: _copy_json(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy_json(v) for v in value]
+    return value
+
+
+def _default_json(path):
+    # 如果文件不存在或为空，返回一个合理的默认值
+    return {} if 'account' in path else []
+
 
 def load_json(path):
-    """从指定路径加载JSON文件"""
+    """从指定路径加载JSON文件，文件未变化时直接使用缓存"""
+    with span('storage'):
+        return _load_json(path)
+
+
+def _load_json(path):
+    cache_key = os.path.abspath(path)
+    try:
+        signature = _file_signature(path)
+    except FileNotFoundError:
+        with _json_cache_lock:
+            _json_cache.pop(cache_key, None)
+        return _default_json(path)
+
+    cached = _json_cache.get(cache_key)
+    if cached is not None and cached[0] == signature:
+        return _copy_json(cached[1])
+
     try:
         with open(path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+            content = json.load(f)
     except (FileNotFoundError, json.JSONDecodeError):
-        # 如果文件不存在或为空，返回一个合理的默认值
-        return {} if 'account' in path else []
+        return _default_json(path)
+
+    with _json_cache_lock:
+        _json_cache[cache_key] = (signature, content)
+    return _copy_json(content)
+
+
+def _get_file_lock(path):
+    """获取指定文件的锁"""
+    cache_key = os.path.abspath(path)
+    with _file_locks_guard:
+        lock = _file_locks.get(cache_key)
+        if lock is None:
+            lock = _file_locks[cache_key] = threading.RLock()
+        return lock
+
+
+def _fsync_dir(directory):
+    """刷新目录项，确保 os.replace 的结果落盘（部分平台不支持）"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def flush_pending_fsync():
+    """立即刷盘所有等待批量 fsync 的文件"""
+    global _fsync_timer
+    with _pending_fsync_lock:
+        paths = list(_pending_fsync)
+        _pending_fsync.clear()
+        _fsync_timer = None
+
+    for path in paths:
+        try:
+            with open(path, 'rb') as f:
+                os.fsync(f.fileno())
+        except OSError as e:
+            logger.error("刷盘JSON文件失败: %s - %s", path, e)
+    for directory in {os.path.dirname(path) for path in paths}:
+        _fsync_dir(directory)
+
+
+def _schedule_fsync(path):
+    """登记文件，在 fsync_interval 秒后统一刷盘"""
+    global _fsync_timer
+    with _pending_fsync_lock:
+        _pending_fsync.add(path)
+        if _fsync_timer is None:
+            _fsync_timer = threading.Timer(config.JSON_STORE['fsync_interval'], flush_pending_fsync)
+            _fsync_timer.daemon = True
+            _fsync_timer.start()
+
 
 def dump_json(path, content):
-    """将内容写入指定路径的JSON文件"""
-    with open(path, 'w', encoding='utf-8') as f:
-        json.dump(content, f, ensure_ascii=False, indent=4)
\ No newline at end of file
+    """将内容原子地写入指定路径的JSON文件，并同步更新缓存"""
+    with span('storage'):
+        _dump_json(path, content)
+
+
+def _dump_json(path, content):
+    cache_key = os.path.abspath(path)
+    directory = os.path.dirname(cache_key)
+    fsync_mode = config.JSON_STORE['fsync']
+
+    with _get_file_lock(path):
+        # 先写临时文件再 os.replace，写入中途崩溃也不会截断原文件
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path) + '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(content, f, ensure_ascii=False, indent=4)
+                if fsync_mode == 'always':
+                    f.flush()
+                    os.fsync(f.fileno())
+            # mkstemp 创建的文件权限为0600，沿用原文件的权限
+            try:
+                os.chmod(tmp_path, os.stat(path).st_mode & 0o7777)
+            except FileNotFoundError:
+                os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        if fsync_mode == 'always':
+            _fsync_dir(directory)
+        elif fsync_mode == 'batch':
+            _schedule_fsync(cache_key)
+
+        with _json_cache_lock:
+            _json_cache[cache_key] = (_file_signature(path), _copy_json(content))
+
+
+@contextmanager
+def json_transaction(path, default=None):
+    """
+    JSON文件事务：持有文件锁完成 读取-修改-写回
+
+    用法:
+        with json_transaction(path) as data:
+            data.append(item)
+
+    代码块正常结束且内容有变化时写回文件，抛出异常时放弃修改。
+    文件不存在或内容为空时，如果提供了 default 则使用 default 作为初始内容。
+    """
+    with _get_file_lock(path):
+        data = load_json(path)
+        if not data and default is not None:
+            data = default
+        original = _copy_json(data)
+        yield data
+        if data != original:
+            dump_json(path, data)
+
+
+def invalidate_json_cache(path=None):
+    """清除指定路径（或全部）的JSON缓存"""
+    with _json_cache_lock:
+        if path is None:
+            _json_cache.clear()
+        else:
+            _json_cache.pop(os.path.abspath(path), None)
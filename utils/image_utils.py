@@ -3,23 +3,81 @@ import os
 import hashlib
 import requests
 import re
-from typing import List, Optional
-from datetime import datetime, timedelta
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
 import config
+from utils.file_utils import load_json, dump_json
+from utils.message import Segment, image_segment, iter_cq_codes, local_file, sub_cq
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+try:
+    from PIL import Image
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+    logger.warning("Pillow (PIL) not available. FAQ images will be sent without downscaling.")
+
 
 class ImageManager:
     """FAQ图片管理器，负责下载和处理图片"""
 
-    def __init__(self, images_dir: str = None):
+    def __init__(self, images_dir: str = None, database=None):
         self.images_dir = images_dir or config.FAQ_IMAGES_DIR
         os.makedirs(self.images_dir, exist_ok=True)
+        # 记录图片引用计数的FAQ数据库，默认使用全局实例
+        self._database = database
+        # 发送用的缩小版图片存放目录
+        self.variants_dir = os.path.join(self.images_dir, 'variants')
+        os.makedirs(self.variants_dir, exist_ok=True)
+
+        download_config = config.FAQ_IMAGE_DOWNLOAD
+        self.timeout = download_config['timeout']
+        self.per_host_limit = download_config['per_host']
+        self._executor = ThreadPoolExecutor(max_workers=download_config['workers'],
+                                            thread_name_prefix='image-download')
+        self._session = requests.Session()
+        # 正在下载中的URL -> Future，同一URL并发出现时共享同一次下载
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+        # 每个主机的并发下载数限制
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self.max_bytes = download_config['max_bytes']
+
+        # URL -> 内容寻址文件名 的索引，已下载过的URL无需再访问网络
+        self._url_index_path = os.path.join(self.images_dir, 'url_index.json')
+        self._url_index: Dict[str, str] = load_json(self._url_index_path) or {}
+        self._url_index_lock = threading.Lock()
+
+    @property
+    def database(self):
+        if self._database is None:
+            # 延迟导入，避免 database_manager 与 image_utils 之间的循环依赖
+            from services.database_manager import database_manager
+            self._database = database_manager
+        return self._database
 
-    def _get_md5_hash(self, url: str) -> str:
-        """根据URL生成MD5哈希"""
-        return hashlib.md5(url.encode('utf-8')).hexdigest()
+    @staticmethod
+    def _sniff_extension(head: bytes) -> Optional[str]:
+        """根据文件头判断图片格式"""
+        if head.startswith(b'\x89PNG'):
+            return '.png'
+        if head.startswith(b'\xff\xd8\xff'):
+            return '.jpg'
+        if head.startswith(b'GIF8'):
+            return '.gif'
+        if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+            return '.webp'
+        if head.startswith(b'BM'):
+            return '.bmp'
+        return None
 
     def _get_image_extension(self, url: str) -> str:
-        """从URL中提取图片扩展名"""
+        """从URL中提取图片扩展名（无法从文件头识别格式时使用）"""
         # 支持的格式
         supported_formats = ['jpg', 'jpeg', 'png', 'gif', 'bmp', 'webp']
         url_lower = url.lower()
@@ -31,75 +89,253 @@ class ImageManager:
         # 默认使用jpg
         return '.jpg'
 
-    def download_image(self, url: str) -> Optional[str]:
-        """下载图片并返回本地文件路径"""
-        try:
-            # 生成文件名
-            md5_hash = self._get_md5_hash(url)
-            extension = self._get_image_extension(url)
-            filename = md5_hash + extension
-            filepath = os.path.join(self.images_dir, filename)
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        """获取URL所在主机的并发限制信号量"""
+        host = urlparse(url).netloc
+        with self._inflight_lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = self._host_slots[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return slot
+
+    def download_image_async(self, url: str) -> Future:
+        """提交下载任务，同一URL正在下载时直接返回已有的Future"""
+        with self._inflight_lock:
+            future = self._inflight.get(url)
+            if future is not None:
+                return future
+            future = self._executor.submit(self.download_image, url)
+            self._inflight[url] = future
+
+        def _done(_):
+            with self._inflight_lock:
+                if self._inflight.get(url) is future:
+                    del self._inflight[url]
+        future.add_done_callback(_done)
+        return future
 
-            # 如果文件已存在，直接返回
+    def _lookup_url(self, url: str) -> Optional[str]:
+        """查询URL索引，对应文件仍存在时返回本地路径"""
+        with self._url_index_lock:
+            filename = self._url_index.get(url)
+        if filename:
+            # 先刷新宽限期再检查文件：登记之后垃圾回收不会再删除它
+            self.database.register_image_file(filename)
+            filepath = os.path.join(self.images_dir, filename)
             if os.path.exists(filepath):
                 return filepath
+        return None
+
+    def _remember_url(self, url: str, filename: str):
+        """记录 URL -> 文件名 并持久化索引"""
+        with self._url_index_lock:
+            if self._url_index.get(url) == filename:
+                return
+            self._url_index[url] = filename
+            dump_json(self._url_index_path, self._url_index)
+
+    def download_image(self, url: str) -> Optional[str]:
+        """下载图片并返回本地文件路径，文件按内容的SHA-256命名，相同图片只保存一份"""
+        filepath = self._lookup_url(url)
+        if filepath:
+            return filepath
 
-            # 下载图片
-            response = requests.get(url, timeout=30)
-            response.raise_for_status()
+        tmp_path = None
+        try:
+            with self._host_slot(url):
+                with self._session.get(url, timeout=self.timeout, stream=True) as response:
+                    response.raise_for_status()
+
+                    # 边下载边计算哈希并写入临时文件，不在内存中缓存整张图片
+                    fd, tmp_path = tempfile.mkstemp(dir=self.images_dir, prefix='.download-', suffix='.tmp')
+                    digest = hashlib.sha256()
+                    extension = None
+                    size = 0
+                    with os.fdopen(fd, 'wb') as f:
+                        for chunk in response.iter_content(chunk_size=64 * 1024):
+                            if not chunk:
+                                continue
+                            if extension is None:
+                                extension = self._sniff_extension(chunk[:16]) or self._get_image_extension(url)
+                            size += len(chunk)
+                            if size > self.max_bytes:
+                                raise ValueError(f"图片超过大小限制 {self.max_bytes} 字节")
+                            digest.update(chunk)
+                            f.write(chunk)
+
+            if size == 0:
+                raise ValueError("图片内容为空")
 
-            # 保存到本地
-            with open(filepath, 'wb') as f:
-                f.write(response.content)
+            filename = digest.hexdigest() + extension
+            filepath = os.path.join(self.images_dir, filename)
+            # 登记到图片索引（已有文件则刷新宽限期），如果最终没有被FAQ引用，会在宽限期后被回收；
+            # 登记在检查文件之前，检查到的已有文件不会在此之后被回收
+            self.database.register_image_file(filename)
+            if os.path.exists(filepath):
+                # 相同内容已经存在（例如同一张图经不同CDN地址上传），丢弃本次下载
+                os.remove(tmp_path)
+            else:
+                # mkstemp 创建的文件权限为0600，NapCat 可能以其他用户读取本地图片
+                os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, filepath)
+            tmp_path = None
 
+            self._remember_url(url, filename)
+            # 编辑时就生成发送用的缩小版，查询时无需再处理
+            self.make_variant(filename)
             return filepath
 
         except Exception as e:
-            print(f"下载图片失败: {url} - {e}")
+            logger.error("下载图片失败: %s - %s", url, e)
             return None
+        finally:
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _variant_path(self, filename: str) -> str:
+        """缩小版图片路径：按原图的内容哈希和当前尺寸预算命名，修改预算后会生成新的版本"""
+        variant_config = config.FAQ_IMAGE_VARIANT
+        stem = os.path.splitext(filename)[0]
+        return os.path.join(self.variants_dir,
+                            f"{stem}_{variant_config['max_side']}_{variant_config['max_bytes']}.jpg")
+
+    def make_variant(self, filename: str) -> Optional[str]:
+        """
+        为原图生成尺寸和体积都在预算内的JPEG缩小版
+
+        原图已在预算内、是动图、或 Pillow 不可用时不生成，返回None，发送时直接使用原图。
+        """
+        variant_config = config.FAQ_IMAGE_VARIANT
+        if not HAS_PIL or not variant_config['enabled']:
+            return None
+
+        source = os.path.join(self.images_dir, filename)
+        target = self._variant_path(filename)
+        if os.path.exists(target):
+            return target
+
+        max_side = variant_config['max_side']
+        max_bytes = variant_config['max_bytes']
+        try:
+            with Image.open(source) as img:
+                if getattr(img, 'is_animated', False):
+                    return None
+                if max(img.size) <= max_side and os.path.getsize(source) <= max_bytes:
+                    return None
+
+                img.thumbnail((max_side, max_side))
+                if img.mode in ('RGBA', 'LA', 'P'):
+                    # JPEG 不支持透明度，铺白底
+                    img = img.convert('RGBA')
+                    background = Image.new('RGB', img.size, (255, 255, 255))
+                    background.paste(img, mask=img.split()[-1])
+                    img = background
+                elif img.mode != 'RGB':
+                    img = img.convert('RGB')
+
+                # 逐步降低质量，仍超出体积预算时再缩小尺寸
+                quality = variant_config['quality']
+                fd, tmp_path = tempfile.mkstemp(dir=self.variants_dir, prefix='.variant-', suffix='.tmp')
+                os.close(fd)
+                try:
+                    while True:
+                        img.save(tmp_path, 'JPEG', quality=quality, optimize=True)
+                        if os.path.getsize(tmp_path) <= max_bytes or max(img.size) <= 64:
+                            break
+                        if quality > 50:
+                            quality -= 10
+                        else:
+                            img = img.resize((max(1, img.width * 3 // 4), max(1, img.height * 3 // 4)))
+                    os.chmod(tmp_path, 0o644)
+                    os.replace(tmp_path, target)
+                finally:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+            return target
+        except Exception as e:
+            logger.error("生成缩小版图片失败: %s - %s", filename, e)
+            return None
+
+    def compact_content(self, content: str) -> str:
+        """将内容中的本地图片替换为已生成的缩小版，没有缩小版的保持原图"""
+        def replace(segment):
+            path = local_file(segment)
+            if path is None:
+                return None
+            variant = self._variant_path(re.split(r'[\\/]', path)[-1])
+            if os.path.exists(variant):
+                return image_segment(file=os.path.relpath(variant, start=os.getcwd()))
+            return None
+
+        return sub_cq(content, replace, 'image')
 
     def extract_image_urls(self, content: str) -> List[str]:
         """从内容中提取图片URL"""
-        # 匹配[CQ:image,url=...]格式
-        pattern = r'\[CQ:image,url=([^\]]+)\]'
-        matches = re.findall(pattern, content)
-        return matches
-
-    def process_content_images(self, content: str) -> str:
-        """处理内容中的图片，将URL替换为本地CQ码"""
-        image_urls = self.extract_image_urls(content)
+        return [segment['data']['url'] for segment in iter_cq_codes(content, 'image') if segment['data'].get('url')]
 
-        for url in image_urls:
-            local_path = self.download_image(url)
+    def _download_all(self, urls: List[str]) -> Dict[str, Segment]:
+        """去重后并发下载，返回 URL -> 本地图片消息段（下载失败的URL不在结果中）"""
+        futures = {url: self.download_image_async(url) for url in dict.fromkeys(urls)}
+        localized = {}
+        for url, future in futures.items():
+            local_path = future.result()
             if local_path:
-                # 获取相对路径用于CQ码
-                rel_path = os.path.relpath(local_path, start=os.getcwd())
-                # 替换为本地文件CQ码
-                cq_code = f"[CQ:image,file=file:///{rel_path}]"
-                content = content.replace(f"[CQ:image,url={url}]", cq_code)
+                localized[url] = image_segment(file=os.path.relpath(local_path, start=os.getcwd()))
+        return localized
 
-        return content
+    def localize_images(self, segments: List[Segment]) -> List[Segment]:
+        """将消息段中的网络图片并发下载到本地，替换为本地图片段；下载失败的保持原样"""
+        urls = [segment['data']['url'] for segment in segments
+                if segment['type'] == 'image' and segment['data'].get('url')]
+        if not urls:
+            return segments
+        localized = self._download_all(urls)
+        return [localized.get(segment['data'].get('url'), segment) if segment['type'] == 'image' else segment
+                for segment in segments]
 
-    def cleanup_old_images(self, days: int = 30):
-        """清理旧图片文件"""
-        try:
-            cutoff_date = datetime.now() - timedelta(days=days)
-            removed_count = 0
+    def process_content_images(self, content: str) -> str:
+        """处理CQ码字符串中的图片，并发下载后将URL一次性替换为本地CQ码"""
+        localized = self._download_all(self.extract_image_urls(content))
+        if not localized:
+            return content
+        return sub_cq(content, lambda segment: localized.get(segment['data'].get('url')), 'image')
 
-            for filename in os.listdir(self.images_dir):
-                filepath = os.path.join(self.images_dir, filename)
-                if os.path.isfile(filepath):
-                    file_mtime = datetime.fromtimestamp(os.path.getmtime(filepath))
-                    if file_mtime < cutoff_date:
-                        os.remove(filepath)
-                        removed_count += 1
+    def _remove_image_file(self, filename: str) -> bool:
+        """删除一个图片文件及其缩小版，文件已不存在也视为成功"""
+        for path in (self._variant_path(filename), os.path.join(self.images_dir, filename)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.error("删除图片失败: %s - %s", path, e)
+                return False
+        return True
 
-            print(f"清理了 {removed_count} 个旧图片文件")
-            return removed_count
+    def collect_garbage(self, batch_size: int = None, grace_seconds: float = None) -> int:
+        """
+        增量回收不再被任何FAQ引用的图片
 
-        except Exception as e:
-            print(f"清理图片失败: {e}")
-            return 0
+        依据数据库中的引用计数索引工作，不扫描图片目录；每次最多回收 batch_size 个文件，
+        引用数归零后需超过 grace_seconds 才会被回收，避免删除刚下载、尚未保存到FAQ的图片。
+        """
+        gc_config = config.FAQ_IMAGE_GC
+        batch_size = batch_size or gc_config['batch_size']
+        if grace_seconds is None:
+            grace_seconds = gc_config['grace_seconds']
+
+        removed = self.database.collect_orphan_images(batch_size, grace_seconds, self._remove_image_file)
+        if removed:
+            # 清理指向已删除文件的URL索引
+            removed_set = set(removed)
+            with self._url_index_lock:
+                stale = [url for url, filename in self._url_index.items() if filename in removed_set]
+                for url in stale:
+                    del self._url_index[url]
+                if stale:
+                    dump_json(self._url_index_path, self._url_index)
+            logger.info("回收了 %d 个无引用的FAQ图片", len(removed))
+        return len(removed)
 
 # 全局图片管理器实例
 image_manager = ImageManager()
\ No newline at end of file
@@ -0,0 +1,117 @@
+# utils/log.py
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+from typing import Dict, Optional
+
+import config
+
+# 所有模块的 logger 都挂在这个名字下面，只在这里安装一次处理器，不影响第三方库的日志配置
+ROOT_LOGGER_NAME = 'qqbot'
+
+
+class DebugSampler(logging.Filter):
+    """
+    DEBUG 日志采样
+
+    按日志模板（record.msg，格式化之前的字符串）计数，同一模板每 every 条只放行 1 条，
+    第一条总会输出；INFO 及以上级别不受影响。
+    """
+
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = max(1, every)
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.every == 1:
+            return True
+        with self._lock:
+            count = self._counts.get(record.msg, 0)
+            self._counts[record.msg] = count + 1
+        return count % self.every == 0
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    只把记录放进有界队列的处理器
+
+    与标准 QueueHandler 不同，入队前不格式化消息：%-参数原样保留，由后台线程在写出时
+    才拼接字符串，调用方只付出创建 LogRecord 的开销。队列满时丢弃并计数。
+    因为格式化被推迟，记录日志之后还会被修改的可变参数，输出的是修改后的内容。
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 同进程内传递，不需要预先格式化或序列化
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_setup_lock = threading.Lock()
+_handler: Optional[NonBlockingQueueHandler] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def setup_logging(stream=None):
+    """安装队列处理器和后台写出线程，重复调用无副作用"""
+    global _handler, _listener
+    with _setup_lock:
+        if _handler is not None:
+            return
+        settings = config.LOGGING
+        root = logging.getLogger(ROOT_LOGGER_NAME)
+        root.setLevel(settings['level'].upper())
+        root.propagate = False
+
+        output = logging.StreamHandler(stream or sys.stdout)
+        output.setFormatter(logging.Formatter(settings['format']))
+
+        _handler = NonBlockingQueueHandler(queue.Queue(maxsize=settings['queue_size']))
+        _handler.addFilter(DebugSampler(settings['debug_sample_every']))
+        root.addHandler(_handler)
+
+        _listener = logging.handlers.QueueListener(_handler.queue, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """写出队列中剩余的日志并停止后台线程"""
+    global _handler, _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            logging.getLogger(ROOT_LOGGER_NAME).removeHandler(_handler)
+        _handler, _listener = None, None
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    获取模块 logger，用法:
+        logger = get_logger(__name__)
+        logger.info("向群 %s 发送消息成功", group_id)
+
+    参数用 % 占位符传入而不是 f-string，级别被过滤或采样丢弃时不会格式化字符串。
+    """
+    setup_logging()
+    return logging.getLogger(f"{ROOT_LOGGER_NAME}.{name}")
+
+
+def get_log_stats() -> Dict[str, int]:
+    """日志队列的计数器"""
+    if _handler is None:
+        return {'queued': 0, 'dropped': 0}
+    return {'queued': _handler.queue.qsize(), 'dropped': _handler.dropped}
@@ -0,0 +1,88 @@
+# utils/lru_cache.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    线程安全的 LRU 缓存，支持条目数上限和 TTL 过期
+
+    invalidate() 会推进缓存的代数(generation)。读取方在查询数据源前记下代数，
+    写入缓存时用 put(..., generation=...) 带上，若期间发生过失效则放弃写入，
+    避免并发时把失效前读到的旧值重新放回缓存。
+    """
+
+    def __init__(self, max_size: int = 256, ttl: Optional[float] = 300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: 'OrderedDict[Hashable, Tuple[Any, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """读取缓存，命中时将条目移到最近使用的位置"""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self._stats['misses'] += 1
+                return default
+
+            value, expires_at = entry
+            if expires_at and expires_at <= time.monotonic():
+                del self._data[key]
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return default
+
+            self._data.move_to_end(key)
+            self._stats['hits'] += 1
+            return value
+
+    def put(self, key: Hashable, value: Any, generation: Optional[int] = None) -> bool:
+        """写入缓存，generation 与当前代数不一致时放弃写入"""
+        if self.max_size <= 0:
+            return False
+        expires_at = time.monotonic() + self.ttl if self.ttl else 0
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return False
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self._stats['evictions'] += 1
+            return True
+
+    def invalidate(self, key: Hashable):
+        """使单个条目失效"""
+        with self._lock:
+            self._generation += 1
+            self._data.pop(key, None)
+            self._stats['invalidations'] += 1
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """返回计数器快照"""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot['size'] = len(self._data)
+        lookups = snapshot['hits'] + snapshot['misses']
+        snapshot['hit_rate'] = snapshot['hits'] / lookups if lookups else 0.0
+        return snapshot
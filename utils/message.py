@@ -0,0 +1,200 @@
+# utils/message.py
+# OneBot 消息段模型与 CQ 码编解码
+#
+# 消息段就是 OneBot 数组格式里的 {"type": ..., "data": {...}} 字典：数组上报的消息不需要转换，
+# 只有字符串形式的 CQ 码才需要解析。事件里的消息只在 prepare_event 中取一次，之后以消息段列表
+# 的形式传给处理器；存储和发送时再编码成 CQ 码字符串。所有 CQ 码相关的正则都集中在这里。
+import re
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+# [CQ:类型,键=值,...]；值里的 , [ ] & 按 OneBot 规范转义，因此值本身不含 ]
+CQ_PATTERN = re.compile(r'\[CQ:([A-Za-z0-9_.\-]+)((?:,[^\]]*)?)\]')
+
+LOCAL_FILE_PREFIX = 'file:///'
+
+_TEXT_ESCAPES = (('&', '&amp;'), ('[', '&#91;'), (']', '&#93;'))
+_PARAM_ESCAPES = _TEXT_ESCAPES + ((',', '&#44;'),)
+_UNESCAPE_PATTERN = re.compile(r'&(?:amp|#91|#93|#44);')
+_UNESCAPES = {'&amp;': '&', '&#91;': '[', '&#93;': ']', '&#44;': ','}
+_WORD_PATTERN = re.compile(r'\s*\S+')
+
+
+Segment = Dict[str, Any]
+
+
+def segment(segment_type: str, **data) -> Segment:
+    return {'type': segment_type, 'data': data}
+
+
+def text_segment(text: str) -> Segment:
+    return {'type': 'text', 'data': {'text': text}}
+
+
+def image_segment(url: Optional[str] = None, file: Optional[str] = None) -> Segment:
+    """url 为网络图片地址，file 为本地路径（自动加 file:/// 前缀）"""
+    if file is not None:
+        return {'type': 'image', 'data': {'file': LOCAL_FILE_PREFIX + file}}
+    return {'type': 'image', 'data': {'url': url or ''}}
+
+
+def segment_text(seg: Segment) -> str:
+    return seg['data'].get('text', '') if seg['type'] == 'text' else ''
+
+
+def local_file(seg: Segment) -> Optional[str]:
+    """本地图片的相对路径（file:/// 之后的部分），不是本地图片时为 None"""
+    if seg['type'] != 'image':
+        return None
+    file = seg['data'].get('file', '')
+    return file[len(LOCAL_FILE_PREFIX):] if file.startswith(LOCAL_FILE_PREFIX) else None
+
+
+def _escape(value: str, escapes) -> str:
+    for raw, escaped in escapes:
+        if raw in value:
+            value = value.replace(raw, escaped)
+    return value
+
+
+def _unescape(value: str) -> str:
+    if '&' not in value:
+        return value
+    return _UNESCAPE_PATTERN.sub(lambda m: _UNESCAPES[m.group(0)], value)
+
+
+def _decode_params(params: str) -> Dict[str, str]:
+    data: Dict[str, str] = {}
+    last = None
+    for part in params[1:].split(',') if params else ():
+        name, sep, value = part.partition('=')
+        if sep:
+            data[name] = _unescape(value)
+            last = name
+        elif last is not None:
+            # 兼容旧数据里未转义的逗号（例如 URL 中的逗号）
+            data[last] += ',' + _unescape(part)
+    return data
+
+
+def _decode_match(match: 're.Match') -> Segment:
+    return {'type': match.group(1), 'data': _decode_params(match.group(2))}
+
+
+def cq_code(segment_type: str, **data) -> str:
+    """编码单个 CQ 码，例如 cq_code('at', qq=123)"""
+    return encode_cq([segment(segment_type, **data)])
+
+
+def encode_cq(segments: Iterable[Segment]) -> str:
+    """把消息段编码成 CQ 码字符串，文本中的 & [ ] 会被转义"""
+    parts = []
+    for seg in segments:
+        data = seg['data']
+        if seg['type'] == 'text':
+            parts.append(_escape(data.get('text', ''), _TEXT_ESCAPES))
+        else:
+            parts.append(f"[CQ:{seg['type']}")
+            for name, value in data.items():
+                parts.append(f",{name}={_escape(str(value), _PARAM_ESCAPES)}")
+            parts.append(']')
+    return ''.join(parts)
+
+
+def decode_cq(content: str) -> List[Segment]:
+    """把 CQ 码字符串解析成消息段"""
+    segments = []
+    position = 0
+    for match in CQ_PATTERN.finditer(content):
+        if match.start() > position:
+            segments.append(text_segment(_unescape(content[position:match.start()])))
+        segments.append(_decode_match(match))
+        position = match.end()
+    if position < len(content):
+        segments.append(text_segment(_unescape(content[position:])))
+    return segments
+
+
+def iter_cq_codes(content: str, segment_type: Optional[str] = None) -> Iterator[Segment]:
+    """只解析字符串中的 CQ 码部分（可按类型过滤），文本部分不做处理"""
+    for match in CQ_PATTERN.finditer(content):
+        if segment_type is None or match.group(1) == segment_type:
+            yield _decode_match(match)
+
+
+def sub_cq(content: str, replace: Callable[[Segment], Union[Segment, str, None]],
+           segment_type: Optional[str] = None) -> str:
+    """
+    逐个替换字符串中的 CQ 码，文本部分原样保留
+
+    replace 返回新的消息段或字符串时替换，返回 None 时保持原样。
+    """
+    def substitute(match):
+        if segment_type is not None and match.group(1) != segment_type:
+            return match.group(0)
+        result = replace(_decode_match(match))
+        if result is None:
+            return match.group(0)
+        return result if isinstance(result, str) else encode_cq([result])
+
+    return CQ_PATTERN.sub(substitute, content)
+
+
+def parse_message(message: Union[str, List[Segment], None]) -> List[Segment]:
+    """
+    取得事件中 message 字段的消息段
+
+    数组格式原样返回，不做任何复制；字符串格式（NapCat 设为 string 上报时）按 CQ 码解析。
+    """
+    if not message:
+        return []
+    if isinstance(message, str):
+        return decode_cq(message)
+    return message
+
+
+def plain_text(segments: Iterable[Segment], placeholders: Optional[Dict[str, str]] = None) -> str:
+    """拼接文本段；placeholders 可把其他类型的段显示为占位文字，例如 {'image': '[图片]'}"""
+    if placeholders is None:
+        return ''.join([seg['data']['text'] for seg in segments if seg['type'] == 'text'])
+    return ''.join([seg['data']['text'] if seg['type'] == 'text' else placeholders.get(seg['type'], '')
+                    for seg in segments])
+
+
+def drop_words(segments: List[Segment], count: int) -> List[Segment]:
+    """
+    去掉消息开头的 count 个以空白分隔的词，返回剩余的消息段
+
+    用于从 "#not edit key 内容..." 中取出内容部分；词之前或之间出现的非文本段（回复、@ 等）一并丢弃。
+    """
+    result: List[Segment] = []
+    for index, seg in enumerate(segments):
+        if count <= 0:
+            result.extend(segments[index:])
+            break
+        if seg['type'] != 'text':
+            continue
+        text = seg['data'].get('text', '')
+        position = 0
+        while count > 0:
+            match = _WORD_PATTERN.match(text, position)
+            if match is None:
+                break
+            position = match.end()
+            count -= 1
+        if count <= 0 and position < len(text):
+            result.append(text_segment(text[position:]))
+    return result
+
+
+def strip_segments(segments: List[Segment]) -> List[Segment]:
+    """去掉首尾文本段的空白，变成空串的文本段被移除"""
+    segments = list(segments)
+    while segments and segments[0]['type'] == 'text' and not segment_text(segments[0]).strip():
+        segments.pop(0)
+    while segments and segments[-1]['type'] == 'text' and not segment_text(segments[-1]).strip():
+        segments.pop()
+    if segments and segments[0]['type'] == 'text':
+        segments[0] = text_segment(segment_text(segments[0]).lstrip())
+    if segments and segments[-1]['type'] == 'text':
+        segments[-1] = text_segment(segment_text(segments[-1]).rstrip())
+    return segments
@@ -0,0 +1,111 @@
+# utils/message_coalescer.py
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Hashable, List
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+
+class MessageCoalescer:
+    """
+    出站消息合并器
+
+    同一个键（群号）的消息先在缓冲区里等待 window 秒，窗口结束时把缓冲的纯文本消息
+    用换行拼接成尽量少的几条，每条不超过 max_length，再按原顺序交给 flush(key, text)。
+    含 CQ 码（图片、@ 等）的消息不参与合并，单独发送，前后顺序保持不变。
+
+    所有键共用一个后台线程；窗口长度固定，先开始的窗口一定先结束，
+    因此到期队列用先进先出的 deque 即可。
+    """
+
+    def __init__(self, flush: Callable[[Hashable, str], None], window: float = 0.05,
+                 max_length: int = 4500, separator: str = '\n'):
+        self.flush = flush
+        self.window = window
+        self.max_length = max_length
+        self.separator = separator
+        self._buffers: Dict[Hashable, List[str]] = {}
+        self._deadlines: 'deque' = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stats = {'messages': 0, 'sends': 0}
+
+    def _ensure_started(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._flush_loop, name='outbound-coalescer', daemon=True)
+            self._thread.start()
+
+    def add(self, key: Hashable, message: str):
+        """缓冲一条消息，窗口结束后统一发送"""
+        with self._cond:
+            self._ensure_started()
+            self._stats['messages'] += 1
+            buffer = self._buffers.get(key)
+            if buffer is None:
+                self._buffers[key] = [message]
+                self._deadlines.append((time.monotonic() + self.window, key))
+                self._cond.notify()
+            else:
+                buffer.append(message)
+
+    def _flush_loop(self):
+        while True:
+            with self._cond:
+                while not self._deadlines:
+                    self._cond.wait()
+                deadline, key = self._deadlines[0]
+                delay = deadline - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                self._deadlines.popleft()
+                messages = self._buffers.pop(key, [])
+            self._send(key, messages)
+
+    def _send(self, key: Hashable, messages: List[str]):
+        for text in self.pack(messages):
+            with self._cond:
+                self._stats['sends'] += 1
+            try:
+                self.flush(key, text)
+            except Exception as e:
+                logger.error("发送合并消息失败: %s", e)
+
+    def pack(self, messages: List[str]) -> List[str]:
+        """按顺序把消息拼接成不超过 max_length 的若干条"""
+        batches = []
+        current = ''
+        for message in messages:
+            if '[CQ:' in message or len(message) >= self.max_length:
+                if current:
+                    batches.append(current)
+                    current = ''
+                batches.append(message)
+            elif not current:
+                current = message
+            elif len(current) + len(self.separator) + len(message) <= self.max_length:
+                current += self.separator + message
+            else:
+                batches.append(current)
+                current = message
+        if current:
+            batches.append(current)
+        return batches
+
+    def flush_all(self):
+        """立即发送所有缓冲中的消息"""
+        with self._cond:
+            pending = list(self._buffers.items())
+            self._buffers.clear()
+            self._deadlines.clear()
+        for key, messages in pending:
+            self._send(key, messages)
+
+    def stats(self) -> Dict[str, int]:
+        """返回计数器快照"""
+        with self._cond:
+            snapshot = dict(self._stats)
+            snapshot['buffered'] = sum(len(buffer) for buffer in self._buffers.values())
+        return snapshot
@@ -0,0 +1,72 @@
+# utils/napcat_client.py
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import config
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+
+class NapCatClient:
+    """
+    NapCat OneBot HTTP 客户端
+
+    所有动作共用一个带连接池的 requests.Session，连接保持 keep-alive 复用，
+    参数以 JSON 请求体 POST，避免长消息把查询字符串撑爆。
+    """
+
+    def __init__(self, base_url: Optional[str] = None, pool_size: int = None, timeout: float = None):
+        client_config = config.NAPCAT_CLIENT
+        self._base_url = base_url
+        self.timeout = timeout or client_config['timeout']
+        pool_size = pool_size or client_config['pool_size']
+
+        self.session = requests.Session()
+        self.session.verify = False
+        self.session.headers.update({'Connection': 'keep-alive'})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    @property
+    def base_url(self) -> str:
+        # 未显式指定时每次读取配置，便于运行时切换 NapCat 地址
+        return (self._base_url or config.NAPCAT_BASE_URL).rstrip('/')
+
+    def call_action(self, action: str, **params: Any) -> Optional[Dict[str, Any]]:
+        """调用 OneBot 动作，成功时返回响应JSON，失败时返回None"""
+        url = f"{self.base_url}/{action}"
+        try:
+            response = self.session.post(url, json=params, timeout=self.timeout)
+        except requests.RequestException as e:
+            logger.error("调用 NapCat 动作 %s 时发生网络异常: %s", action, e)
+            return None
+
+        if response.status_code != 200:
+            logger.error("调用 NapCat 动作 %s 失败: %s, %s", action, response.status_code, response.text)
+            return None
+
+        try:
+            return response.json()
+        except ValueError:
+            return {}
+
+    def send_group_msg(self, group_id, message) -> bool:
+        """发送群聊消息"""
+        result = self.call_action('send_group_msg', group_id=group_id, message=message)
+        if result is None:
+            return False
+        if result.get('status') == 'failed':
+            logger.error("向群 %s 发送消息失败: %s", group_id, result)
+            return False
+        return True
+
+    def close(self):
+        self.session.close()
+
+
+# 全局 NapCat 客户端实例
+napcat_client = NapCatClient()
@@ -1,10 +1,13 @@
 # utils/notion_utils.py
 import requests
 from datetime import datetime, timedelta
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, Iterator
 import json
 import os
 from .file_utils import load_json, dump_json
+from .log import get_logger
+
+logger = get_logger(__name__)
 
 
 def get_bing_image_url() -> str:
@@ -23,67 +26,109 @@ def get_bing_image_url() -> str:
             # 返回默认图片
             return "https://picsum.photos/800/600?random=1"
     except Exception as e:
-        print(f"Error getting Bing image: {e}")
+        logger.error("Error getting Bing image: %s", e)
         return "https://picsum.photos/800/600?random=1"
 
 
-def process_notion_blocks(blocks: list) -> str:
+def process_notion_blocks(blocks: Iterable[Dict[str, Any]]) -> str:
     """处理Notion块内容并转换为文本"""
-    text_parts = []
+    return "\n\n".join(iter_notion_block_texts(blocks))
+
+
+def iter_notion_block_texts(blocks: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """
+    逐块产出Notion块对应的文本，空块跳过
 
+    blocks 可以是 NotionService.iter_page_children 返回的生成器，边拉取边转换。
+    iter_block_tree / load_block_tree 加载的子块（"children"）缩进后接在父块的文本之后，与父块算作同一段。
+    """
     for block in blocks:
-        block_type = block.get("type", "")
-        block_content = block.get(block_type, {})
-
-        if block_type == "paragraph":
-            paragraph_text = extract_rich_text(block_content.get("rich_text", []))
-            if paragraph_text:
-                text_parts.append(paragraph_text)
-
-        elif block_type == "heading_1":
-            heading_text = extract_rich_text(block_content.get("rich_text", []))
-            if heading_text:
-                text_parts.append(f"# {heading_text}")
-
-        elif block_type == "heading_2":
-            heading_text = extract_rich_text(block_content.get("rich_text", []))
-            if heading_text:
-                text_parts.append(f"## {heading_text}")
-
-        elif block_type == "heading_3":
-            heading_text = extract_rich_text(block_content.get("rich_text", []))
-            if heading_text:
-                text_parts.append(f"### {heading_text}")
-
-        elif block_type == "bulleted_list_item":
-            item_text = extract_rich_text(block_content.get("rich_text", []))
-            if item_text:
-                text_parts.append(f"• {item_text}")
-
-        elif block_type == "numbered_list_item":
-            item_text = extract_rich_text(block_content.get("rich_text", []))
-            if item_text:
-                text_parts.append(f"1. {item_text}")
-
-        elif block_type == "to_do":
-            item_text = extract_rich_text(block_content.get("rich_text", []))
-            checked = block_content.get("checked", False)
-            checkbox = "☑" if checked else "☐"
-            if item_text:
-                text_parts.append(f"{checkbox} {item_text}")
-
-        elif block_type == "code":
-            code_text = extract_rich_text(block_content.get("rich_text", []))
-            language = block_content.get("language", "")
-            if code_text:
-                text_parts.append(f"```{language}\n{code_text}\n```")
-
-        elif block_type == "quote":
-            quote_text = extract_rich_text(block_content.get("rich_text", []))
-            if quote_text:
-                text_parts.append(f"> {quote_text}")
-
-    return "\n\n".join(text_parts)
+        lines = list(_iter_block_lines(block, 0))
+        if lines:
+            yield "\n".join(lines)
+
+
+# 只用来容纳子块的块类型，本身没有文本，子块不额外缩进
+_CONTAINER_BLOCK_TYPES = {"column_list", "column", "synced_block"}
+
+
+def _iter_block_lines(block: Dict[str, Any], depth: int) -> Iterator[str]:
+    """块及其子块的文本行，每层嵌套缩进两个空格"""
+    text = notion_block_text(block)
+    if text:
+        indent = "  " * depth
+        for line in text.split("\n"):
+            yield indent + line
+    child_depth = depth if block.get("type") in _CONTAINER_BLOCK_TYPES else depth + 1
+    for child in block.get("children", ()):
+        yield from _iter_block_lines(child, child_depth)
+
+
+def notion_block_text(block: Dict[str, Any]) -> str:
+    """单个Notion块自身的文本（不含子块），不支持的类型或空块返回空串"""
+    block_type = block.get("type", "")
+    block_content = block.get(block_type, {})
+
+    if block_type == "paragraph":
+        paragraph_text = extract_rich_text(block_content.get("rich_text", []))
+        if paragraph_text:
+            return paragraph_text
+
+    elif block_type == "heading_1":
+        heading_text = extract_rich_text(block_content.get("rich_text", []))
+        if heading_text:
+            return f"# {heading_text}"
+
+    elif block_type == "heading_2":
+        heading_text = extract_rich_text(block_content.get("rich_text", []))
+        if heading_text:
+            return f"## {heading_text}"
+
+    elif block_type == "heading_3":
+        heading_text = extract_rich_text(block_content.get("rich_text", []))
+        if heading_text:
+            return f"### {heading_text}"
+
+    elif block_type == "bulleted_list_item":
+        item_text = extract_rich_text(block_content.get("rich_text", []))
+        if item_text:
+            return f"• {item_text}"
+
+    elif block_type == "numbered_list_item":
+        item_text = extract_rich_text(block_content.get("rich_text", []))
+        if item_text:
+            return f"1. {item_text}"
+
+    elif block_type == "to_do":
+        item_text = extract_rich_text(block_content.get("rich_text", []))
+        checked = block_content.get("checked", False)
+        checkbox = "☑" if checked else "☐"
+        if item_text:
+            return f"{checkbox} {item_text}"
+
+    elif block_type == "code":
+        code_text = extract_rich_text(block_content.get("rich_text", []))
+        language = block_content.get("language", "")
+        if code_text:
+            return f"```{language}\n{code_text}\n```"
+
+    elif block_type == "quote":
+        quote_text = extract_rich_text(block_content.get("rich_text", []))
+        if quote_text:
+            return f"> {quote_text}"
+
+    elif block_type == "toggle":
+        toggle_text = extract_rich_text(block_content.get("rich_text", []))
+        if toggle_text:
+            return f"▸ {toggle_text}"
+
+    elif block_type == "child_page":
+        return f"📄 {block_content.get('title') or '无标题页面'}"
+
+    elif block_type == "child_database":
+        return f"🗂️ {block_content.get('title') or '无标题数据库'}"
+
+    return ""
 
 
 def extract_rich_text(rich_text_list: list) -> str:
@@ -177,7 +222,7 @@ def get_term(dat: datetime = datetime.today()):
         return result
 
     except Exception as e:
-        print(f"使用备份学期系统失败: {e}")
+        logger.error("使用备份学期系统失败: %s", e)
         # 恢复工作目录
         try:
             os.chdir(current_dir)
@@ -209,7 +254,7 @@ def get_week_num(dat: datetime = datetime.today()) -> int:
         return result
 
     except Exception as e:
-        print(f"使用备份周数计算失败: {e}")
+        logger.error("使用备份周数计算失败: %s", e)
         # 恢复工作目录
         try:
             os.chdir(current_dir)
@@ -241,7 +286,7 @@ def wk_name(dt: datetime = datetime.today()) -> str:
         return result
 
     except Exception as e:
-        print(f"使用备份周名称生成失败: {e}")
+        logger.error("使用备份周名称生成失败: %s", e)
         # 恢复工作目录
         try:
             os.chdir(current_dir)
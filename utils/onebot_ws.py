@@ -0,0 +1,243 @@
+# utils/onebot_ws.py
+import asyncio
+import itertools
+import json
+import queue
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Optional
+
+from websockets.asyncio.client import connect
+from websockets.exceptions import ConnectionClosed
+
+import config
+from utils.event_filter import prefilter_event
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+
+class OneBotWebSocketClient:
+    """
+    OneBot 正向 WebSocket 客户端
+
+    与 NapCat 保持一条长连接，事件上报和动作调用都走这条连接：
+      - 动作请求带自增 echo，响应按 echo 对应回等待中的调用方，
+        多个线程可以同时发起调用，请求在连接上流水线发送，无需逐个等待响应
+      - 上报的事件交给 on_event 回调，在独立的事件线程中按到达顺序逐个执行，
+        回调阻塞时不影响连接上的响应读取
+      - 连接断开后按指数退避自动重连，断开时未完成的调用立即失败
+
+    接口与 NapCatClient 保持一致（call_action / send_group_msg），可直接替换。
+    """
+
+    def __init__(self, url: Optional[str] = None, access_token: Optional[str] = None,
+                 timeout: float = None, on_event: Optional[Callable[[Dict[str, Any]], Any]] = None):
+        ws_config = config.NAPCAT_WS
+        self.url = url or ws_config['url']
+        self.access_token = access_token if access_token is not None else ws_config['access_token']
+        self.timeout = timeout or ws_config['action_timeout']
+        self.reconnect_delay = ws_config['reconnect_delay']
+        self.max_reconnect_delay = ws_config['max_reconnect_delay']
+        self.on_event = on_event
+
+        self._echo = itertools.count(1)
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ws = None
+        self._stop_event: Optional[asyncio.Event] = None
+        self._connected = threading.Event()
+        self._stopping = False
+        self._start_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._events: 'queue.Queue' = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._stats = {'connects': 0, 'disconnects': 0, 'events': 0, 'filtered': 0, 'actions': 0, 'failed_actions': 0}
+
+    # ---- 生命周期 ----
+
+    def start(self, on_event: Optional[Callable[[Dict[str, Any]], Any]] = None):
+        """在后台线程中建立连接，重复调用不会重复启动"""
+        if on_event is not None:
+            self.on_event = on_event
+        with self._start_lock:
+            if self._thread is not None:
+                return self
+            self._stopping = False
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._run_loop, name='onebot-ws', daemon=True)
+            self._thread.start()
+            threading.Thread(target=self._event_loop, name='onebot-ws-events', daemon=True).start()
+        return self
+
+    def stop(self):
+        """关闭连接并停止后台线程"""
+        with self._start_lock:
+            if self._thread is None:
+                return
+            self._stopping = True
+            loop, thread = self._loop, self._thread
+            self._thread = None
+        loop.call_soon_threadsafe(self._request_stop)
+        thread.join(timeout=5)
+        self._events.put(None)
+
+    def wait_connected(self, timeout: Optional[float] = None) -> bool:
+        """等待连接建立"""
+        return self._connected.wait(timeout)
+
+    @property
+    def connected(self) -> bool:
+        return self._connected.is_set()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._connect_forever())
+        finally:
+            self._loop.close()
+
+    def _request_stop(self):
+        if self._stop_event is not None:
+            self._stop_event.set()
+        if self._ws is not None:
+            asyncio.ensure_future(self._ws.close())
+
+    async def _connect_forever(self):
+        self._stop_event = asyncio.Event()
+        headers = {'Authorization': f'Bearer {self.access_token}'} if self.access_token else None
+        delay = self.reconnect_delay
+        while not self._stopping:
+            try:
+                async with connect(self.url, additional_headers=headers, max_size=None) as ws:
+                    self._ws = ws
+                    self._connected.set()
+                    self._incr('connects')
+                    delay = self.reconnect_delay
+                    logger.info("已连接 OneBot WebSocket: %s", self.url)
+                    await self._read_forever(ws)
+            except (OSError, ConnectionClosed, asyncio.TimeoutError) as e:
+                if not self._stopping:
+                    logger.warning("OneBot WebSocket 连接失败: %s", e)
+            except Exception as e:
+                if not self._stopping:
+                    logger.error("OneBot WebSocket 异常: %s", e)
+            finally:
+                if self._ws is not None:
+                    self._incr('disconnects')
+                self._ws = None
+                self._connected.clear()
+                self._fail_pending(ConnectionError("OneBot WebSocket 连接已断开"))
+
+            if self._stopping:
+                break
+            logger.info("%.1f 秒后重连 OneBot WebSocket", delay)
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def _read_forever(self, ws):
+        async for raw in ws:
+            # 不需要处理的上报事件在解析 JSON 之前丢弃；动作响应不含 post_type，不受影响
+            if prefilter_event(raw) is not None:
+                self._incr('filtered')
+                continue
+            try:
+                data = json.loads(raw)
+            except ValueError:
+                logger.warning("无法解析的 OneBot 消息: %r", raw[:200])
+                continue
+
+            echo = data.get('echo')
+            if echo is not None and 'post_type' not in data:
+                future = self._pending.pop(str(echo), None)
+                if future is not None and not future.done():
+                    future.set_result(data)
+            elif 'post_type' in data:
+                self._incr('events')
+                self._events.put(data)
+
+    def _fail_pending(self, error: Exception):
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
+
+    def _event_loop(self):
+        """事件线程：按到达顺序把上报事件交给 on_event"""
+        while True:
+            event = self._events.get()
+            if event is None:
+                return
+            if self.on_event is None:
+                continue
+            try:
+                self.on_event(event)
+            except Exception as e:
+                logger.error("处理 OneBot 事件时出错: %s", e)
+
+    def _incr(self, name: str):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    # ---- 动作调用 ----
+
+    async def _call(self, action: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        ws = self._ws
+        if ws is None:
+            raise ConnectionError("OneBot WebSocket 未连接")
+        echo = str(next(self._echo))
+        future = self._loop.create_future()
+        self._pending[echo] = future
+        try:
+            await ws.send(json.dumps({'action': action, 'params': params, 'echo': echo}, ensure_ascii=False))
+            return await future
+        finally:
+            self._pending.pop(echo, None)
+
+    def call_action(self, action: str, **params: Any) -> Optional[Dict[str, Any]]:
+        """调用 OneBot 动作（线程安全），成功时返回响应JSON，失败时返回None"""
+        self.start()
+        if not self._connected.wait(self.timeout):
+            logger.error("调用 NapCat 动作 %s 失败: WebSocket 未连接", action)
+            self._incr('failed_actions')
+            return None
+
+        self._incr('actions')
+        future = asyncio.run_coroutine_threadsafe(self._call(action, params), self._loop)
+        try:
+            return future.result(self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            logger.error("调用 NapCat 动作 %s 超时", action)
+        except Exception as e:
+            logger.error("调用 NapCat 动作 %s 时发生网络异常: %s", action, e)
+        self._incr('failed_actions')
+        return None
+
+    def send_group_msg(self, group_id, message) -> bool:
+        """发送群聊消息"""
+        result = self.call_action('send_group_msg', group_id=group_id, message=message)
+        if result is None:
+            return False
+        if result.get('status') == 'failed':
+            logger.error("向群 %s 发送消息失败: %s", group_id, result)
+            return False
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """返回计数器快照"""
+        with self._stats_lock:
+            snapshot = dict(self._stats)
+        snapshot['connected'] = self.connected
+        snapshot['pending'] = len(self._pending)
+        return snapshot
+
+    def close(self):
+        self.stop()
+
+
+# 全局 OneBot WebSocket 客户端实例（NAPCAT_TRANSPORT 为 'ws' 时使用）
+onebot_ws_client = OneBotWebSocketClient()
@@ -0,0 +1,90 @@
+# utils/rate_limiter.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, List
+
+
+class TokenBucketLimiter:
+    """
+    按键独立计数的令牌桶限流器
+
+    每个键一个桶，只保存 [令牌数, 上次补充时间] 两个值，令牌按 rate 个/秒持续补充，
+    最多积累 burst 个，每次放行消耗一个。桶按最近访问顺序排列，
+    每次调用顺带淘汰队首空闲超过 idle_seconds 的桶，内存只与活跃键数量相关。
+    空闲超过 burst / rate 秒的桶已经补满，淘汰后重建的结果完全相同。
+    """
+
+    def __init__(self, rate: float, burst: int, idle_seconds: float = 600):
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate 必须大于0，burst 必须不小于1")
+        self.rate = rate
+        self.burst = burst
+        self.idle_seconds = max(idle_seconds, burst / rate)
+        self._buckets: 'OrderedDict[Hashable, List[float]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'allowed': 0, 'rejected': 0, 'evicted': 0}
+
+    def _evict_idle(self, now: float):
+        while self._buckets:
+            key, bucket = next(iter(self._buckets.items()))
+            if now - bucket[1] < self.idle_seconds:
+                break
+            del self._buckets[key]
+            self._stats['evicted'] += 1
+
+    def _refill(self, key: Hashable, now: float) -> List[float]:
+        """取得 key 的桶并按经过的时间补充令牌（调用方持有锁）"""
+        self._evict_idle(now)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [float(self.burst), now]
+        else:
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def allow(self, key: Hashable) -> bool:
+        """尝试为 key 消耗一个令牌，返回是否放行"""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._refill(key, now)
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                self._stats['allowed'] += 1
+                return True
+            self._stats['rejected'] += 1
+            return False
+
+    def refund(self, key: Hashable):
+        """退还 allow() 刚消耗的一个令牌（放行后后续检查又拒绝、请求实际没有执行时使用）"""
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket[0] = min(self.burst, bucket[0] + 1)
+                self._stats['allowed'] -= 1
+
+    def reserve(self, key: Hashable) -> float:
+        """
+        为 key 预约一个令牌，返回调用方需要等待的秒数（0 表示立即可用）
+
+        与 allow() 不同，令牌不足时不拒绝而是记账为负数，后续调用依次排在后面，
+        用于按固定速率主动节流（例如 Notion API 请求）。
+        """
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._refill(key, now)
+            bucket[0] -= 1
+            self._stats['allowed'] += 1
+            return max(0.0, -bucket[0] / self.rate)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def stats(self) -> Dict[str, int]:
+        """返回计数器快照"""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot['keys'] = len(self._buckets)
+        return snapshot
@@ -0,0 +1,120 @@
+# utils/reply_builder.py
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import config
+from utils.api_utils import send_group_message
+
+
+def _iter_pieces(line: str, max_length: int, separator: str) -> Iterator[Tuple[str, str]]:
+    """
+    把一项拆成 (片段, 与前文的连接符)
+
+    不超过上限时原样作为一个片段；超过上限时先按其中的换行拆分（例如带子块的 Notion 块），
+    单行仍超过上限时才按长度硬切，硬切出的片段之间没有连接符。
+    """
+    if len(line) <= max_length:
+        yield line, separator
+        return
+    joiner = separator
+    for subline in line.split('\n'):
+        while len(subline) > max_length:
+            yield subline[:max_length], joiner
+            subline = subline[max_length:]
+            joiner = ''
+        if subline or joiner:
+            yield subline, joiner
+        joiner = '\n'
+
+
+def iter_chunks(lines: Iterable[str], max_length: Optional[int] = None, separator: str = '\n') -> Iterator[str]:
+    """
+    把逐行生成的文本拼成不超过 max_length 的若干段，只在行边界处切分
+
+    单行本身超过上限时先在行内的换行处切分，仍然超过时按长度硬切。
+    lines 可以是生成器，边生成边产出，不会先拼出整段文本。
+    """
+    max_length = max_length or config.MESSAGE_MAX_LENGTH
+    parts: List[str] = []
+    size = 0
+    for line in lines:
+        for piece, joiner in _iter_pieces(line, max_length, separator):
+            if parts and size + len(joiner) + len(piece) > max_length:
+                yield ''.join(parts)
+                parts, size = [], 0
+            if parts:
+                parts.append(joiner)
+                size += len(joiner)
+            parts.append(piece)
+            size += len(piece)
+    if parts:
+        yield ''.join(parts)
+
+
+class ReplyBuilder:
+    """
+    分段回复构造器
+
+    用法:
+        reply = ReplyBuilder(group_id, header="📚 FAQ 条目列表:")
+        for key in keys:
+            reply.add(f"{i}. {key}")
+        reply.send()
+
+    add() 累积的内容达到单条消息长度上限时立即发出一段，send() 发出剩余部分；
+    各段按顺序进入出站队列，同一个群的发送顺序不变。
+    """
+
+    def __init__(self, group_id, header: Optional[str] = None, max_length: Optional[int] = None,
+                 separator: str = '\n'):
+        self.group_id = group_id
+        self.max_length = max_length or config.MESSAGE_MAX_LENGTH
+        self.separator = separator
+        self.sent = 0
+        self._parts: List[str] = []
+        self._size = 0
+        if header:
+            self.add(header)
+
+    def add(self, line: str):
+        """追加一行，超过单条上限的行按 iter_chunks 的规则切分"""
+        for piece, joiner in _iter_pieces(line, self.max_length, self.separator):
+            if self._parts and self._size + len(joiner) + len(piece) > self.max_length:
+                self._flush()
+            if self._parts:
+                self._parts.append(joiner)
+                self._size += len(joiner)
+            self._parts.append(piece)
+            self._size += len(piece)
+
+    def extend(self, lines: Iterable[str]):
+        for line in lines:
+            self.add(line)
+
+    def _flush(self):
+        if self._parts:
+            self._emit(''.join(self._parts))
+            self._parts, self._size = [], 0
+
+    def _emit(self, text: str):
+        send_group_message(self.group_id, text)
+        self.sent += 1
+
+    def send(self) -> int:
+        """发出剩余内容，返回总共发送的段数"""
+        self._flush()
+        return self.sent
+
+
+def parse_page(args: str) -> int:
+    """从命令参数中解析页码，缺省或非法时为第1页"""
+    token = args.strip().split()[0] if args and args.strip() else ''
+    return int(token) if token.isdigit() and int(token) > 0 else 1
+
+
+def paginate(items: Sequence, page: int, page_size: Optional[int] = None) -> Tuple[Sequence, int, int]:
+    """截取第 page 页，返回 (本页条目, 实际页码, 总页数)；页码超出范围时取最后一页"""
+    page_size = page_size or config.LIST_PAGE_SIZE
+    total_pages = max(1, (len(items) + page_size - 1) // page_size)
+    page = min(max(page, 1), total_pages)
+    start = (page - 1) * page_size
+    return items[start:start + page_size], page, total_pages
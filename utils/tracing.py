@@ -0,0 +1,182 @@
+# utils/tracing.py
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+import config
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# 当前线程/协程正在处理的事件追踪，处理器深处的存储和发送代码通过它记录耗时
+_current_trace: contextvars.ContextVar = contextvars.ContextVar('trace', default=None)
+
+
+def _bucket_bounds(start: float = 0.05, stop: float = 600_000, growth: float = 1.1) -> List[float]:
+    bounds = []
+    bound = start
+    while bound < stop:
+        bounds.append(bound)
+        bound *= growth
+    return bounds
+
+
+class LatencyHistogram:
+    """
+    对数分桶的延迟直方图
+
+    桶边界按 1.1 倍递增，覆盖 0.05ms ~ 10分钟，内存固定；
+    分位数取所在桶的上边界，相对误差不超过 10%。
+    """
+
+    BOUNDS = _bucket_bounds()
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, ms: float):
+        self.counts[bisect.bisect_left(self.BOUNDS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def percentile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return min(self.BOUNDS[index] if index < len(self.BOUNDS) else self.max, self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            'count': self.count,
+            'mean': round(self.total / self.count, 3) if self.count else 0.0,
+            'p50': round(self.percentile(0.50), 3),
+            'p95': round(self.percentile(0.95), 3),
+            'p99': round(self.percentile(0.99), 3),
+            'max': round(self.max, 3),
+        }
+
+
+class MetricsRegistry:
+    """按 (命令, 阶段) 聚合的延迟直方图"""
+
+    def __init__(self):
+        self._histograms: Dict[tuple, LatencyHistogram] = {}
+        self._budget_exceeded: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, command: str, span: str, ms: float):
+        with self._lock:
+            histogram = self._histograms.get((command, span))
+            if histogram is None:
+                histogram = self._histograms[(command, span)] = LatencyHistogram()
+            histogram.observe(ms)
+
+    def record_budget_exceeded(self, command: str):
+        with self._lock:
+            self._budget_exceeded[command] = self._budget_exceeded.get(command, 0) + 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            commands: Dict[str, Dict[str, Any]] = {}
+            for (command, span), histogram in sorted(self._histograms.items()):
+                commands.setdefault(command, {})[span] = histogram.summary()
+            return {'commands': commands, 'budget_exceeded': dict(self._budget_exceeded)}
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._budget_exceeded.clear()
+
+
+metrics = MetricsRegistry()
+
+
+class Trace:
+    """
+    单个事件的追踪记录
+
+    各阶段耗时按名称累加（同一阶段多次进入时求和），finish() 时写入直方图：
+      parse   解析请求体
+      route   校验事件、匹配命令、限流
+      queue   在入站队列中等待
+      handler 处理器总耗时，其中包含
+      storage SQLite / JSON 文件读写
+      download 图片下载
+      send    提交回复（入队；同步发送模式下包含实际发送）
+    """
+
+    __slots__ = ('start', 'command', 'spans', 'mark')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.command: Optional[str] = None
+        self.spans: Dict[str, float] = {}
+        self.mark: Optional[float] = None
+
+    def add(self, name: str, seconds: float):
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    @contextmanager
+    def span(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def finish(self):
+        """把各阶段耗时写入直方图，处理器超出延迟预算时记录警告日志"""
+        if not config.TRACING['enabled'] or self.command is None:
+            return
+        total = time.perf_counter() - self.start
+        for name, seconds in self.spans.items():
+            metrics.observe(self.command, name, seconds * 1000)
+        metrics.observe(self.command, 'total', total * 1000)
+
+        handler_ms = self.spans.get('handler', 0.0) * 1000
+        budget = config.TRACING['budgets'].get(self.command, config.TRACING['handler_budget_ms'])
+        if handler_ms > budget:
+            metrics.record_budget_exceeded(self.command)
+            breakdown = ', '.join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in self.spans.items())
+            logger.warning("命令 '%s' 处理耗时 %.0fms 超出预算 %sms (%s)", self.command, handler_ms, budget, breakdown)
+
+
+@contextmanager
+def activate(trace: Optional[Trace]):
+    """在当前线程/协程中设置正在处理的追踪"""
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name: str):
+    """在当前追踪中记录一个阶段的耗时，没有追踪时不做任何事"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, time.perf_counter() - start)
@@ -0,0 +1,136 @@
+# utils/worker_pool.py
+import queue
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Hashable, List, Tuple
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+
+class PartitionedWorkerPool:
+    """
+    按键分区的后台工作线程池
+
+    每个键（例如群号）有自己的任务队列，有任务的键进入共享的就绪队列，空闲的工作线程
+    从就绪队列取一个键、执行它队首的一个任务，键仍有任务时重新排到就绪队列末尾。
+    同一个键同时最多只在一个线程上执行，因此严格按提交顺序执行；不同键之间并发执行，
+    某个群的慢命令只占用一个线程，不会阻塞其他群。
+    所有键共用 max_pending 个排队名额（不含正在执行的任务），队列满时提交方最多等待
+    put_timeout 秒，超时后丢弃任务并计数。
+    """
+
+    def __init__(self, name: str, workers: int = 4, max_pending: int = 1000, put_timeout: float = 1.0):
+        if workers < 1:
+            raise ValueError("workers 必须大于0")
+        self.name = name
+        self.workers = workers
+        self.max_pending = max(1, max_pending)
+        self.put_timeout = put_timeout
+        self._queues: Dict[Hashable, Deque[Tuple[Callable, tuple, dict]]] = {}
+        self._ready: 'queue.SimpleQueue[Hashable]' = queue.SimpleQueue()
+        self._pending = 0       # 排队中（尚未开始执行）的任务数
+        self._unfinished = 0    # 已入队但尚未执行完的任务数，join() 等待其归零
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'submitted': 0,   # 成功入队的任务数
+            'completed': 0,   # 执行成功的任务数
+            'failed': 0,      # 执行时抛出异常的任务数
+            'rejected': 0,    # 队列已满被丢弃的任务数
+            'blocked': 0,     # 入队时因队列已满而等待的次数
+            'max_depth': 0,   # 观察到的最大排队深度
+        }
+
+    def _ensure_started(self):
+        """首次提交任务时启动工作线程"""
+        if self._threads:
+            return
+        with self._start_lock:
+            if self._threads:
+                return
+            threads = []
+            for index in range(self.workers):
+                thread = threading.Thread(
+                    target=self._worker_loop,
+                    name=f"{self.name}-{index}",
+                    daemon=True
+                )
+                thread.start()
+                threads.append(thread)
+            self._threads = threads
+
+    def _incr(self, name: str, value: int = 1):
+        with self._stats_lock:
+            self._stats[name] += value
+
+    def submit(self, key: Hashable, func: Callable, *args: Any, **kwargs: Any) -> bool:
+        """提交任务，返回是否成功入队"""
+        self._ensure_started()
+        with self._cond:
+            if self._pending >= self.max_pending:
+                self._incr('blocked')
+                if not self._cond.wait_for(lambda: self._pending < self.max_pending, timeout=self.put_timeout):
+                    self._incr('rejected')
+                    logger.warning("[%s] 队列已满，丢弃任务: %s", self.name, getattr(func, '__name__', func))
+                    return False
+
+            tasks = self._queues.get(key)
+            if tasks is None:
+                # 键不在字典中说明它既不在就绪队列里也没有在执行，需要排入就绪队列
+                tasks = self._queues[key] = deque()
+                self._ready.put(key)
+            tasks.append((func, args, kwargs))
+            self._pending += 1
+            self._unfinished += 1
+            depth = self._pending
+
+        with self._stats_lock:
+            self._stats['submitted'] += 1
+            if depth > self._stats['max_depth']:
+                self._stats['max_depth'] = depth
+        return True
+
+    def _worker_loop(self):
+        while True:
+            key = self._ready.get()
+            with self._cond:
+                func, args, kwargs = self._queues[key].popleft()
+                self._pending -= 1
+                self._cond.notify_all()
+            try:
+                func(*args, **kwargs)
+                self._incr('completed')
+            except Exception as e:
+                self._incr('failed')
+                logger.error("[%s] 任务执行失败: %s", self.name, e)
+            finally:
+                with self._cond:
+                    if self._queues[key]:
+                        # 还有任务：排到就绪队列末尾，让其他键轮流执行
+                        self._ready.put(key)
+                    else:
+                        del self._queues[key]
+                    self._unfinished -= 1
+                    self._cond.notify_all()
+
+    def depth(self) -> int:
+        """当前排队中的任务数"""
+        with self._cond:
+            return self._pending
+
+    def join(self):
+        """阻塞直到所有已入队的任务执行完毕"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._unfinished == 0)
+
+    def stats(self) -> Dict[str, int]:
+        """返回计数器快照"""
+        with self._stats_lock:
+            snapshot = dict(self._stats)
+        snapshot['depth'] = self.depth()
+        snapshot['capacity'] = self.max_pending
+        snapshot['workers'] = self.workers
+        return snapshot